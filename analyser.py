@@ -7,10 +7,14 @@
 :Dependencies: NumPy and OpenCV
 """
 
-import numpy               # NumPy
-import cv2                 # OpenCV
-import errors              # Custom Errors
-from pathlib import Path   # For resolving paths
+import io                       # In-memory .npy encoding
+from time import perf_counter   # Encode timing
+import numpy                    # NumPy
+import cv2                      # OpenCV
+import errors                   # Custom Errors
+import histograms               # Histogram engine
+import metrics                  # Instrumentation
+from pathlib import Path        # For resolving paths
 
 
 def pprint(strings) -> None:
@@ -28,49 +32,107 @@ def pprint(strings) -> None:
 		print(strings[i])
 
 
-def read_img() -> (numpy.ndarray, numpy.ndarray, str):
+FORMATS = (
+	".bmp",
+	".dib",
+	".jpeg",
+	".jpg",
+	".jpe",
+	".jp2",
+	".png",
+	".webp",
+	".pbm",
+	".pgm",
+	".ppm",
+	".sr",
+	".ras",
+	".tiff",
+	".tif"
+)
+
+
+REDUCED_FLAGS = {
+	1: cv2.IMREAD_COLOR,
+	2: cv2.IMREAD_REDUCED_COLOR_2,
+	4: cv2.IMREAD_REDUCED_COLOR_4,
+	8: cv2.IMREAD_REDUCED_COLOR_8
+}
+
+
+def decode_img(buffer, reduce=1) -> (numpy.ndarray, numpy.ndarray):
 	"""
-	Reads an image and returns an array of color and gray-scale images
+	Decodes an encoded image buffer once and derives the gray-scale image from the decoded color image
+
+	:param buffer: Encoded image file contents
+	:type buffer: numpy.ndarray or bytes
+
+	:param reduce: Decode at 1/reduce of the full resolution (default = 1)
+
+		* 1 -- Full resolution
+		* 2, 4 or 8 -- Reduced resolution (IMREAD_REDUCED_COLOR_*), for previews and statistics
+	:type reduce: int
+
+	:return: NumPy ndarray arrays (OpenCV Image Representations) (None, None if the buffer couldn't be decoded)
+	:rtype: (numpy.ndarray, numpy.ndarray)
+	"""
+
+	if not isinstance(buffer, numpy.ndarray):
+		buffer = numpy.frombuffer(buffer, dtype = numpy.uint8)
+	if buffer.size == 0:  # imdecode() asserts on empty buffers
+		return None, None
+	color = cv2.imdecode(buf = buffer, flags = REDUCED_FLAGS[reduce])
+	if color is None:
+		return None, None
+	gray = cv2.cvtColor(src = color, code = cv2.COLOR_BGR2GRAY)
+	return color, gray
+
+
+@metrics.instrument(stage = "load_img")
+def load_img(path, reduce=1) -> (numpy.ndarray, numpy.ndarray, str):
+	"""
+	Reads an image without prompting and returns an array of color and gray-scale images.
+
+	The file is read and decoded once; the gray-scale image is derived from the decoded color image
+
+	:param path: Absolute/relative path to the image to be read (including the filename with extension)
+	:type path: str or Path
+
+	:param reduce: Decode at 1/reduce of the full resolution (1, 2, 4 or 8) (default = 1)
+	:type reduce: int
+
+	:raises errors.FileDoesNotExistError: If the path doesn't point to a file
+	:raises errors.FileIncorrectFormatError: If the file isn't a supported image format
 
 	:return: NumPy ndarray arrays (OpenCV Image Representations) & file name
 	:rtype: (numpy.ndarray, numpy.ndarray, str)
 	"""
 
-	formats = [
-		".bmp",
-		".dib",
-		".jpeg",
-		".jpg",
-		".jpe",
-		".jp2",
-		".png",
-		".webp",
-		".pbm",
-		".pgm",
-		".ppm",
-		".sr",
-		".ras",
-		".tiff",
-		".tif"
-	]
+	file = Path(path).resolve()
+	if not file.is_file():
+		raise errors.FileDoesNotExistError
+	extn = file.suffix.lower()
+	name = file.name.lower().replace(extn, "")
+	if extn not in FORMATS:
+		raise errors.FileIncorrectFormatError
+	color, gray = decode_img(buffer = numpy.fromfile(str(file), dtype = numpy.uint8), reduce = reduce)
+	return color, gray, name
+
+
+def read_img() -> (numpy.ndarray, numpy.ndarray, str, Path):
+	"""
+	Reads an image and returns an array of color and gray-scale images
+
+	:return: NumPy ndarray arrays (OpenCV Image Representations), file name & resolved path of the file
+	:rtype: (numpy.ndarray, numpy.ndarray, str, Path)
+	"""
+
 	print("Enter absolute/relative path to the image to be read (including the filename with extension)")
 	print("Supported image formats:")
-	pprint(strings = formats)
+	pprint(strings = FORMATS)
 	while True:
 		try:
-			path = input()
-			file = Path(path).resolve()
-			if file.is_file():
-				extn = file.suffix.lower()
-				name = file.name.lower().replace(extn, "")
-				if extn in formats:
-					color = cv2.imread(filename = path, flags = cv2.IMREAD_COLOR)
-					gray = cv2.imread(filename = path, flags = cv2.IMREAD_GRAYSCALE)
-					return color, gray, name
-				else:
-					raise errors.FileIncorrectFormatError
-			else:
-				raise errors.FileDoesNotExistError
+			path = Path(input()).resolve()
+			return load_img(path = path) + (path,)
 		except (errors.FileDoesNotExistError, errors.FileIncorrectFormatError) as e:
 			print("ERROR: " + e.message)
 			print("\nEnter absolute/relative path to the image to be read (including the filename with extension)")
@@ -79,7 +141,8 @@ def read_img() -> (numpy.ndarray, numpy.ndarray, str):
 			print("\nEnter absolute/relative path to the image to be read (including the filename with extension)")
 
 
-def save_img(image, o_name) -> bool:
+@metrics.instrument(stage = "save_img")
+def save_img(image, o_name, writer=None, profile="jpeg") -> bool:
 	"""
 	Used for saving an image.
 
@@ -89,7 +152,14 @@ def save_img(image, o_name) -> bool:
 	:param o_name: Original Name of the Image
 	:type o_name: str
 
-	:return: Returns True if the function executes completely, else False
+	:param writer: Background writer the image is queued on instead of being written before returning (default =
+	None)
+	:type writer: writer.ImageWriter
+
+	:param profile: Output profile specification, which sets the file format (see parse_profile()) (default = "jpeg")
+	:type profile: str
+
+	:return: Returns True if the function executes completely (or the image was queued), else False
 	:rtype: bool
 	"""
 
@@ -100,12 +170,13 @@ def save_img(image, o_name) -> bool:
 			path = path.joinpath(i)
 			path.mkdir(exist_ok = True)
 		print("Enter the name of the output image file.",)
-		print("Do not enter an image format extension, the output format is locked to .jpeg)")
+		extn = profile_extension(profile = profile)
+		print("Do not enter an image format extension, the output format is " + extn + " (profile: " + profile + ")")
 		print("\nFile will be saved at: " + str(path) + "\n")
 		n_name = input()
 		n_name += ".a"
 		n_name = n_name.split(".")[0]
-		name = n_name + ".jpeg"
+		name = n_name + extn
 		print("Name of the file: " + name)
 		conf_f = True
 		while conf_f:
@@ -115,19 +186,228 @@ def save_img(image, o_name) -> bool:
 				if conf == "Y":
 					conf_f = False
 				elif conf == "N":
-					return save_img(image = image, o_name = o_name)
+					return save_img(image = image, o_name = o_name, writer = writer, profile = profile)
 				else:
 					raise errors.IncorrectImageSaveConfResponseError
 			except errors.IncorrectImageSaveConfResponseError as e:
 				print("ERROR: " + e.message)
 				print("Valid options are: 'Y', 'y', 'N' and 'n' only.")
-		cv2.imwrite(filename = str(path.joinpath(name)), img = image, params = (cv2.IMWRITE_JPEG_QUALITY, 100))
-		return True
+		if writer is not None:
+			writer.submit(image = image, path = path.joinpath(name), profile = profile)
+			return True
+		return write_img(image = image, path = path.joinpath(name), profile = profile)
 	except FileNotFoundError:
 		print("ERROR: Path resolution error!")
 		return False
 
 
+# Output profiles: extension, OpenCV encoder parameter & its default level ('name:level' overrides the level)
+PROFILES = {
+	"jpeg": (".jpeg", cv2.IMWRITE_JPEG_QUALITY, 100),   # Quality 0-100 (lossy)
+	"png": (".png", cv2.IMWRITE_PNG_COMPRESSION, 3),    # Compression level 0-9 (lossless)
+	"png1": (".png", cv2.IMWRITE_PNG_BILEVEL, 1),       # 1-bit PNG, for binary images such as edge maps
+	"webp": (".webp", cv2.IMWRITE_WEBP_QUALITY, 101),   # Lossless WebP
+	"pbm": (".pbm", cv2.IMWRITE_PXM_BINARY, 1),         # 1-bit portable bitmap, for binary images
+	"npy": (".npy", None, None)                         # Raw NumPy array (no encoding)
+}
+BILEVEL_PROFILES = ("png1", "pbm")
+PROFILE_LEVELS = {
+	"jpeg": range(101),
+	"png": range(10)
+}
+
+
+def parse_profile(spec="jpeg") -> (str, int):
+	"""
+	Parses an output profile specification of the form 'name[:level]' (see PROFILES), eg: 'jpeg:90' or 'png:9'
+
+	:param spec: Output profile specification (default = "jpeg")
+	:type spec: str
+
+	:raises errors.OutputProfileError: If the profile is unknown or its level is out of range
+
+	:return: Profile name & level
+	:rtype: (str, int)
+	"""
+
+	name, _, level = spec.strip().lower().partition(":")
+	if name not in PROFILES:
+		raise errors.OutputProfileError
+	if not level:
+		return name, PROFILES[name][2]
+	try:
+		level = int(level)
+	except ValueError:
+		raise errors.OutputProfileError
+	if level not in PROFILE_LEVELS.get(name, ()):
+		raise errors.OutputProfileError
+	return name, level
+
+
+def profile_extension(profile="jpeg") -> str:
+	"""
+	Returns the file extension of an output profile
+
+	:param profile: Output profile specification (see parse_profile()) (default = "jpeg")
+	:type profile: str
+
+	:raises errors.OutputProfileError: If the profile is invalid
+
+	:return: Extension, including the dot
+	:rtype: str
+	"""
+
+	return PROFILES[parse_profile(spec = profile)[0]][0]
+
+
+EXTENSION_ALIASES = {".jpg": ".jpeg", ".jpe": ".jpeg"}  # Other spellings of the profile extensions
+
+
+def path_profile(path, profile=None) -> str:
+	"""
+	Resolves the output profile of a file: inferred from the file extension (at its default level) if no profile is
+	given, otherwise checked against it
+
+	:param path: Path of the output file (including the filename with extension)
+	:type path: str or Path
+
+	:param profile: Output profile specification (see parse_profile()) (default = None, i.e., from the extension)
+	:type profile: str
+
+	:raises errors.OutputProfileError: If the profile is invalid, no profile writes the extension, or the profile
+	writes another extension
+
+	:return: Output profile specification
+	:rtype: str
+	"""
+
+	extn = Path(path).suffix.lower()
+	extn = EXTENSION_ALIASES.get(extn, extn)
+	if profile is None:
+		names = [i for i in PROFILES if PROFILES[i][0] == extn]
+		if not names:
+			raise errors.OutputProfileError
+		return names[0]
+	if profile_extension(profile = profile) != extn:
+		raise errors.OutputProfileError
+	return profile
+
+
+def encode_img(image, profile="jpeg") -> (numpy.ndarray, float):
+	"""
+	Encodes an image in memory. The 1-bit profiles store color images by their gray-scale conversion and threshold
+	at 128
+
+	:param image: NumPy ndarray array (OpenCV Image Representation)
+	:type image: numpy.ndarray
+
+	:param profile: Output profile specification (see parse_profile()) (default = "jpeg")
+	:type profile: str
+
+	:raises errors.OutputProfileError: If the profile is invalid
+
+	:return: Encoded bytes & encoding time (seconds)
+	:rtype: (numpy.ndarray, float)
+	"""
+
+	name, level = parse_profile(spec = profile)
+	extn, flag, _ = PROFILES[name]
+	start = perf_counter()
+	if name == "npy":
+		stream = io.BytesIO()
+		numpy.save(stream, image)
+		buffer = numpy.frombuffer(stream.getbuffer(), dtype = numpy.uint8)
+	else:
+		if name in BILEVEL_PROFILES:
+			image = color_space_converter(image = image)
+			if name == "png1":  # libpng keeps only the top bit
+				image = cv2.threshold(src = image, thresh = 127, maxval = 255, type = cv2.THRESH_BINARY)[1]
+		ok, buffer = cv2.imencode(ext = extn, img = image, params = (flag, level))
+		if not ok:
+			raise cv2.error("unable to encode the image as " + profile)
+	return buffer, perf_counter() - start
+
+
+def export_img(image, path, profile=None) -> dict:
+	"""
+	Encodes an image with an output profile and writes it to the given path without prompting
+
+	:param image: NumPy ndarray array (OpenCV Image Representation)
+	:type image: numpy.ndarray
+
+	:param path: Path of the output file (including the filename with extension, see profile_extension())
+	:type path: str or Path
+
+	:param profile: Output profile specification (see parse_profile()) (default = None, i.e., from the extension)
+	:type profile: str
+
+	:raises errors.OutputProfileError: If the profile is invalid or doesn't match the extension (see path_profile())
+
+	:return: Profile, path, output size (bytes), encoding & writing time (seconds), or None if the image couldn't be
+	encoded or written
+	:rtype: dict
+	"""
+
+	profile = path_profile(path = path, profile = profile)
+	try:
+		buffer, encode_seconds = encode_img(image = image, profile = profile)
+		start = perf_counter()
+		buffer.tofile(str(path))
+	except (cv2.error, OSError):
+		return None
+	return {
+		"profile": profile,
+		"path": str(path),
+		"bytes": int(buffer.size),
+		"encode_seconds": encode_seconds,
+		"write_seconds": perf_counter() - start
+	}
+
+
+def profile_report(image, profiles=None) -> list:
+	"""
+	Encodes an image in memory with several output profiles, to compare their speed & output size
+
+	:param image: NumPy ndarray array (OpenCV Image Representation)
+	:type image: numpy.ndarray
+
+	:param profiles: Output profile specifications (default = None, i.e., every profile at its default level)
+	:type profiles: list[str]
+
+	:return: Profile, output size (bytes) & encoding time (seconds) per profile, smallest output first
+	:rtype: list[dict]
+	"""
+
+	report = []
+	for profile in profiles or list(PROFILES):
+		buffer, seconds = encode_img(image = image, profile = profile)
+		report.append({"profile": profile, "bytes": int(buffer.size), "encode_seconds": seconds})
+	return sorted(report, key = lambda i: i["bytes"])
+
+
+def write_img(image, path, profile=None) -> bool:
+	"""
+	Writes an image to the given path without prompting. Without a profile, the file extension sets the format (eg:
+	.jpeg at quality 100, .png at compression level 3)
+
+	:param image: NumPy ndarray array (OpenCV Image Representation)
+	:type image: numpy.ndarray
+
+	:param path: Path of the output image file (including the filename with extension)
+	:type path: str or Path
+
+	:param profile: Output profile specification (see parse_profile()) (default = None, i.e., from the extension)
+	:type profile: str
+
+	:raises errors.OutputProfileError: If the profile is invalid or doesn't match the extension (see path_profile())
+
+	:return: Returns True if the image was written, else False
+	:rtype: bool
+	"""
+
+	return export_img(image = image, path = path, profile = profile) is not None
+
+
 def color_space_converter(image, color=False) -> numpy.ndarray:
 	"""
 	Used for converting to the correct output color-space after processing an image.
@@ -154,7 +434,77 @@ def color_space_converter(image, color=False) -> numpy.ndarray:
 			return cv2.cvtColor(src = image, code = cv2.COLOR_BGR2GRAY)
 
 
-def de_noise(color, gray, quality=0) -> (numpy.ndarray, numpy.ndarray):
+PLAN_BOTH = 0     # Color & gray-scale outputs
+PLAN_COLOR = 1    # Color output only (the gray-scale output is None)
+PLAN_GRAY = 2     # Gray-scale output only (the color output is None)
+PLAN_DERIVED = 3  # Color output, with the gray-scale output converted from it
+
+
+def planned(color, gray, plan, func) -> (numpy.ndarray, numpy.ndarray):
+	"""
+	Applies a per-image function to the planes a channel plan asks for, so that callers only pay for the outputs they
+	use. Planes that aren't needed may be None
+
+	:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
+	:type color: numpy.ndarray
+
+	:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image)
+	:type gray: numpy.ndarray
+
+	:param plan: Channel plan (default = PLAN_BOTH)
+
+		* 0 (PLAN_BOTH) -- Both images are processed
+		* 1 (PLAN_COLOR) -- Only the color image is processed; the gray-scale output is None
+		* 2 (PLAN_GRAY) -- Only the gray-scale image is processed; the color output is None
+		* 3 (PLAN_DERIVED) -- Only the color image is processed; the gray-scale output is converted from its result
+	:type plan: int
+
+	:param func: Function processing one image
+	:type func: function
+
+	:return: NumPy ndarray arrays (OpenCV Image Representations) (None for planes the plan skips)
+	:rtype: (numpy.ndarray, numpy.ndarray)
+	"""
+
+	color_o, gray_o = None, None
+	if plan != PLAN_GRAY:
+		color_o = func(color)
+	if plan == PLAN_DERIVED:
+		gray_o = color_space_converter(image = color_o)
+	elif plan != PLAN_COLOR:
+		gray_o = color_space_converter(image = func(gray))
+	if color_o is not None:
+		color_o = color_space_converter(image = color_o, color = True)
+	return color_o, gray_o
+
+
+TEMPLATE_WINDOW = 7  # Non-local means patch size (pixels)
+SEARCH_WINDOW = 21   # Non-local means search window size (pixels)
+
+
+def denoise_strength(quality=0) -> (int, int):
+	"""
+	Maps a de-noising quality to the non-local means filter strengths
+
+	:param quality: De-noising quality (see de_noise()) (default = 0)
+	:type quality: int
+
+	:return: Filter strength for the luminance & color components (h, hColor)
+	:rtype: (int, int)
+	"""
+
+	if quality == 0:
+		return 5, 5
+	elif quality == 1:
+		return 10, 10
+	elif quality == 2:
+		return 15, 15
+	else:
+		return 0, 0
+
+
+@metrics.instrument(stage = "de_noise")
+def de_noise(color, gray, quality=0, plan=PLAN_BOTH) -> (numpy.ndarray, numpy.ndarray):
 	"""
 	Removes noise from the input image
 
@@ -173,35 +523,69 @@ def de_noise(color, gray, quality=0) -> (numpy.ndarray, numpy.ndarray):
 		* 2 -- high (Very Low Noise, Moderate-Low End Image Detail, Moderate Colored Image Distortion)
 	:type quality: int
 
+	:param plan: Channel plan, see planned() (default = PLAN_BOTH)
+	:type plan: int
+
 	:return: NumPy ndarray arrays (OpenCV Image Representations)
 	:rtype: (numpy.ndarray, numpy.ndarray)
 	"""
 
-	if quality == 0:
-		h, h_color = 5, 5
-	elif quality == 1:
-		h, h_color = 10, 10
-	elif quality == 2:
-		h, h_color = 15, 15
-	else:
-		h, h_color = 0, 0
-	color_o = cv2.fastNlMeansDenoisingColored(
-			src = color,
-			h = h,
-			hColor = h_color,
-			templateWindowSize = 7,
-			searchWindowSize = 21
-	)
-	gray_o = cv2.fastNlMeansDenoising(
-			src = gray,
-			h = h,
-			templateWindowSize = 7,
-			searchWindowSize = 21
-	)
-	return color_space_converter(image = color_o, color = True), color_space_converter(image = gray_o)
+	h, h_color = denoise_strength(quality = quality)
+
+	def nl_means(img) -> numpy.ndarray:
+		if len(img.shape) == 3:
+			return cv2.fastNlMeansDenoisingColored(
+					src = img,
+					h = h,
+					hColor = h_color,
+					templateWindowSize = TEMPLATE_WINDOW,
+					searchWindowSize = SEARCH_WINDOW
+			)
+		return cv2.fastNlMeansDenoising(
+				src = img,
+				h = h,
+				templateWindowSize = TEMPLATE_WINDOW,
+				searchWindowSize = SEARCH_WINDOW
+		)
+
+	return planned(color = color, gray = gray, plan = plan, func = nl_means)
+
+
+GRADIENT_DEPTHS = {
+	numpy.int16: cv2.CV_16S,
+	numpy.float32: cv2.CV_32F,
+	numpy.float64: cv2.CV_64F
+}
+POLAR_DEPTHS = (numpy.float32, numpy.float64)  # cv2.cartToPolar() only takes floating point derivatives
+
 
+def gradient_depth(precision, polar=False) -> int:
+	"""
+	Maps a gradient precision to its OpenCV depth
+
+	:param precision: Data-type (a NumPy scalar type, numpy.dtype or type string, eg: "float32")
+	:type precision: type
+
+	:param polar: Only accept the precisions supported by get_gradient_polar() (default = False)
+	:type polar: bool
+
+	:raises errors.GradientPrecisionError: If the precision isn't supported
 
-def get_gradient(color, gray, mode=0) -> (numpy.ndarray, numpy.ndarray):
+	:return: OpenCV depth (cv2.CV_16S, cv2.CV_32F or cv2.CV_64F)
+	:rtype: int
+	"""
+
+	try:
+		precision = numpy.dtype(precision).type
+	except TypeError:
+		raise errors.GradientPrecisionError
+	if precision not in GRADIENT_DEPTHS or (polar and precision not in POLAR_DEPTHS):
+		raise errors.GradientPrecisionError
+	return GRADIENT_DEPTHS[precision]
+
+
+@metrics.instrument(stage = "get_gradient")
+def get_gradient(color, gray, mode=0, precision=numpy.float32, plan=PLAN_BOTH) -> (numpy.ndarray, numpy.ndarray):
 	"""
 	Returns an image with it's gradient highlighted
 
@@ -220,6 +604,18 @@ def get_gradient(color, gray, mode=0) -> (numpy.ndarray, numpy.ndarray):
 		* 2 -- Scharr Derivative (Y-Axis)
 	:type mode: int
 
+	:param precision: Intermediate derivative data-type (default = numpy.float32)
+
+		* numpy.int16 -- Exact for 8-bit inputs, smallest intermediate
+		* numpy.float32 -- Default
+		* numpy.float64 -- Largest intermediate
+	:type precision: type
+
+	:param plan: Channel plan, see planned() (default = PLAN_BOTH)
+	:type plan: int
+
+	:raises errors.GradientPrecisionError: If the precision isn't supported
+
 	:return: NumPy ndarray arrays (OpenCV Image Representations)
 	:rtype: (numpy.ndarray, numpy.ndarray)
 	"""
@@ -231,8 +627,9 @@ def get_gradient(color, gray, mode=0) -> (numpy.ndarray, numpy.ndarray):
 		Hence, when data is converted to numpy.ndarray (or cv2.CV_8U), all negative slopes become zero, i.e.,
 		that edge is missed.
 	
-		To fix this issue, the output data-type is sent to a higher range type, i.e., numpy.float64 (or cv2.CV_64F),
-		its absolute value is then taken, and subsequently converted back to numpy.ndarray
+		To fix this issue, the output data-type is sent to a higher range type (see precision), and
+		cv2.convertScaleAbs() then takes its absolute value and saturates it to 8-bits in a single pass (values above
+		255 are clipped to 255 instead of wrapping around)
 
 		:param img: numpy.ndarray array (OpenCV Image Representation)
 		:type img: numpy.ndarray
@@ -246,10 +643,8 @@ def get_gradient(color, gray, mode=0) -> (numpy.ndarray, numpy.ndarray):
 		:return: numpy.ndarray array (OpenCV Image Representation)
 		:rtype: numpy.ndarray
 		"""
-		img_o = cv2.Scharr(src = img, ddepth = cv2.CV_64F, dx = x, dy = y)
-		img_o = numpy.absolute(img_o)
-		img_o = numpy.uint8(img_o)
-		return img_o
+		img_o = cv2.Scharr(src = img, ddepth = depth, dx = x, dy = y)
+		return cv2.convertScaleAbs(src = img_o)
 
 	def laplacian(img) -> numpy.ndarray:
 		"""
@@ -258,8 +653,9 @@ def get_gradient(color, gray, mode=0) -> (numpy.ndarray, numpy.ndarray):
 		Hence, when data is converted to numpy.ndarray (or cv2.CV_8U), all negative slopes become zero, i.e.,
 		that edge is missed.
 	
-		To fix this issue, the output data-type is sent to a higher range type, i.e., numpy.float64 (or cv2.CV_64F),
-		its absolute value is then taken, and subsequently converted back to numpy.ndarray
+		To fix this issue, the output data-type is sent to a higher range type (see precision), and
+		cv2.convertScaleAbs() then takes its absolute value and saturates it to 8-bits in a single pass (values above
+		255 are clipped to 255 instead of wrapping around)
 
 		:param img: numpy.ndarray array (OpenCV Image Representation)
 		:type img: numpy.ndarray
@@ -267,28 +663,107 @@ def get_gradient(color, gray, mode=0) -> (numpy.ndarray, numpy.ndarray):
 		:return: numpy.ndarray array (OpenCV Image Representation)
 		:rtype: numpy.ndarray
 		"""
-		img_o = cv2.Laplacian(src = img, ddepth = cv2.CV_64F, ksize = 1)
-		img_o = numpy.absolute(img_o)
-		img_o = numpy.uint8(img_o)
-		return img_o
+		img_o = cv2.Laplacian(src = img, ddepth = depth, ksize = 1)
+		return cv2.convertScaleAbs(src = img_o)
 
+	depth = gradient_depth(precision = precision)
 	dx, dy = 0, 0
 	if mode == 1:
 		dx += 1
 	elif mode == 2:
 		dy += 1
 	if mode == 0:
-		color_o = laplacian(img = color)
-		gray_o = laplacian(img = gray)
+		return planned(color = color, gray = gray, plan = plan, func = laplacian)
 	elif mode > 0:
-		color_o = scharr(img = color, x = dx, y = dy)
-		gray_o = scharr(img = gray, x = dx, y = dy)
-	else:
-		color_o, gray_o = color, gray
-	return color_space_converter(image = color_o, color = True), color_space_converter(image = gray_o)
+		return planned(color = color, gray = gray, plan = plan, func = lambda img: scharr(img = img, x = dx, y = dy))
+	return planned(color = color, gray = gray, plan = plan, func = lambda img: img)
 
 
-def detect_edge(color, gray, threshold_1=100, threshold_2=200) -> (numpy.ndarray, numpy.ndarray):
+def get_gradient_polar(color, gray, precision=numpy.float32) -> (tuple, tuple):
+	"""
+	Computes the X-Axis & Y-Axis Scharr derivatives of both images together with the gradient magnitude and
+	orientation, so that a single call replaces one get_gradient() call per axis
+
+	:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
+	:type color: numpy.ndarray
+
+	:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image)
+	:type gray: numpy.ndarray
+
+	:param precision: Output data-type, numpy.float32 or numpy.float64 (default = numpy.float32)
+	:type precision: type
+
+	:raises errors.GradientPrecisionError: If the precision isn't a floating point type
+
+	:return: (X-Axis derivative, Y-Axis derivative, magnitude, orientation (degrees, 0-360)) for the color & the
+	gray-scale image. Derivatives are signed; use cv2.convertScaleAbs() for a saturated 8-bit view of any of them
+	:rtype: ((numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray),
+	(numpy.ndarray, numpy.ndarray, numpy.ndarray, numpy.ndarray))
+	"""
+
+	depth = gradient_depth(precision = precision, polar = True)
+	outputs = []
+	for img in (color, gray):
+		img_x = cv2.Scharr(src = img, ddepth = depth, dx = 1, dy = 0)
+		img_y = cv2.Scharr(src = img, ddepth = depth, dx = 0, dy = 1)
+		magnitude, orientation = cv2.cartToPolar(x = img_x, y = img_y, angleInDegrees = True)
+		outputs.append((img_x, img_y, magnitude, orientation))
+	return outputs[0], outputs[1]
+
+
+def auto_thresholds(gray=None, hist=None, method=0, sigma=0.33) -> (int, int):
+	"""
+	Derives the Canny hysteresis thresholds from the gray-scale histogram
+
+	:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image), only read if hist isn't
+	given (default = None)
+	:type gray: numpy.ndarray
+
+	:param hist: 256 bin gray-scale histogram, eg: the second output of histogram_gen() (default = None)
+	:type hist: numpy.ndarray
+
+	:param method: Threshold rule (default = 0)
+
+		* 0 -- Median (thresholds at (1 - sigma) and (1 + sigma) times the median intensity)
+		* 1 -- Otsu (upper threshold at Otsu's threshold, lower threshold at half of it)
+	:type method: int
+
+	:param sigma: Spread around the median for method 0 (default = 0.33)
+	:type sigma: float
+
+	:return: Lower & upper thresholds
+	:rtype: (int, int)
+	"""
+
+	if hist is None:
+		hist = histograms.channel_histograms(color = gray)[0]
+	hist = numpy.asarray(hist, dtype = numpy.float64).ravel()
+	cumulative = numpy.cumsum(hist)
+	if method == 1:
+		levels = numpy.arange(hist.size, dtype = numpy.float64)
+		weight = cumulative / cumulative[-1]
+		mean = numpy.cumsum(hist * levels) / cumulative[-1]
+		with numpy.errstate(invalid = "ignore", divide = "ignore"):
+			between = (mean[-1] * weight - mean) ** 2 / (weight * (1 - weight))
+		upper = float(numpy.nanargmax(between)) if numpy.isfinite(between).any() else 127.0
+		lower = upper / 2
+	else:
+		median = float(numpy.searchsorted(cumulative, cumulative[-1] / 2))
+		lower = max(0.0, (1 - sigma) * median)
+		upper = min(255.0, (1 + sigma) * median)
+	return int(lower), int(upper)
+
+
+@metrics.instrument(stage = "detect_edge")
+def detect_edge(
+		color,
+		gray,
+		threshold_1=100,
+		threshold_2=200,
+		auto=-1,
+		hist=None,
+		plan=PLAN_BOTH
+) -> (numpy.ndarray, numpy.ndarray):
 	"""
 	Returns a binary image of the input image with the edges highlighted using the Canny Edge Detection Algorithm
 
@@ -304,48 +779,127 @@ def detect_edge(color, gray, threshold_1=100, threshold_2=200) -> (numpy.ndarray
 	:param threshold_2: 2nd threshold for the hysteresis procedure (default = 250)
 	:type threshold_2: int
 
+	:param auto: Automatic threshold mode, overriding threshold_1 & threshold_2 (default = -1)
+
+		* -1 -- Off
+		* 0 -- Median based (see auto_thresholds())
+		* 1 -- Otsu based (see auto_thresholds())
+	:type auto: int
+
+	:param hist: Gray-scale histogram already computed by histogram_gen(), used by the automatic threshold modes
+	instead of another pass over the image (default = None)
+	:type hist: numpy.ndarray
+
+	:param plan: Channel plan, see planned() (default = PLAN_BOTH)
+	:type plan: int
+
 	:return: NumPy ndarray arrays (OpenCV Image Representations)
 	:rtype: (numpy.ndarray, numpy.ndarray)
 	"""
 
-	color_o = cv2.Canny(image = color, threshold1 = threshold_1, threshold2 = threshold_2, L2gradient = True)
-	gray_o = cv2.Canny(image = gray, threshold1 = threshold_1, threshold2 = threshold_2, L2gradient = True)
-	return color_space_converter(image = color_o, color = True), color_space_converter(image = gray_o)
+	if auto >= 0:
+		if hist is None and gray is None:
+			gray = color_space_converter(image = color)
+		threshold_1, threshold_2 = auto_thresholds(gray = gray, hist = hist, method = auto)
+
+	def canny(img) -> numpy.ndarray:
+		return cv2.Canny(image = img, threshold1 = threshold_1, threshold2 = threshold_2, L2gradient = True)
+
+	return planned(color = color, gray = gray, plan = plan, func = canny)
+
+
+@metrics.instrument(stage = "canny_derivatives")
+def canny_derivatives(image) -> (numpy.ndarray, numpy.ndarray):
+	"""
+	Returns the 3x3 Sobel derivatives cv2.Canny() computes internally, for reuse across thresholds
+
+	:param image: NumPy ndarray array (OpenCV Image Representation) (8-bit color or gray-scale image)
+	:type image: numpy.ndarray
+
+	:return: 16-bit signed x & y derivatives
+	:rtype: (numpy.ndarray, numpy.ndarray)
+	"""
+
+	img_x = cv2.Sobel(src = image, ddepth = cv2.CV_16S, dx = 1, dy = 0, ksize = 3, borderType = cv2.BORDER_REPLICATE)
+	img_y = cv2.Sobel(src = image, ddepth = cv2.CV_16S, dx = 0, dy = 1, ksize = 3, borderType = cv2.BORDER_REPLICATE)
+	return img_x, img_y
 
 
-def histogram_gen(color, gray) -> (list, numpy.ndarray):
+def detect_edge_sweep(color, gray, pairs) -> iter:
+	"""
+	Runs Canny Edge Detection for every (threshold_1, threshold_2) pair, computing the derivatives only once per image.
+
+	Results are yielded one pair at a time, so a sweep holds a single pair's edge images instead of the whole stack;
+	numpy.stack() the yielded images when a stacked result is needed. Every result is identical to cv2.Canny()'s
+	output for the same pair (as used by detect_edge())
+
+	:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
+	:type color: numpy.ndarray
+
+	:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image)
+	:type gray: numpy.ndarray
+
+	:param pairs: Threshold pairs
+	:type pairs: list[(int, int)]
+
+	:return: Binary edge images for the color & gray-scale image and the pair's statistics (thresholds & the fraction
+	of edge pixels in each image), in the order of the pairs
+	:rtype: iter[(numpy.ndarray, numpy.ndarray, dict)]
+	"""
+
+	derivatives = [canny_derivatives(image = img) for img in (color, gray)]
+	pixels = float(gray.shape[0] * gray.shape[1])
+	for threshold_1, threshold_2 in pairs:
+		color_edges, gray_edges = [
+			cv2.Canny(dx = img_x, dy = img_y, threshold1 = threshold_1, threshold2 = threshold_2, L2gradient = True)
+			for img_x, img_y in derivatives
+		]
+		yield color_edges, gray_edges, {
+			"threshold_1": threshold_1,
+			"threshold_2": threshold_2,
+			"color_density": cv2.countNonZero(color_edges) / pixels,
+			"gray_density": cv2.countNonZero(gray_edges) / pixels
+		}
+
+
+@metrics.instrument(stage = "histogram_gen")
+def histogram_gen(color, gray, bins=256, mask=None, plan=PLAN_BOTH) -> (list, numpy.ndarray):
 	"""
 	Returns histograms depicting the frequency of the occurrence of a given color
 
+	All 4 histograms (B, G, R & gray-scale) are computed together (see histograms.channel_histograms())
+
 	:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
 	:type color: numpy.ndarray
 
 	:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image)
 	:type gray: numpy.ndarray
 
-	:return: NumPy ndarray arrays (OpenCV Image Representations)
+	:param bins: Number of bins per channel (default = 256)
+	:type bins: int
+
+	:param mask: Only pixels where the 8-bit mask is non-zero are counted (default = None, i.e., every pixel)
+	:type mask: numpy.ndarray
+
+	:param plan: Channel plan, see planned(). With PLAN_DERIVED the gray-scale histogram counts the gray-scale
+	conversion of the color image (default = PLAN_BOTH)
+	:type plan: int
+
+	:return: B, G & R histograms and the gray-scale histogram, each a (bins, 1) numpy.float32 column (None for the
+	histograms the plan skips)
 	:rtype: (list, numpy.ndarray)
 	"""
 
-	color_channels = cv2.split(m = color)
-	color_hist = []
-	for i, color in enumerate(color_channels):
-		color_hist.append(
-				cv2.calcHist(
-					images = color,
-					channels = [i],
-					mask = None,
-					histSize = [256],
-					ranges = [0, 256]
-				)
-		)
-
-	gray_hist = cv2.calcHist(
-			images = [gray],
-			channels = [0],
-			mask = None,
-			histSize = [256],
-			ranges = [0, 256]
+	if plan == PLAN_GRAY:
+		hist = histograms.channel_histograms(color = gray, bins = bins, mask = mask)
+		return None, hist.astype(numpy.float32)[0][:, None]
+	if plan == PLAN_DERIVED:
+		gray = color_space_converter(image = color)
+	hist = histograms.channel_histograms(
+			color = color,
+			gray = None if plan == PLAN_COLOR else gray,
+			bins = bins,
+			mask = mask
 	)
-
-	return color_hist, gray_hist
+	hist = hist.astype(numpy.float32)[:, :, None]
+	return [hist[0], hist[1], hist[2]], None if plan == PLAN_COLOR else hist[3]
@@ -0,0 +1,574 @@
+# coding=utf-8
+"""
+:Name: batch.py
+:Description: Headless batch processing of image directories over a process pool
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy and OpenCV
+"""
+
+import argparse                                     # Command line parsing
+import os                                           # CPU count
+from concurrent.futures import ProcessPoolExecutor  # Process pool
+from pathlib import Path                            # For resolving paths
+from time import perf_counter                       # Throughput timing
+import numpy                                        # NumPy
+import cv2                                          # OpenCV
+import errors                                       # Custom Errors
+import analyser                                     # CV_Analyser
+import cache                                        # Result cache
+import writer                                       # Background image writer
+import histograms                                   # Histogram plots & bin export
+
+result_cache = None           # Per worker process result cache (see _worker_init())
+image_writer = None           # Per worker process background writer (see _worker_init())
+output_profile = "jpeg"       # Per worker process output profile (see _worker_init())
+histogram_formats = ("npy",)  # Per worker process histogram output formats (see _worker_init())
+
+OPERATIONS = {
+	"denoise": analyser.de_noise,
+	"gradient": analyser.get_gradient,
+	"edges": analyser.detect_edge,
+	"histogram": analyser.histogram_gen
+}
+
+HISTOGRAM_FORMATS = ("npy", "csv", "png")
+
+PLANS = {
+	"both": analyser.PLAN_BOTH,
+	"color": analyser.PLAN_COLOR,
+	"gray": analyser.PLAN_GRAY,
+	"derived": analyser.PLAN_DERIVED
+}
+
+
+PARAM_RANGES = {  # Accepted values of the operations' keyword arguments (see check_params())
+	"quality": range(3),
+	"mode": range(3),
+	"threshold_1": range(1 << 16),
+	"threshold_2": range(1 << 16),
+	"auto": range(-1, 2),
+	"bins": range(1, 257),
+	"plan": range(len(PLANS))
+}
+
+
+def check_params(name, params) -> None:
+	"""
+	Checks the keyword arguments of an operation against PARAM_RANGES (integers only) and the gradient precision
+	against analyser.gradient_depth(). Arrays (masks & histograms) can't be given as parameters
+
+	:param name: Operation name (see OPERATIONS)
+	:type name: str
+
+	:param params: Keyword arguments for the operation
+	:type params: dict
+
+	:raises errors.BatchOperationSpecError: If an argument is unknown or its value is out of range
+
+	:return: None
+	:rtype: None
+	"""
+
+	for key, value in params.items():
+		if key == "precision" and name == "gradient":
+			try:
+				analyser.gradient_depth(precision = value)
+			except errors.GradientPrecisionError:
+				raise errors.BatchOperationSpecError
+		elif key not in PARAM_RANGES or isinstance(value, bool) or not isinstance(value, int):
+			raise errors.BatchOperationSpecError
+		elif value not in PARAM_RANGES[key]:
+			raise errors.BatchOperationSpecError
+
+
+def parse_op(spec) -> (str, dict):
+	"""
+	Parses a single batch operation specification of the form 'name[:arg[,arg]]'
+
+	* denoise[:quality] -- quality is 0, 1 or 2 (default = 0)
+	* gradient[:mode] -- mode is 0 (Laplacian), 1 (Scharr X-Axis) or 2 (Scharr Y-Axis) (default = 0)
+	* edges[:threshold_1,threshold_2] -- hysteresis thresholds (default = 100,200)
+	* edges:auto or edges:otsu -- thresholds derived from the gray-scale histogram (median or Otsu based)
+	* histogram -- takes no arguments
+
+	:param spec: Operation specification
+	:type spec: str
+
+	:raises errors.BatchOperationSpecError: If the specification is malformed
+
+	:return: Operation name & the keyword arguments for the matching analyser function
+	:rtype: (str, dict)
+	"""
+
+	name, _, args = spec.partition(":")
+	name = name.strip().lower()
+	args = [i.strip() for i in args.split(",")] if args else []
+	try:
+		if name == "denoise" and len(args) <= 1:
+			params = {"quality": int(args[0])} if args else {}
+			if params.get("quality", 0) not in range(3):
+				raise errors.BatchOperationSpecError
+		elif name == "gradient" and len(args) <= 1:
+			params = {"mode": int(args[0])} if args else {}
+			if params.get("mode", 0) not in range(3):
+				raise errors.BatchOperationSpecError
+		elif name == "edges" and args in (["auto"], ["otsu"]):
+			params = {"auto": 0 if args[0] == "auto" else 1}
+		elif name == "edges" and len(args) in (0, 2):
+			params = {"threshold_1": int(args[0]), "threshold_2": int(args[1])} if args else {}
+		elif name == "histogram" and not args:
+			params = {}
+		else:
+			raise errors.BatchOperationSpecError
+	except ValueError:
+		raise errors.BatchOperationSpecError
+	check_params(name = name, params = params)
+	return name, params
+
+
+def parse_hist_formats(spec) -> tuple:
+	"""
+	Parses a comma separated list of histogram output formats (eg: 'npy,png')
+
+	:param spec: Format list
+	:type spec: str
+
+	:return: Formats, or None if any of them is unknown
+	:rtype: tuple[str]
+	"""
+
+	formats = tuple(i.strip().lower() for i in spec.split(",") if i.strip())
+	if not formats or any(i not in HISTOGRAM_FORMATS for i in formats):
+		return None
+	return formats
+
+
+def op_tag(name, params) -> str:
+	"""
+	Builds the file name suffix used for the outputs of an operation. The channel plan isn't part of it, as it only
+	decides which of the outputs are written
+
+	:param name: Operation name
+	:type name: str
+
+	:param params: Operation keyword arguments
+	:type params: dict
+
+	:return: File name suffix (eg: 'edges_100_200')
+	:rtype: str
+	"""
+
+	return "_".join([name] + [str(params[i]) for i in sorted(params) if i != "plan"])
+
+
+def run_op(color, gray, name, params) -> (object, numpy.ndarray):
+	"""
+	Runs one parsed operation through the matching analyser function
+
+	:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
+	:type color: numpy.ndarray
+
+	:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image)
+	:type gray: numpy.ndarray
+
+	:param name: Operation name (see parse_op())
+	:type name: str
+
+	:param params: Operation keyword arguments
+	:type params: dict
+
+	:return: The analyser function's outputs
+	:rtype: (numpy.ndarray or list, numpy.ndarray)
+	"""
+
+	func = OPERATIONS[name]
+	if result_cache is not None:
+		return result_cache.call(func, color = color, gray = gray, **params)
+	return func(color = color, gray = gray, **params)
+
+
+def write_result(out_dir, stem, name, result, background=None, profile="jpeg", hist_formats=("npy",)) -> str:
+	"""
+	Writes the outputs of one operation to out_dir.
+
+	Image outputs are written as '<stem>_color.<extension>' & '<stem>_gray.<extension>', in the output profile's format
+	(.jpeg by default). Histograms are written in each of hist_formats: 'npy' as '<stem>_color.npy' (3 x 256, B/G/R) &
+	'<stem>_gray.npy' (256), 'csv' as '<stem>.csv' (one row per bin) and 'png' as a plot, '<stem>.png' (see
+	histograms.render()). Outputs skipped by the channel plan (None) aren't written. With a background writer images
+	(plots included) are encoded concurrently and write failures are reported by its flush() instead
+
+	:param out_dir: Output directory
+	:type out_dir: str or Path
+
+	:param stem: Output file name stem
+	:type stem: str
+
+	:param name: Operation name (see parse_op())
+	:type name: str
+
+	:param result: The analyser function's outputs
+	:type result: (numpy.ndarray or list, numpy.ndarray)
+
+	:param background: Background writer the images are queued on (default = None, i.e., written before returning)
+	:type background: writer.ImageWriter
+
+	:param profile: Output profile specification for images (see analyser.parse_profile()) (default = "jpeg")
+	:type profile: str
+
+	:param hist_formats: Histogram output formats, from HISTOGRAM_FORMATS (default = ("npy",))
+	:type hist_formats: tuple[str]
+
+	:return: An error message (empty if the outputs were written, or queued, successfully)
+	:rtype: str
+	"""
+
+	out = Path(out_dir)
+	col_o, gray_o = result
+
+	extn = analyser.profile_extension(profile = profile)
+
+	def write(image, path, spec=profile) -> bool:
+		if background is not None:
+			background.submit(image = image, path = path, profile = spec)
+			return True
+		return analyser.write_img(image = image, path = path, profile = spec)
+
+	if name == "histogram":
+		if "npy" in hist_formats:
+			if col_o is not None:
+				numpy.save(str(out.joinpath(stem + "_color.npy")), numpy.array([i.ravel() for i in col_o]))
+			if gray_o is not None:
+				numpy.save(str(out.joinpath(stem + "_gray.npy")), gray_o.ravel())
+		if "csv" in hist_formats:
+			try:
+				histograms.export(color_hist = col_o, gray_hist = gray_o, path = out.joinpath(stem + ".csv"))
+			except OSError:
+				return "Unable to write " + stem + ".csv"
+		plot = histograms.render(color_hist = col_o, gray_hist = gray_o) if "png" in hist_formats else None
+		if plot is not None and not write(image = plot, path = out.joinpath(stem + ".png"), spec = "png"):
+			return "Unable to write " + stem + ".png"
+	else:
+		if col_o is not None and not write(image = col_o, path = out.joinpath(stem + "_color" + extn)):
+			return "Unable to write " + stem + "_color" + extn
+		if gray_o is not None and not write(image = gray_o, path = out.joinpath(stem + "_gray" + extn)):
+			return "Unable to write " + stem + "_gray" + extn
+	return ""
+
+
+def flush_writes() -> str:
+	"""
+	Waits for the worker's queued image writes
+
+	:return: An error message naming the first failed write (empty if every write succeeded)
+	:rtype: str
+	"""
+
+	if image_writer is None:
+		return ""
+	failures = image_writer.flush()
+	return "Unable to write " + Path(failures[0][0]).name if failures else ""
+
+
+def process_file(path, out_dir, ops, reduce=1) -> (str, str):
+	"""
+	Reads one image, runs every operation on the original image and writes the outputs to out_dir as
+	'<name>_<tag>_*' (see write_result())
+
+	:param path: Path to the input image
+	:type path: str
+
+	:param out_dir: Output directory
+	:type out_dir: str
+
+	:param ops: Parsed operations (see parse_op())
+	:type ops: list[(str, dict)]
+
+	:param reduce: Decode at 1/reduce of the full resolution (1, 2, 4 or 8) (default = 1)
+	:type reduce: int
+
+	:return: Input path & an error message (empty if the image was processed successfully)
+	:rtype: (str, str)
+	"""
+
+	message = ""
+	try:
+		color, gray, name = analyser.load_img(path = path, reduce = reduce)
+		if color is None or gray is None:
+			return path, "Unable to decode image!"
+		hist = None
+		for op, params in ops:
+			stem = name + "_" + op_tag(name = op, params = params)
+			if op == "edges" and "auto" in params and hist is not None:  # Reuse an earlier histogram operation
+				params = dict(params, hist = hist)
+			result = run_op(color = color, gray = gray, name = op, params = params)
+			if op == "histogram" and result[1] is not None:
+				hist = result[1]
+			message = write_result(
+					out_dir = out_dir,
+					stem = stem,
+					name = op,
+					result = result,
+					background = image_writer,
+					profile = output_profile,
+					hist_formats = histogram_formats
+			)
+			if message:
+				break
+	except (errors.FileDoesNotExistError, errors.FileIncorrectFormatError) as e:
+		message = e.message
+	except cv2.error as e:
+		message = "OpenCV error: " + str(e).strip()
+	except Exception as e:  # Any other failure only fails this image, the rest of the batch carries on
+		message = getattr(e, "message", None) or type(e).__name__ + ": " + str(e).strip()
+	written = flush_writes()  # Encoding overlaps the following operations; wait before reporting the image
+	return path, message or written
+
+
+def _worker_init(cache_dir=None, cache_bytes=0, profile="jpeg", hist_formats=("npy",)) -> None:
+	"""
+	Process pool initializer. Each worker runs single-threaded OpenCV so that the pool, not OpenCV, owns the cores,
+	and encodes its outputs on a background writer while it computes the next operation
+
+	:param cache_dir: Result cache directory shared by the workers (default = None, i.e., no caching)
+	:type cache_dir: str
+
+	:param cache_bytes: Size cap of the result cache (bytes)
+	:type cache_bytes: int
+
+	:param profile: Output profile specification for images (see analyser.parse_profile()) (default = "jpeg")
+	:type profile: str
+
+	:param hist_formats: Histogram output formats (see write_result()) (default = ("npy",))
+	:type hist_formats: tuple[str]
+
+	:return: None
+	:rtype: None
+	"""
+
+	global result_cache, image_writer, output_profile, histogram_formats
+	cv2.setNumThreads(1)
+	output_profile = profile
+	histogram_formats = tuple(hist_formats)
+	image_writer = writer.ImageWriter(on_done = None)
+	if cache_dir:
+		result_cache = cache.ResultCache(directory = cache_dir, max_bytes = cache_bytes)
+
+
+def _run_task(task, path, out_dir, ops, reduce) -> (str, str, int, int):
+	"""
+	Runs the per image function in a worker and counts its result cache hits & misses
+
+	:param task: Per image function (see run())
+	:type task: function
+
+	:param path: Path to the input image
+	:type path: str
+
+	:param out_dir: Output directory
+	:type out_dir: str
+
+	:param ops: Operations, passed on to task
+	:type ops: object
+
+	:param reduce: Decode at 1/reduce of the full resolution (1, 2, 4 or 8)
+	:type reduce: int
+
+	:return: Input path, error message (empty on success), cache hits & cache misses
+	:rtype: (str, str, int, int)
+	"""
+
+	hits, misses = (result_cache.hits, result_cache.misses) if result_cache is not None else (0, 0)
+	path, message = task(path, out_dir, ops, reduce)
+	if result_cache is None:
+		return path, message, 0, 0
+	return path, message, result_cache.hits - hits, result_cache.misses - misses
+
+
+def run(
+		in_dir,
+		out_dir,
+		ops,
+		workers=None,
+		reduce=1,
+		cache_dir=None,
+		cache_bytes=1 << 30,
+		task=process_file,
+		profile="jpeg",
+		hist_formats=("npy",)
+) -> (int, int, float):
+	"""
+	Processes every supported image in in_dir (non-recursive) over a process pool. With a result cache, its hits,
+	misses & size are printed at the end
+
+	:param in_dir: Input directory
+	:type in_dir: str
+
+	:param out_dir: Output directory (created if missing)
+	:type out_dir: str
+
+	:param ops: Parsed operations (see parse_op()), passed on to task
+	:type ops: list[(str, dict)]
+
+	:param workers: Number of worker processes (default = None, i.e., the number of CPUs)
+	:type workers: int
+
+	:param reduce: Decode at 1/reduce of the full resolution (1, 2, 4 or 8) (default = 1)
+	:type reduce: int
+
+	:param cache_dir: Result cache directory (default = None, i.e., no caching)
+	:type cache_dir: str
+
+	:param cache_bytes: Size cap of the result cache (bytes) (default = 1 GiB)
+	:type cache_bytes: int
+
+	:param task: Per image function, called as task(path, out_dir, ops, reduce) in the workers and returning the
+	input path & an error message (default = process_file)
+	:type task: function
+
+	:param profile: Output profile specification for images (see analyser.parse_profile()) (default = "jpeg")
+	:type profile: str
+
+	:param hist_formats: Histogram output formats (see write_result()) (default = ("npy",))
+	:type hist_formats: tuple[str]
+
+	:raises errors.BatchDirectoryError: If in_dir isn't a directory or out_dir can't be created
+
+	:return: Number of images processed successfully, number of failures & elapsed wall time (seconds)
+	:rtype: (int, int, float)
+	"""
+
+	in_path = Path(in_dir).resolve()
+	out_path = Path(out_dir).resolve()
+	if not in_path.is_dir():
+		raise errors.BatchDirectoryError
+	try:
+		out_path.mkdir(parents = True, exist_ok = True)
+	except (FileExistsError, PermissionError):
+		raise errors.BatchDirectoryError
+	files = sorted(str(i) for i in in_path.iterdir() if i.is_file() and i.suffix.lower() in analyser.FORMATS)
+	workers = workers or os.cpu_count() or 1
+	done, failed, hits, misses = 0, 0, 0, 0
+	start = perf_counter()
+	if files:
+		with ProcessPoolExecutor(
+				max_workers = workers,
+				initializer = _worker_init,
+				initargs = (cache_dir, cache_bytes, profile, tuple(hist_formats))
+		) as pool:
+			chunk = max(1, len(files) // (workers * 4))
+			results = pool.map(
+					_run_task,
+					[task] * len(files),
+					files,
+					[str(out_path)] * len(files),
+					[ops] * len(files),
+					[reduce] * len(files),
+					chunksize = chunk
+			)
+			for path, message, task_hits, task_misses in results:
+				hits += task_hits
+				misses += task_misses
+				if message:
+					failed += 1
+					print("ERROR: " + path + ": " + message)
+				else:
+					done += 1
+	elapsed = perf_counter() - start
+	if cache_dir:
+		size = cache.ResultCache(directory = cache_dir, max_bytes = cache_bytes).size
+		megabytes = (size / 2 ** 20, cache_bytes / 2 ** 20)
+		print("\nResult cache: %d hit(s), %d miss(es), %.1f of %.1f MiB" % ((hits, misses) + megabytes))
+	return done, failed, elapsed
+
+
+def main(argv) -> int:
+	"""
+	Command line entry point: 'main.py batch <in_dir> <out_dir> --op <spec> [--op <spec> ...] [--workers N]'
+
+	:param argv: Command line arguments following 'batch'
+	:type argv: list[str]
+
+	:return: Exit code (0 if every image was processed successfully, 1 if any image failed, 2 for usage errors)
+	:rtype: int
+	"""
+
+	parser = argparse.ArgumentParser(prog = "main.py batch", description = "Headless batch processing")
+	parser.add_argument("in_dir", help = "Directory containing the input images")
+	parser.add_argument("out_dir", help = "Directory the outputs are written to")
+	parser.add_argument(
+			"--op",
+			action = "append",
+			required = True,
+			help = "denoise[:quality], gradient[:mode], edges[:threshold_1,threshold_2|auto|otsu] or histogram (repeatable)"
+	)
+	parser.add_argument("--workers", type = int, default = None, help = "Worker processes (default = CPU count)")
+	parser.add_argument(
+			"--reduce",
+			type = int,
+			default = 1,
+			choices = sorted(analyser.REDUCED_FLAGS),
+			help = "Decode at 1/N resolution, for previews and statistics (default = 1)"
+	)
+	parser.add_argument("--cache", default = None, help = "Result cache directory (default = no caching)")
+	parser.add_argument("--cache-size", type = int, default = 1024, help = "Result cache size cap (MiB) (default = 1024)")
+	parser.add_argument(
+			"--plan",
+			default = "both",
+			choices = sorted(PLANS),
+			help = "Outputs to compute: both, color or gray only, or gray derived from the color result (default = both)"
+	)
+	parser.add_argument(
+			"--profile",
+			default = "jpeg",
+			help = "Image output profile: jpeg[:quality], png[:level], png1, webp, pbm or npy (default = jpeg)"
+	)
+	parser.add_argument(
+			"--hist-format",
+			default = "npy",
+			help = "Comma separated histogram outputs: npy (raw bins), csv (raw bins) and/or png (plot) (default = npy)"
+	)
+	args = parser.parse_args(argv)
+
+	try:
+		analyser.parse_profile(spec = args.profile)
+	except errors.OutputProfileError as e:
+		print("ERROR: " + e.message)
+		print("Unable to parse '" + args.profile + "'.\n")
+		return 2
+	hist_formats = parse_hist_formats(spec = args.hist_format)
+	if hist_formats is None:
+		print("ERROR: Unknown histogram format in '" + args.hist_format + "'.")
+		print("Valid formats are: " + ", ".join(HISTOGRAM_FORMATS) + ".\n")
+		return 2
+	ops = []
+	for spec in args.op:
+		try:
+			name, params = parse_op(spec = spec)
+			if PLANS[args.plan] != analyser.PLAN_BOTH:
+				params["plan"] = PLANS[args.plan]
+			ops.append((name, params))
+		except errors.BatchOperationSpecError as e:
+			print("ERROR: " + e.message)
+			print("Unable to parse '" + spec + "'.\n")
+			return 2
+	try:
+		done, failed, elapsed = run(
+				in_dir = args.in_dir,
+				out_dir = args.out_dir,
+				ops = ops,
+				workers = args.workers,
+				reduce = args.reduce,
+				cache_dir = args.cache,
+				cache_bytes = args.cache_size << 20,
+				profile = args.profile,
+				hist_formats = hist_formats
+		)
+	except errors.BatchDirectoryError as e:
+		print("ERROR: " + e.message)
+		print("Verify that the input directory exists and that the output directory is writable.\n")
+		return 2
+	rate = (done + failed) / elapsed if elapsed > 0 else 0.0
+	print("\nProcessed " + str(done) + " image(s), " + str(failed) + " failure(s) in " + "%.2f" % elapsed + " s")
+	print("Throughput: " + "%.2f" % rate + " images/second")
+	return 1 if failed else 0
@@ -0,0 +1,253 @@
+# coding=utf-8
+"""
+:Name: benchmark.py
+:Description: Benchmark suite for the analyser functions across image sizes, with baseline regression checks
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy and OpenCV
+
+Usage: python benchmark.py [--sizes vga,hd] [--repeat 3] [--output bench.json] [--baseline old.json]
+"""
+
+import argparse                # Command line parsing
+import json                    # Result files
+import platform                # Machine description
+import sys                     # Command line arguments
+import tracemalloc             # Peak memory
+from time import perf_counter  # Wall time
+import numpy                   # NumPy
+import cv2                     # OpenCV
+import analyser                # CV_Analyser
+import histograms              # Histogram engine
+
+SIZES = {
+	"vga": (480, 640),
+	"hd": (1080, 1920),
+	"12mp": (3000, 4000),
+	"24mp": (4000, 6000),
+	"50mp": (5773, 8660)
+}
+
+
+def synthetic_img(height, width, noise=0.0, seed=0) -> (numpy.ndarray, numpy.ndarray):
+	"""
+	Generates a reproducible test image: colour ramps overlaid with filled shapes (edges), plus optional noise
+
+	:param height: Image height (pixels)
+	:type height: int
+
+	:param width: Image width (pixels)
+	:type width: int
+
+	:param noise: Standard deviation of the additive Gaussian noise (8-bit levels) (default = 0.0)
+	:type noise: float
+
+	:param seed: Random seed (default = 0)
+	:type seed: int
+
+	:return: NumPy ndarray arrays (OpenCV Image Representations) (8-bit color & gray-scale images)
+	:rtype: (numpy.ndarray, numpy.ndarray)
+	"""
+
+	rng = numpy.random.default_rng(seed)
+	y = numpy.linspace(0, 255, height, dtype = numpy.float32)[:, None]
+	x = numpy.linspace(0, 255, width, dtype = numpy.float32)[None, :]
+	color = numpy.empty((height, width, 3), dtype = numpy.uint8)
+	color[..., 0] = x
+	color[..., 1] = y
+	color[..., 2] = (x + y) / 2
+	for _ in range(24):
+		center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+		radius = int(rng.integers(min(height, width) // 40 + 1, min(height, width) // 6 + 2))
+		cv2.circle(color, center, radius, [int(i) for i in rng.integers(0, 256, 3)], -1)
+	if noise > 0:
+		noisy = color.astype(numpy.float32)
+		noisy += rng.normal(0, noise, color.shape).astype(numpy.float32)
+		color = numpy.clip(noisy, 0, 255).astype(numpy.uint8)
+	return color, cv2.cvtColor(src = color, code = cv2.COLOR_BGR2GRAY)
+
+
+def cases(color, gray) -> list:
+	"""
+	Lists the benchmark cases for one image
+
+	:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
+	:type color: numpy.ndarray
+
+	:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image)
+	:type gray: numpy.ndarray
+
+	:return: Case names & zero-argument callables
+	:rtype: list[(str, function)]
+	"""
+
+	png = cv2.imencode(".png", color)[1]
+	jpeg = cv2.imencode(".jpeg", color, (cv2.IMWRITE_JPEG_QUALITY, 95))[1]
+	listing = [
+		("decode_img[png]", lambda: analyser.decode_img(buffer = png)),
+		("decode_img[jpeg]", lambda: analyser.decode_img(buffer = jpeg))
+	]
+	for q in range(3):
+		listing.append(("de_noise[quality=" + str(q) + "]", lambda q=q: analyser.de_noise(color, gray, quality = q)))
+	for m in range(3):
+		listing.append(("get_gradient[mode=" + str(m) + "]", lambda m=m: analyser.get_gradient(color, gray, mode = m)))
+	listing.append(("detect_edge", lambda: analyser.detect_edge(color = color, gray = gray)))
+	grid = [(i, j) for i in range(20, 220, 20) for j in range(100, 300, 20)]
+	listing.append(("detect_edge_sweep[10x10]", lambda: list(analyser.detect_edge_sweep(color, gray, pairs = grid))))
+	listing.append(("histogram_gen", lambda: analyser.histogram_gen(color = color, gray = gray)))
+	stack = numpy.stack([cv2.resize(src = color, dsize = (64, 64), interpolation = cv2.INTER_AREA)] * 64)
+	listing.append(("batch_histograms[64x64x64]", lambda: histograms.batch_histograms(images = stack)))
+	tiny = numpy.stack([cv2.resize(src = color, dsize = (16, 16), interpolation = cv2.INTER_AREA)] * 1024)
+	listing.append(("batch_histograms[1024x16x16]", lambda: histograms.batch_histograms(images = tiny)))
+	thumb, thumb_gray = tiny[0], cv2.cvtColor(src = tiny[0], code = cv2.COLOR_BGR2GRAY)
+	listing.append(("channel_histograms[16x16]", lambda: histograms.channel_histograms(color = thumb, gray = thumb_gray)))
+	return listing
+
+
+def measure(func, repeat) -> (float, int):
+	"""
+	Times a callable and measures its peak (Python/NumPy visible) memory in a separate, untimed run
+
+	:param func: Zero-argument callable
+	:type func: function
+
+	:param repeat: Number of timed runs
+	:type repeat: int
+
+	:return: Median wall time (seconds) & peak allocated bytes
+	:rtype: (float, int)
+	"""
+
+	times = []
+	for _ in range(repeat):
+		start = perf_counter()
+		func()
+		times.append(perf_counter() - start)
+	tracemalloc.start()
+	func()
+	peak = tracemalloc.get_traced_memory()[1]
+	tracemalloc.stop()
+	return float(numpy.median(times)), peak
+
+
+def run(sizes, repeat=3, only=None) -> dict:
+	"""
+	Runs every case on a clean and a noisy synthetic image of each size
+
+	:param sizes: Size names (see SIZES)
+	:type sizes: list[str]
+
+	:param repeat: Number of timed runs per case (default = 3)
+	:type repeat: int
+
+	:param only: Only run cases whose name contains one of these strings (default = None, i.e., every case)
+	:type only: list[str]
+
+	:return: Benchmark report
+	:rtype: dict
+	"""
+
+	results = []
+	for size in sizes:
+		height, width = SIZES[size]
+		for variant, noise in (("clean", 0.0), ("noisy", 20.0)):
+			color, gray = synthetic_img(height = height, width = width, noise = noise)
+			for name, func in cases(color = color, gray = gray):
+				if only and not any(i in name for i in only):
+					continue
+				seconds, peak = measure(func = func, repeat = repeat)
+				megapixels = height * width / 1e6
+				results.append({
+					"case": name,
+					"size": size,
+					"variant": variant,
+					"megapixels": megapixels,
+					"seconds": seconds,
+					"mp_per_s": megapixels / seconds if seconds > 0 else None,
+					"peak_bytes": peak
+				})
+				print("%-26s %-5s %-6s %10.4f s %10.2f MP/s %10.1f MiB" % (
+					name, size, variant, seconds, megapixels / max(seconds, 1e-9), peak / 2 ** 20
+				))
+	return {
+		"meta": {
+			"python": platform.python_version(),
+			"numpy": numpy.__version__,
+			"opencv": cv2.__version__,
+			"machine": platform.machine(),
+			"threads": cv2.getNumThreads(),
+			"repeat": repeat
+		},
+		"results": results
+	}
+
+
+def compare(report, baseline, tolerance=0.10) -> list:
+	"""
+	Compares a report against a baseline report
+
+	:param report: Current benchmark report
+	:type report: dict
+
+	:param baseline: Baseline benchmark report
+	:type baseline: dict
+
+	:param tolerance: Allowed slow-down before a case is flagged (fraction) (default = 0.10)
+	:type tolerance: float
+
+	:return: Regressions as (case, size, variant, baseline seconds, current seconds)
+	:rtype: list[(str, str, str, float, float)]
+	"""
+
+	old = {(i["case"], i["size"], i["variant"]): i["seconds"] for i in baseline["results"]}
+	regressions = []
+	for i in report["results"]:
+		key = (i["case"], i["size"], i["variant"])
+		if key in old and i["seconds"] > old[key] * (1 + tolerance):
+			regressions.append(key + (old[key], i["seconds"]))
+	return regressions
+
+
+def main(argv) -> int:
+	"""
+	Command line entry point
+
+	:param argv: Command line arguments
+	:type argv: list[str]
+
+	:return: Exit code (0 if no regressions were found, 1 otherwise)
+	:rtype: int
+	"""
+
+	parser = argparse.ArgumentParser(prog = "benchmark.py", description = "CV_Analyser benchmark suite")
+	parser.add_argument("--sizes", default = "vga,hd", help = "Comma separated sizes: " + ", ".join(SIZES))
+	parser.add_argument("--repeat", type = int, default = 3, help = "Timed runs per case (default = 3)")
+	parser.add_argument("--only", default = None, help = "Comma separated case name filters")
+	parser.add_argument("--output", default = "bench.json", help = "Report file (default = bench.json)")
+	parser.add_argument("--baseline", default = None, help = "Baseline report to compare against")
+	parser.add_argument("--tolerance", type = float, default = 0.10, help = "Allowed slow-down (default = 0.10)")
+	args = parser.parse_args(argv)
+
+	sizes = [i.strip() for i in args.sizes.split(",")]
+	for i in sizes:
+		if i not in SIZES:
+			parser.error("unknown size '" + i + "'")
+	only = [i.strip() for i in args.only.split(",")] if args.only else None
+	report = run(sizes = sizes, repeat = args.repeat, only = only)
+	with open(args.output, "w", encoding = "utf-8") as file:
+		json.dump(report, file, indent = 1)
+	print("\nReport written to " + args.output)
+	if args.baseline:
+		with open(args.baseline, encoding = "utf-8") as file:
+			baseline = json.load(file)
+		regressions = compare(report = report, baseline = baseline, tolerance = args.tolerance)
+		for case, size, variant, old, new in regressions:
+			print("REGRESSION: %s %s %s: %.4f s -> %.4f s (%+.1f%%)" % (case, size, variant, old, new, (new / old - 1) * 100))
+		if regressions:
+			return 1
+		print("No regressions against " + args.baseline)
+	return 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(argv = sys.argv[1:]))
@@ -0,0 +1,232 @@
+# coding=utf-8
+"""
+:Name: cache.py
+:Description: Content-addressed on-disk cache for the results of the analyser functions
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy
+"""
+
+import hashlib                  # Content hashing
+import os                       # File statistics, atomic replacement & access time updates
+from pathlib import Path        # For resolving paths
+from zipfile import BadZipFile  # Corrupt cache entries
+import numpy                    # NumPy
+
+CACHE_VERSION = 2  # Mixed into every key; bump it whenever an operation's output changes, so stale entries are missed
+
+
+def pack(result, prefix="") -> (dict, list):
+	"""
+	Flattens an analyser result into named arrays for a NumPy archive
+
+	:param result: Analyser result (a tuple of NumPy ndarray arrays, lists of arrays or None)
+	:type result: tuple
+
+	:param prefix: Prefix of the array names (default = "")
+	:type prefix: str
+
+	:return: Named arrays & the layout of the result (-1 for an array, -2 for None, n for a list of n arrays)
+	:rtype: (dict, list[int])
+	"""
+
+	arrays, layout = {}, []
+	for i, item in enumerate(result):
+		if item is None:
+			layout.append(-2)
+		elif isinstance(item, numpy.ndarray):
+			layout.append(-1)
+			arrays[prefix + str(i)] = item
+		else:
+			layout.append(len(item))
+			for j, sub in enumerate(item):
+				arrays[prefix + str(i) + "_" + str(j)] = sub
+	return arrays, layout
+
+
+def unpack(archive, layout, prefix="") -> tuple:
+	"""
+	Rebuilds an analyser result flattened by pack()
+
+	:param archive: Loaded NumPy archive (or any mapping of the array names)
+	:type archive: numpy.lib.npyio.NpzFile
+
+	:param layout: Layout of the result (see pack())
+	:type layout: list[int]
+
+	:param prefix: Prefix of the array names (default = "")
+	:type prefix: str
+
+	:return: Analyser result
+	:rtype: tuple
+	"""
+
+	result = []
+	for i, count in enumerate(layout):
+		if count == -1:
+			result.append(archive[prefix + str(i)])
+		elif count == -2:
+			result.append(None)
+		else:
+			result.append([archive[prefix + str(i) + "_" + str(j)] for j in range(count)])
+	return tuple(result)
+
+
+class ResultCache(object):
+	"""
+	Caches analyser results on disk, keyed by a hash of the input pixels plus the operation and its parameters.
+
+	Each result is stored as a compressed NumPy archive (.npz). The least recently used entries are evicted once the
+	total size of the cache exceeds max_bytes. Entries are written atomically, so a cache directory may be shared by
+	several processes (the size accounting is then approximate)
+	"""
+
+	def __init__(self, directory, max_bytes=1 << 30):
+		"""
+		:param directory: Cache directory (created if missing)
+		:type directory: str or Path
+
+		:param max_bytes: Size cap of the cache (bytes) (default = 1 GiB)
+		:type max_bytes: int
+		"""
+
+		self.directory = Path(directory).resolve()
+		self.directory.mkdir(parents = True, exist_ok = True)
+		self.max_bytes = max_bytes
+		self.hits = 0
+		self.misses = 0
+		self.size = sum(i.stat().st_size for i in self.directory.glob("*.npz"))
+
+	@staticmethod
+	def key(op, params, arrays) -> str:
+		"""
+		Builds the cache key of an operation (including CACHE_VERSION)
+
+		:param op: Operation name
+		:type op: str
+
+		:param params: Non-image parameters of the operation
+		:type params: dict
+
+		:param arrays: Input images, in argument order
+		:type arrays: list[numpy.ndarray]
+
+		:return: Hexadecimal digest
+		:rtype: str
+		"""
+
+		digest = hashlib.blake2b(digest_size = 20)
+		digest.update(repr((CACHE_VERSION, op, sorted(params.items()))).encode("utf-8"))
+		for i in arrays:
+			i = numpy.ascontiguousarray(i)
+			digest.update(repr((i.shape, i.dtype.str)).encode("utf-8"))
+			digest.update(memoryview(i).cast("B"))
+		return digest.hexdigest()
+
+	def get(self, key) -> tuple:
+		"""
+		Looks up a cached result and marks it as recently used
+
+		:param key: Cache key (see key())
+		:type key: str
+
+		:return: The cached result, or None on a miss
+		:rtype: tuple
+		"""
+
+		path = self.directory.joinpath(key + ".npz")
+		try:
+			with numpy.load(str(path)) as archive:
+				result = unpack(archive = archive, layout = archive["layout"])
+			os.utime(str(path))
+		except (OSError, KeyError, ValueError, BadZipFile):
+			self.misses += 1
+			return None
+		self.hits += 1
+		return result
+
+	def put(self, key, result) -> None:
+		"""
+		Stores a result, then evicts the least recently used entries if the cache is over its size cap
+
+		:param key: Cache key (see key())
+		:type key: str
+
+		:param result: Analyser result (a tuple of NumPy ndarray arrays, lists of arrays or None)
+		:type result: tuple
+
+		:return: None
+		:rtype: None
+		"""
+
+		arrays, layout = pack(result = result)
+		path = self.directory.joinpath(key + ".npz")
+		temp = self.directory.joinpath(key + "." + str(os.getpid()) + ".tmp")
+		with open(str(temp), "wb") as file:
+			numpy.savez_compressed(file, layout = numpy.array(layout), **arrays)
+		os.replace(str(temp), str(path))
+		self.size += path.stat().st_size
+		if self.size > self.max_bytes:
+			self.evict()
+
+	def evict(self) -> None:
+		"""
+		Removes the least recently used entries until the cache is within its size cap
+
+		:return: None
+		:rtype: None
+		"""
+
+		entries = []
+		for i in self.directory.glob("*.npz"):
+			try:
+				stat = i.stat()
+				entries.append((stat.st_mtime, stat.st_size, i))
+			except FileNotFoundError:  # Evicted by another process
+				pass
+		entries.sort()
+		self.size = sum(i[1] for i in entries)
+		for _, size, path in entries:
+			if self.size <= self.max_bytes:
+				break
+			try:
+				path.unlink()
+			except FileNotFoundError:
+				pass
+			self.size -= size
+
+	def call(self, func, **kwargs) -> tuple:
+		"""
+		Runs an analyser function through the cache. NumPy ndarray keyword arguments are hashed by their pixels, all
+		other keyword arguments by their value
+
+		:param func: Analyser function (eg: analyser.de_noise)
+		:type func: function
+
+		:param kwargs: Keyword arguments for func
+		:type kwargs: dict
+
+		:return: The (possibly cached) result of func
+		:rtype: tuple
+		"""
+
+		names = sorted(kwargs)
+		arrays = [kwargs[i] for i in names if isinstance(kwargs[i], numpy.ndarray)]
+		params = {i: kwargs[i] for i in names if not isinstance(kwargs[i], numpy.ndarray)}
+		params["arrays"] = tuple(i for i in names if isinstance(kwargs[i], numpy.ndarray))
+		key = self.key(op = func.__module__ + "." + func.__name__, params = params, arrays = arrays)
+		result = self.get(key = key)
+		if result is None:
+			result = tuple(func(**kwargs))
+			self.put(key = key, result = result)
+		return result
+
+	def stats(self) -> dict:
+		"""
+		Returns the cache counters
+
+		:return: Hits, misses, current size (bytes) & size cap (bytes)
+		:rtype: dict
+		"""
+
+		return {"hits": self.hits, "misses": self.misses, "size": self.size, "max_bytes": self.max_bytes}
@@ -187,3 +187,137 @@ class IncorrectEdgeUpperThresholdRetryResponseError(Exception):
 	def __init__(self):
 		self.message = "Incorrect response error (edge detection - upper threshold retry prompt)!"
 		super(IncorrectEdgeUpperThresholdRetryResponseError, self).__init__(self.message)
+
+
+class BatchOperationSpecError(Exception):
+	"""
+	Raised when a batch operation specification (--op) cannot be parsed
+	"""
+
+	def __init__(self):
+		self.message = "Incorrect batch operation specification error!"
+		super(BatchOperationSpecError, self).__init__(self.message)
+
+
+class BatchDirectoryError(Exception):
+	"""
+	Raised when the batch input path isn't a directory or the output path can't be used as one
+	"""
+
+	def __init__(self):
+		self.message = "Batch directory error!"
+		super(BatchDirectoryError, self).__init__(self.message)
+
+
+class HistogramAccumulatorMismatchError(Exception):
+	"""
+	Raised when merging histogram accumulators (or ingesting images) with differing bin or channel counts
+	"""
+
+	def __init__(self):
+		self.message = "Histogram accumulator bins/channels mismatch error!"
+		super(HistogramAccumulatorMismatchError, self).__init__(self.message)
+
+
+class VideoSourceError(Exception):
+	"""
+	Raised when a video file or frame sequence can't be opened for reading
+	"""
+
+	def __init__(self):
+		self.message = "Unable to open video source error!"
+		super(VideoSourceError, self).__init__(self.message)
+
+
+class VideoTargetError(Exception):
+	"""
+	Raised when a video file or frame sequence can't be opened for writing
+	"""
+
+	def __init__(self):
+		self.message = "Unable to open video target error!"
+		super(VideoTargetError, self).__init__(self.message)
+
+
+class RecipeError(Exception):
+	"""
+	Raised when a pipeline recipe can't be read or describes an invalid graph. 'detail' names the offending part
+	"""
+
+	def __init__(self, detail=""):
+		self.message = "Invalid pipeline recipe error!"
+		self.detail = detail
+		super(RecipeError, self).__init__(self.message)
+
+
+class ChannelPlanOutOfRangeError(Exception):
+	"""
+	Raised when the user selects a channel plan which is out of range
+	"""
+
+	def __init__(self):
+		self.message = "Channel plan out of range error!"
+		super(ChannelPlanOutOfRangeError, self).__init__(self.message)
+
+
+class RegionOfInterestError(Exception):
+	"""
+	Raised when a region of interest is missing, empty or lies outside the image
+	"""
+
+	def __init__(self):
+		self.message = "Invalid region of interest error!"
+		super(RegionOfInterestError, self).__init__(self.message)
+
+
+class OutputProfileError(Exception):
+	"""
+	Raised when an output profile specification is unknown or its level is out of range
+	"""
+
+	def __init__(self):
+		self.message = "Incorrect output profile error!"
+		super(OutputProfileError, self).__init__(self.message)
+
+
+class LoadedImageOutOfRangeError(Exception):
+	"""
+	Raised when the user selects a loaded image which is out of range
+	"""
+
+	def __init__(self):
+		self.message = "Loaded image out of range error!"
+		super(LoadedImageOutOfRangeError, self).__init__(self.message)
+
+
+class IncorrectWorkingImageResponseError(Exception):
+	"""
+	Raised when the user enters an incorrect response to the working image replacement prompt
+	"""
+
+	def __init__(self):
+		self.message = "Incorrect response error (working image replacement prompt)!"
+		super(IncorrectWorkingImageResponseError, self).__init__(self.message)
+
+
+class GradientPrecisionError(Exception):
+	"""
+	Raised when a gradient is requested at an unsupported precision (data-type)
+	"""
+
+	def __init__(self):
+		self.message = (
+			"Unsupported gradient precision error (int16, float32 or float64; float32 or float64 only for polar "
+			"gradients)!"
+		)
+		super(GradientPrecisionError, self).__init__(self.message)
+
+
+class ImageDecodeError(Exception):
+	"""
+	Raised when an image file can't be decoded (eg: it is empty or corrupt)
+	"""
+
+	def __init__(self):
+		self.message = "Image decoding error!"
+		super(ImageDecodeError, self).__init__(self.message)
@@ -0,0 +1,487 @@
+# coding=utf-8
+"""
+:Name: histograms.py
+:Description: Histogram engine (multi-channel, joint color and batched histograms), with a NumPy plot
+rasterizer and raw bin export
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy and OpenCV
+"""
+
+import io      # In-memory CSV
+import numpy   # NumPy
+import cv2     # OpenCV
+import errors  # Custom Errors
+
+CURVE_COLORS = ((255, 0, 0), (0, 160, 0), (0, 0, 255))  # B, G & R curves (BGR)
+GRAY_COLOR = (64, 64, 64)                               # Gray-scale curve (BGR)
+CHUNK_PIXELS = 1 << 24                                  # cv2.calcHist() counts in float32, exact up to 2 ** 24 per bin
+BINCOUNT_PIXELS = 64 * 64                               # Largest image counted by a single bincount, faster up to here
+
+
+def _as_mask(mask) -> numpy.ndarray:
+	"""
+	Converts a mask to the 8-bit form cv2.calcHist() takes
+
+	:param mask: Mask (non-zero where pixels are counted), or None
+	:type mask: numpy.ndarray
+
+	:return: 8-bit mask, or None
+	:rtype: numpy.ndarray
+	"""
+
+	if mask is None or mask.dtype == numpy.uint8:
+		return mask
+	return (mask != 0).view(numpy.uint8)
+
+
+def _plane(image, channel, bins, mask) -> numpy.ndarray:
+	"""
+	Counts the values of one channel of an 8-bit image with cv2.calcHist(), in bands of at most CHUNK_PIXELS pixels
+	so that the counts stay exact on large images
+
+	:param image: NumPy ndarray array (OpenCV Image Representation) (8-bit image)
+	:type image: numpy.ndarray
+
+	:param channel: Channel index
+	:type channel: int
+
+	:param bins: Number of bins, spread evenly over 0-255
+	:type bins: int
+
+	:param mask: 8-bit mask (non-zero where pixels are counted), or None
+	:type mask: numpy.ndarray
+
+	:return: Counts, shaped (bins,)
+	:rtype: numpy.ndarray
+	"""
+
+	rows = max(CHUNK_PIXELS // max(image.shape[1], 1), 1)
+	counts = numpy.zeros(bins, dtype = numpy.int64)
+	for top in range(0, image.shape[0], rows):
+		counts += cv2.calcHist(
+				images = [image[top:top + rows]],
+				channels = [channel],
+				mask = None if mask is None else mask[top:top + rows],
+				histSize = [bins],
+				ranges = [0, 256]
+		)[:, 0].astype(numpy.int64)
+	return counts
+
+
+def _bincount(planes, bins, mask) -> numpy.ndarray:
+	"""
+	Counts the values of equally sized 8-bit planes in a single pass, with one bincount over
+	(plane index * bins + bin)
+
+	:param planes: Planes, one per row, shaped (P, pixels)
+	:type planes: numpy.ndarray
+
+	:param bins: Number of bins per plane, spread evenly over 0-255
+	:type bins: int
+
+	:param mask: Mask (non-zero where pixels are counted), of any shape with the planes' number of pixels, or None
+	:type mask: numpy.ndarray
+
+	:return: Counts, shaped (P, bins)
+	:rtype: numpy.ndarray
+	"""
+
+	if mask is not None:
+		planes = planes[:, mask.reshape(-1) != 0]
+	if bins == 256:
+		codes = planes.astype(numpy.intp)
+	else:
+		codes = ((numpy.arange(256, dtype = numpy.intp) * bins) // 256)[planes]
+	codes += (numpy.arange(planes.shape[0], dtype = numpy.intp) * bins)[:, None]
+	return numpy.bincount(codes.ravel(), minlength = planes.shape[0] * bins).reshape(planes.shape[0], bins)
+
+
+def channel_histograms(color, gray=None, bins=256, mask=None) -> numpy.ndarray:
+	"""
+	Computes the B, G, R (and gray-scale) histograms. Small images (up to BINCOUNT_PIXELS) are counted in a single
+	pass over every plane; larger ones with one cv2.calcHist() call per plane, which is faster there (see
+	benchmark.py's histogram cases)
+
+	:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
+	:type color: numpy.ndarray
+
+	:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image) (default = None)
+	:type gray: numpy.ndarray
+
+	:param bins: Number of bins per channel, spread evenly over 0-255 (default = 256)
+	:type bins: int
+
+	:param mask: Only pixels where the 8-bit mask is non-zero are counted (default = None, i.e., every pixel)
+	:type mask: numpy.ndarray
+
+	:return: Pixel counts, one row per channel (B, G, R, then gray-scale if given), shaped (3 or 4, bins)
+	:rtype: numpy.ndarray
+	"""
+
+	channels = color.shape[2] if len(color.shape) == 3 else 1
+	if color.shape[0] * color.shape[1] <= BINCOUNT_PIXELS:
+		planes = color.reshape(-1, channels).T
+		if gray is not None:
+			planes = numpy.vstack((planes, gray.reshape(1, -1)))
+		return _bincount(planes = planes, bins = bins, mask = mask)
+	mask = _as_mask(mask = mask)
+	planes = [(color, i) for i in range(channels)]
+	if gray is not None:
+		planes.append((gray, 0))
+	return numpy.stack([_plane(image = i, channel = j, bins = bins, mask = mask) for i, j in planes])
+
+
+def joint_histogram(color, bins=32, channels=(0, 1, 2), mask=None) -> numpy.ndarray:
+	"""
+	Computes a joint (2D or 3D) color histogram
+
+	:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
+	:type color: numpy.ndarray
+
+	:param bins: Number of bins per channel, spread evenly over 0-255 (default = 32)
+	:type bins: int
+
+	:param channels: Channel indices to combine (2 or 3 of 0 (B), 1 (G) & 2 (R)) (default = (0, 1, 2))
+	:type channels: tuple[int]
+
+	:param mask: Only pixels where the 8-bit mask is non-zero are counted (default = None, i.e., every pixel)
+	:type mask: numpy.ndarray
+
+	:return: Pixel counts, shaped (bins, bins) or (bins, bins, bins)
+	:rtype: numpy.ndarray
+	"""
+
+	return cv2.calcHist(
+			images = [color],
+			channels = list(channels),
+			mask = mask,
+			histSize = [bins] * len(channels),
+			ranges = [0, 256] * len(channels)
+	)
+
+
+def batch_histograms(images, bins=256, mask=None) -> numpy.ndarray:
+	"""
+	Computes the per-channel histograms of a stack of equally sized images. Stacks of small images (up to
+	BINCOUNT_PIXELS each) are counted with a single bincount per channel over the whole stack; larger images image by
+	image (see channel_histograms())
+
+	:param images: Stacked 8-bit images, shaped (N, H, W) or (N, H, W, C)
+	:type images: numpy.ndarray
+
+	:param bins: Number of bins per channel, spread evenly over 0-255 (default = 256)
+	:type bins: int
+
+	:param mask: Only pixels where the 8-bit (H, W) mask is non-zero are counted (default = None, i.e., every pixel)
+	:type mask: numpy.ndarray
+
+	:return: Pixel counts, shaped (N, C, bins)
+	:rtype: numpy.ndarray
+	"""
+
+	count, channels = images.shape[0], images.shape[3] if len(images.shape) == 4 else 1
+	if count == 0:
+		return numpy.zeros((0, channels, bins), dtype = numpy.int64)
+	if images.shape[1] * images.shape[2] <= BINCOUNT_PIXELS:
+		pixels = images.reshape(count, -1, channels)
+		return numpy.stack(
+				[_bincount(planes = pixels[:, :, i], bins = bins, mask = mask) for i in range(channels)],
+				axis = 1
+		)
+	mask = _as_mask(mask = mask)
+	return numpy.stack([channel_histograms(color = i, bins = bins, mask = mask) for i in images])
+
+
+class HistogramAccumulator(object):
+	"""
+	Accumulates per-channel histograms over an image set or a video, one image (frame) at a time, in constant memory.
+
+	Accumulators built by different workers are merged by addition ('total = a + b' or 'a += b'). Summaries (mean,
+	percentiles & entropy) are computed from the counts alone, without re-reading any pixels
+	"""
+
+	def __init__(self, bins=256, channels=4):
+		"""
+		:param bins: Number of bins per channel (default = 256)
+		:type bins: int
+
+		:param channels: Number of channels, 4 for B, G, R & gray-scale, 3 for B, G & R, 1 for gray-scale only
+		(default = 4)
+		:type channels: int
+		"""
+
+		self.bins = bins
+		self.counts = numpy.zeros((channels, bins), dtype = numpy.int64)
+		self.images = 0
+
+	def add(self, color, gray=None, mask=None) -> "HistogramAccumulator":
+		"""
+		Ingests one image (or frame)
+
+		:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color or gray-scale image)
+		:type color: numpy.ndarray
+
+		:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image) (default = None)
+		:type gray: numpy.ndarray
+
+		:param mask: Only pixels where the 8-bit mask is non-zero are counted (default = None, i.e., every pixel)
+		:type mask: numpy.ndarray
+
+		:raises errors.HistogramAccumulatorMismatchError: If the image's channels don't match the accumulator's
+
+		:return: The accumulator itself
+		:rtype: HistogramAccumulator
+		"""
+
+		counts = channel_histograms(color = color, gray = gray, bins = self.bins, mask = mask)
+		if counts.shape != self.counts.shape:
+			raise errors.HistogramAccumulatorMismatchError
+		self.counts += counts
+		self.images += 1
+		return self
+
+	def __iadd__(self, other) -> "HistogramAccumulator":
+		if self.counts.shape != other.counts.shape:
+			raise errors.HistogramAccumulatorMismatchError
+		self.counts += other.counts
+		self.images += other.images
+		return self
+
+	def __add__(self, other) -> "HistogramAccumulator":
+		total = HistogramAccumulator(bins = self.bins, channels = self.counts.shape[0])
+		total += self
+		total += other
+		return total
+
+	def centers(self) -> numpy.ndarray:
+		"""
+		Returns the 8-bit value at the centre of each bin
+
+		:return: Bin centres
+		:rtype: numpy.ndarray
+		"""
+
+		return (numpy.arange(self.bins) + 0.5) * 256 / self.bins - 0.5
+
+	def pixels(self) -> numpy.ndarray:
+		"""
+		Returns the number of pixels counted per channel
+
+		:return: Pixel totals, one per channel
+		:rtype: numpy.ndarray
+		"""
+
+		return self.counts.sum(axis = 1)
+
+	def mean(self) -> numpy.ndarray:
+		"""
+		Returns the mean value of each channel
+
+		:return: Means, one per channel (NaN for channels without pixels)
+		:rtype: numpy.ndarray
+		"""
+
+		with numpy.errstate(invalid = "ignore", divide = "ignore"):
+			return self.counts @ self.centers() / self.pixels()
+
+	def percentile(self, q) -> numpy.ndarray:
+		"""
+		Returns the q-th percentile of each channel, at bin resolution
+
+		:param q: Percentile (0-100)
+		:type q: float
+
+		:return: Percentiles, one per channel (NaN for channels without pixels)
+		:rtype: numpy.ndarray
+		"""
+
+		cumulative = numpy.cumsum(self.counts, axis = 1)
+		targets = cumulative[:, -1] * (q / 100.0)
+		index = [numpy.searchsorted(cumulative[i], max(targets[i], 1)) for i in range(cumulative.shape[0])]
+		values = self.centers()[numpy.minimum(index, self.bins - 1)]
+		return numpy.where(cumulative[:, -1] > 0, values, numpy.nan)
+
+	def entropy(self) -> numpy.ndarray:
+		"""
+		Returns the Shannon entropy (bits) of each channel
+
+		:return: Entropies, one per channel
+		:rtype: numpy.ndarray
+		"""
+
+		with numpy.errstate(invalid = "ignore", divide = "ignore"):
+			p = self.counts / self.pixels()[:, None]
+			return numpy.where(p > 0, -p * numpy.log2(p), 0.0).sum(axis = 1)
+
+	def summary(self, percentiles=(1, 5, 25, 50, 75, 95, 99)) -> dict:
+		"""
+		Returns the running summary of every channel
+
+		:param percentiles: Percentiles to report (default = (1, 5, 25, 50, 75, 95, 99))
+		:type percentiles: tuple[float]
+
+		:return: Image & pixel counts, means, entropies and percentiles (lists with one entry per channel)
+		:rtype: dict
+		"""
+
+		return {
+			"images": self.images,
+			"pixels": self.pixels().tolist(),
+			"mean": self.mean().tolist(),
+			"entropy": self.entropy().tolist(),
+			"percentiles": {str(i): self.percentile(q = i).tolist() for i in percentiles}
+		}
+
+
+def rasterize(curves, colors, width=512, height=256, log=False) -> numpy.ndarray:
+	"""
+	Draws histogram curves straight into an image (white background, quarter grid lines), without a plotting
+	backend. Each curve is scaled to the highest bin of all the curves; a column spanning several bins shows their
+	maximum, so narrow peaks survive downscaling
+
+	:param curves: Histograms (any shape, flattened to their bins)
+	:type curves: list[numpy.ndarray]
+
+	:param colors: Curve colors (BGR), one per curve
+	:type colors: list[(int, int, int)]
+
+	:param width: Image width (pixels) (default = 512)
+	:type width: int
+
+	:param height: Image height (pixels) (default = 256)
+	:type height: int
+
+	:param log: Logarithmic counts (default = False)
+	:type log: bool
+
+	:return: 8-bit color image
+	:rtype: numpy.ndarray
+	"""
+
+	canvas = numpy.full((height, width, 3), 255, dtype = numpy.uint8)
+	canvas[(numpy.arange(1, 4) * height) // 4, :] = 225
+	canvas[:, (numpy.arange(1, 4) * width) // 4] = 225
+	curves = [numpy.asarray(i, dtype = numpy.float64).ravel() for i in curves]
+	if log:
+		curves = [numpy.log1p(i) for i in curves]
+	peak = max([i.max() for i in curves if i.size] + [0.0]) or 1.0
+	rows = numpy.arange(height)[:, None]
+	columns = numpy.arange(width)
+	for curve, color in zip(curves, colors):
+		if not curve.size:
+			continue
+		values = numpy.maximum.reduceat(curve, (columns * curve.size) // width)
+		y = (height - 1) - numpy.rint(values / peak * (height - 1)).astype(numpy.intp)
+		previous = numpy.concatenate((y[:1], y[:-1]))  # Joins each column to the previous one
+		canvas[(rows >= numpy.minimum(previous, y)) & (rows <= numpy.maximum(previous, y))] = color
+	return canvas
+
+
+def render(color_hist=None, gray_hist=None, width=512, height=256, log=False) -> numpy.ndarray:
+	"""
+	Draws the outputs of analyser.histogram_gen(): the B, G & R curves above the gray-scale curve
+
+	:param color_hist: B, G & R histograms (default = None, i.e., no color plot)
+	:type color_hist: list[numpy.ndarray]
+
+	:param gray_hist: Gray-scale histogram (default = None, i.e., no gray-scale plot)
+	:type gray_hist: numpy.ndarray
+
+	:param width: Image width (pixels) (default = 512)
+	:type width: int
+
+	:param height: Height of each plot (pixels) (default = 256)
+	:type height: int
+
+	:param log: Logarithmic counts (default = False)
+	:type log: bool
+
+	:return: 8-bit color image (None if both histograms are None)
+	:rtype: numpy.ndarray
+	"""
+
+	plots = []
+	if color_hist is not None:
+		plots.append(rasterize(curves = color_hist, colors = CURVE_COLORS, width = width, height = height, log = log))
+	if gray_hist is not None:
+		plots.append(rasterize(curves = [gray_hist], colors = [GRAY_COLOR], width = width, height = height, log = log))
+	if not plots:
+		return None
+	separator = numpy.full((2, width, 3), 128, dtype = numpy.uint8)
+	return numpy.vstack([j for i in plots for j in (i, separator)][:-1])
+
+
+def table(color_hist=None, gray_hist=None) -> (list, numpy.ndarray):
+	"""
+	Arranges the outputs of analyser.histogram_gen() as a table, one row per bin
+
+	:param color_hist: B, G & R histograms (default = None)
+	:type color_hist: list[numpy.ndarray]
+
+	:param gray_hist: Gray-scale histogram (default = None)
+	:type gray_hist: numpy.ndarray
+
+	:return: Column names ('bin', then 'blue', 'green' & 'red' and/or 'gray') & the (bins, columns) table
+	:rtype: (list[str], numpy.ndarray)
+	"""
+
+	names, columns = [], []
+	if color_hist is not None:
+		names += ["blue", "green", "red"]
+		columns += [numpy.asarray(i, dtype = numpy.float64).ravel() for i in color_hist]
+	if gray_hist is not None:
+		names.append("gray")
+		columns.append(numpy.asarray(gray_hist, dtype = numpy.float64).ravel())
+	bins = len(columns[0]) if columns else 0
+	return ["bin"] + names, numpy.column_stack([numpy.arange(bins, dtype = numpy.float64)] + columns)
+
+
+def to_csv(color_hist=None, gray_hist=None) -> str:
+	"""
+	Formats the outputs of analyser.histogram_gen() as CSV, one row per bin (see table())
+
+	:param color_hist: B, G & R histograms (default = None)
+	:type color_hist: list[numpy.ndarray]
+
+	:param gray_hist: Gray-scale histogram (default = None)
+	:type gray_hist: numpy.ndarray
+
+	:return: CSV text, with a header row
+	:rtype: str
+	"""
+
+	names, rows = table(color_hist = color_hist, gray_hist = gray_hist)
+	stream = io.StringIO()
+	numpy.savetxt(stream, rows, fmt = "%.10g", delimiter = ",", header = ",".join(names), comments = "")
+	return stream.getvalue()
+
+
+def export(color_hist, gray_hist, path) -> None:
+	"""
+	Writes the outputs of analyser.histogram_gen() to a .csv (see to_csv()), .npy (the (bins, columns) table of
+	table(), bin numbers first) or image file (see render(); any format OpenCV writes, eg: .png)
+
+	:param color_hist: B, G & R histograms (or None)
+	:type color_hist: list[numpy.ndarray]
+
+	:param gray_hist: Gray-scale histogram (or None)
+	:type gray_hist: numpy.ndarray
+
+	:param path: Output path; the extension selects the format
+	:type path: str or Path
+
+	:raises OSError: If the file can't be written
+
+	:return: None
+	:rtype: None
+	"""
+
+	path = str(path)
+	if path.lower().endswith(".csv"):
+		with open(path, "w", encoding = "utf-8", newline = "") as file:
+			file.write(to_csv(color_hist = color_hist, gray_hist = gray_hist))
+	elif path.lower().endswith(".npy"):
+		numpy.save(path, table(color_hist = color_hist, gray_hist = gray_hist)[1])
+	elif not cv2.imwrite(path, render(color_hist = color_hist, gray_hist = gray_hist)):
+		raise OSError("Unable to write " + path)
@@ -0,0 +1,211 @@
+# coding=utf-8
+"""
+:Name: history.py
+:Description: Undo/redo history of a working image, stored as compressed deltas between consecutive versions
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy
+
+Only the current version of the image is kept whole. Each step stores, per image (color & gray-scale), the difference
+between the versions before and after it (modulo 256), compressed with zlib. The same delta restores either version
+from the other, so stepping back or forth is a decompression and an addition, never a recomputation. An image the
+step left unchanged costs nothing: the versions share the array
+"""
+
+import zlib   # Delta compression
+import numpy  # NumPy
+
+MAX_BYTES = 256 << 20  # Default memory budget of a history (bytes)
+LEVEL = 1              # zlib compression level (fastest; deltas of filtered images compress well at any level)
+
+
+def _encode(before, after) -> dict:
+	"""
+	Encodes the change of one image over a step
+
+	:param before: NumPy ndarray array (OpenCV Image Representation) before the step
+	:type before: numpy.ndarray
+
+	:param after: NumPy ndarray array (OpenCV Image Representation) after the step
+	:type after: numpy.ndarray
+
+	:return: None if the image is unchanged, otherwise the compressed delta (or, if the shape or type changed, both
+	versions)
+	:rtype: dict
+	"""
+
+	if before is after or (before.shape == after.shape and before.dtype == after.dtype and
+			numpy.array_equal(before, after)):
+		return None
+	if before.shape == after.shape and before.dtype == after.dtype == numpy.uint8:
+		delta = numpy.subtract(before, after, dtype = numpy.uint8)  # Wraps around modulo 256
+		return {"delta": zlib.compress(delta.tobytes(), LEVEL), "shape": after.shape}
+	return {
+		"before": (zlib.compress(numpy.ascontiguousarray(before).tobytes(), LEVEL), before.shape, before.dtype),
+		"after": (zlib.compress(numpy.ascontiguousarray(after).tobytes(), LEVEL), after.shape, after.dtype)
+	}
+
+
+def _decode(change, image, back) -> numpy.ndarray:
+	"""
+	Applies the change of one image over a step
+
+	:param change: Encoded change (see _encode())
+	:type change: dict
+
+	:param image: NumPy ndarray array (OpenCV Image Representation) on the far side of the step
+	:type image: numpy.ndarray
+
+	:param back: True to restore the version before the step, False for the version after it
+	:type back: bool
+
+	:return: The restored image
+	:rtype: numpy.ndarray
+	"""
+
+	if change is None:
+		return image
+	if "delta" in change:
+		delta = numpy.frombuffer(zlib.decompress(change["delta"]), dtype = numpy.uint8).reshape(change["shape"])
+		if back:
+			return numpy.add(image, delta, dtype = numpy.uint8)
+		return numpy.subtract(image, delta, dtype = numpy.uint8)
+	data, shape, dtype = change["before" if back else "after"]
+	return numpy.frombuffer(zlib.decompress(data), dtype = dtype).reshape(shape).copy()
+
+
+def _size(change) -> int:
+	"""
+	Returns the memory held by an encoded change
+
+	:param change: Encoded change (see _encode())
+	:type change: dict
+
+	:return: Bytes
+	:rtype: int
+	"""
+
+	if change is None:
+		return 0
+	if "delta" in change:
+		return len(change["delta"])
+	return len(change["before"][0]) + len(change["after"][0])
+
+
+class History(object):
+	"""
+	Undo/redo history of a working image (a color & a gray-scale image).
+
+	record() adds a step after the current one, discarding any steps that were undone. Once the steps exceed max_bytes,
+	the oldest ones are dropped
+	"""
+
+	def __init__(self, max_bytes=MAX_BYTES):
+		"""
+		:param max_bytes: Memory budget for the steps (bytes) (default = MAX_BYTES)
+		:type max_bytes: int
+		"""
+
+		self.max_bytes = max_bytes
+		self.steps = []  # {"label", "changes": (color, gray), "size"}, oldest first
+		self.index = 0   # Number of steps applied to reach the current version
+		self.size = 0
+
+	def record(self, color, gray, new_color, new_gray, label="") -> bool:
+		"""
+		Records a modification of the working image. A modification whose changes alone exceed max_bytes can't be kept;
+		as the earlier steps can't be undone past it either, the whole history is then cleared
+
+		:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image before the modification)
+		:type color: numpy.ndarray
+
+		:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image before the modification)
+		:type gray: numpy.ndarray
+
+		:param new_color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image after the modification)
+		:type new_color: numpy.ndarray
+
+		:param new_gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image after the
+		modification)
+		:type new_gray: numpy.ndarray
+
+		:param label: Description of the modification (eg: 'De-noising')
+		:type label: str
+
+		:return: True if the modification was recorded, False if it was too large (and the history was cleared)
+		:rtype: bool
+		"""
+
+		for step in self.steps[self.index:]:
+			self.size -= step["size"]
+		del self.steps[self.index:]
+		changes = (_encode(before = color, after = new_color), _encode(before = gray, after = new_gray))
+		step = {"label": label, "changes": changes, "size": sum(_size(change = i) for i in changes)}
+		if step["size"] > self.max_bytes:
+			self.steps.clear()
+			self.index = 0
+			self.size = 0
+			return False
+		self.steps.append(step)
+		self.index += 1
+		self.size += step["size"]
+		while self.steps and self.size > self.max_bytes:  # Forget the oldest steps
+			self.size -= self.steps.pop(0)["size"]
+			self.index -= 1
+		return True
+
+	def can_undo(self) -> bool:
+		return self.index > 0
+
+	def can_redo(self) -> bool:
+		return self.index < len(self.steps)
+
+	def undo(self, color, gray) -> (numpy.ndarray, numpy.ndarray, str):
+		"""
+		Steps back to the previous version of the working image
+
+		:param color: NumPy ndarray array (OpenCV Image Representation) (current 8-bit color image)
+		:type color: numpy.ndarray
+
+		:param gray: NumPy ndarray array (OpenCV Image Representation) (current 8-bit gray-scale image)
+		:type gray: numpy.ndarray
+
+		:return: The previous color & gray-scale images and the label of the undone step, or None if there is nothing
+		to undo
+		:rtype: (numpy.ndarray, numpy.ndarray, str)
+		"""
+
+		if not self.can_undo():
+			return None
+		self.index -= 1
+		step = self.steps[self.index]
+		return (
+			_decode(change = step["changes"][0], image = color, back = True),
+			_decode(change = step["changes"][1], image = gray, back = True),
+			step["label"]
+		)
+
+	def redo(self, color, gray) -> (numpy.ndarray, numpy.ndarray, str):
+		"""
+		Steps forward to the next version of the working image
+
+		:param color: NumPy ndarray array (OpenCV Image Representation) (current 8-bit color image)
+		:type color: numpy.ndarray
+
+		:param gray: NumPy ndarray array (OpenCV Image Representation) (current 8-bit gray-scale image)
+		:type gray: numpy.ndarray
+
+		:return: The next color & gray-scale images and the label of the redone step, or None if there is nothing to
+		redo
+		:rtype: (numpy.ndarray, numpy.ndarray, str)
+		"""
+
+		if not self.can_redo():
+			return None
+		step = self.steps[self.index]
+		self.index += 1
+		return (
+			_decode(change = step["changes"][0], image = color, back = False),
+			_decode(change = step["changes"][1], image = gray, back = False),
+			step["label"]
+		)
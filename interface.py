@@ -4,20 +4,63 @@
 :Description: A terminal based interface for accessing the analyser
 :Author: blackk100
 :Version: Pre-Alpha
-:Dependencies: NumPy, OpenCV and matplotlib
+:Dependencies: NumPy, OpenCV and optionally matplotlib (imported by the first matplotlib preview)
 """
 
+import os                                           # Environment configuration
 from time import sleep                              # Time delay
+from pathlib import Path                            # For resolving paths
 import numpy                                        # NumPy
 import cv2                                          # OpenCV
-from matplotlib import pyplot                       # matplotlib (plotting module)
-from matplotlib.font_manager import FontProperties  # matplotlib plots font modifiers
 import errors                                       # Custom Errors
 import analyser                                     # CV_Analyser
-
-color = None
-gray_scale = None
-o_name = ""
+import tiling                                       # Tiled de-noising
+import pyramid                                      # Progressive previews
+import writer                                       # Background image writer
+import cache                                        # Result cache
+import session                                      # Multi-image session store
+import history                                      # Undo/redo history
+import preview                                      # Native preview renderer
+import histograms                                   # Histogram plots & bin export
+import metrics                                      # Instrumentation
+
+images = session.Session()  # Loaded images & their results; the current image is the one processed
+histories = {}              # Image name -> undo/redo history of its working image (see history.History)
+result_cache = None
+plan = analyser.PLAN_BOTH  # Output channels computed by the processing options (see analyser.planned())
+image_writer = None        # Background writer for saved images (see background_writer())
+
+MODE_LABELS = {  # Working image modification per image_process_end() mode
+	1: "De-noising",
+	2: "Laplacian gradient",
+	3: "Scharr gradient (X-axis)",
+	4: "Scharr gradient (Y-axis)",
+	5: "Edge detection"
+}
+
+TITLES = {  # Preview labels per display() mode: title, processed color & processed gray-scale image
+	1: ("De-noised Images", "De-noised Color Image", "De-noised Gray-scale Image"),
+	2: ("Laplacian Gradient", "Laplacian Gradient on Color Image", "Laplacian Gradient on Gray-scale Image"),
+	3: (
+		"Scharr Gradient (X-Axis)",
+		"Scharr Gradient (X-Axis) on Color Image",
+		"Scharr Gradient (X-Axis) on Gray-scale Image"
+	),
+	4: (
+		"Scharr Gradient (Y-Axis)",
+		"Scharr Gradient (Y-Axis) on Color Image",
+		"Scharr Gradient (Y-Axis) on Gray-scale Image"
+	),
+	5: ("Canny Edge Detection", "Edges in Color Image", "Edges in Gray-scale Image"),
+	6: ("Histograms", "Color Frequency Histogram", "Relative Light Intensity Distribution Histogram")
+}
+PREVIEW = os.environ.get("CV_ANALYSER_PREVIEW", "native")  # Preview backend: "native" or "matplotlib" (see display())
+CACHE_DIR = os.environ.get("CV_ANALYSER_CACHE")             # On-disk result cache, off unless set (see cached())
+CACHE_MIB = int(os.environ.get("CV_ANALYSER_CACHE_SIZE", "1024"))
+
+SAVE_PROFILES = {  # Output profile per image_process_end() mode (see analyser.parse_profile()); default = "jpeg"
+	5: "png1"      # Edges: binary images, a 1-bit PNG is lossless and a fraction of the size of a .jpeg
+}
 
 if not cv2.useOptimized():
 	cv2.setUseOptimized(onoff = True)
@@ -49,28 +92,32 @@ def menu() -> int:
 	strings = [
 		"\nOptions:",
 		"\t1) Read a new image",
-		"\t2) Display image",
-		"\t3) Remove Noise from Image",
-		"\t4) Get the Image Gradient",
-		"\t5) Detect Edges in the image",
-		"\t6) Generate Histograms",
-		"\t7) Help",
-		"\t8) Exit"
+		"\t2) Switch to a loaded image",
+		"\t3) Display image",
+		"\t4) Remove Noise from Image",
+		"\t5) Get the Image Gradient",
+		"\t6) Detect Edges in the image",
+		"\t7) Generate Histograms",
+		"\t8) Undo the last modification",
+		"\t9) Redo the last undone modification",
+		"\t10) Select Output Channels",
+		"\t11) Help",
+		"\t12) Exit"
 	]
 	pprint(strings = strings)
 	while True:
 		try:
 			inpt = int(input("Select option: ")) - 1
-			if inpt in range(8):
+			if inpt in range(12):
 				return inpt
 			else:
 				raise errors.MenuOptionOutOfRangeError
 		except ValueError:
 			print("ERROR: Incorrect data type error!")
-			print("Valid options are from 1 to 8 (inclusive).\n")
+			print("Valid options are from 1 to 12 (inclusive).\n")
 		except errors.MenuOptionOutOfRangeError as e:
 			print("ERROR: " + e.message)
-			print("Valid options are from 1 to 8 (inclusive).\n")
+			print("Valid options are from 1 to 12 (inclusive).\n")
 
 
 def prog_exit() -> bool:
@@ -115,17 +162,27 @@ def prog_help() -> None:
 		"software or hardware. The author does not guarantee accurate results. Use at your own risk.\n",
 		"\tPress Ctrl + C to force exit the program anytime (the program may lag for a few minutes while computing; "
 		"Computation speed depends upon free CPU time and Memory (RAM) available).\n",
-		"\tAny modifications done to the currently selected image cannot be undone, however, the original image file "
-		"will remain untouched.\n",
-		"\tKindly keep track of all modifications you perform. CV_Analyser currently doesn't support modification "
-		"tracking and external logging (or log dumping).\n",
+		"\tModifications done to the currently selected image can be undone and redone from the menu. The original "
+		"image file will remain untouched.\n",
+		"\tCV_Analyser currently doesn't support external logging (or log dumping).\n",
 		"\nGeneral:",
 		"\tA prompt will ask if you wish to preview a modified image at the end of each process.",
-		"\tFollowing this, another prompt will ask if you wish to save the modified image.",
-		"\tThe previews have a toolbar which can be used to assist in viewing the modified image and in analysing "
-		"generated histograms.",
-		"\tThe toolbar contains a save function. It is recommended to use this function only for histograms due to "
-		"the loss in image quality. Furthermore, histograms currently cannot be saved separately.",
+		"\tOn large images, de-noising and edge detection are first previewed at a reduced resolution (computed within "
+		"about a second), and the full resolution image is only computed when you choose to save it.",
+		"\tFollowing this, another prompt will ask if you wish to save the modified image, and a last one if you wish "
+		"to continue working on it. Working images can be undone and redone step by step without recomputing them, "
+		"the oldest steps being forgotten once the history outgrows its memory budget.",
+		"\tReading a new image keeps the previously read images and their results. Switching back to one of them is "
+		"instant, and repeating an operation on it returns the earlier result. When they outgrow the memory budget, "
+		"the least recently used images are moved to a temporary directory, which is removed on exit.",
+		"\tSetting the CV_ANALYSER_CACHE environment variable to a directory also keeps results on disk across runs "
+		"(up to CV_ANALYSER_CACHE_SIZE MiB, 1024 by default).",
+		"\tImage previews show reduced size copies of the images in a single window; press any key to close it. "
+		"Without a display, the preview is written to output/<name>_preview.png instead.",
+		"\tSetting the CV_ANALYSER_PREVIEW environment variable to 'matplotlib' shows previews as matplotlib plots "
+		"instead (slower on large images), which have a toolbar which can be used to assist in analysing generated "
+		"histograms.",
+		"\tHistograms can be saved after their preview, as a plot (.png) and as their raw counts (.csv).",
 		"\nDe-noising Images:",
 		"\tDe-noising images results in the removal of visual artifacts in images, at the cost of detail and "
 		"sharpness.",
@@ -145,6 +202,12 @@ def prog_help() -> None:
 		"connectivity.",
 		"\tIf they are connected to “sure-edge” pixels, they are considered to be part of edges.",
 		"\tOtherwise, they are also discarded.",
+		"\nOutput Channels:",
+		"\tBy default every function processes both the color and the gray-scale image.",
+		"\tProcessing only the color or only the gray-scale image roughly halves the computation time.",
+		"\tDeriving the gray-scale output from the processed color image is almost as fast as processing the color "
+		"image alone.",
+		"\tOnly the selected outputs are previewed and saved.",
 		"\nHistograms:",
 		"\t2 Histograms are generated:",
 		"\t\t1) Colour Frequency: Shows a plot of the number of times a specific colour (RGB, 8-bit) occurs in the "
@@ -156,30 +219,234 @@ def prog_help() -> None:
 	pprint(strings = strings)
 
 
+def result_key(func, **kwargs) -> str:
+	"""
+	Returns the session key of an analyser function's result on the current image. Array arguments (eg: a
+	precomputed histogram) are derived from the image and left out
+
+	:param func: Analyser function
+	:type func: function
+
+	:param kwargs: Keyword arguments for func, besides the images
+	:type kwargs: dict
+
+	:return: Result key
+	:rtype: str
+	"""
+
+	params = sorted((k, v) for k, v in kwargs.items() if not isinstance(v, numpy.ndarray))
+	return func.__module__ + "." + func.__qualname__ + repr(params)
+
+
+def cached(func, **kwargs) -> tuple:
+	"""
+	Runs an analyser function on the current image. The result is kept with the image in the session, so repeating an
+	operation on the same image returns immediately. If the CV_ANALYSER_CACHE environment variable names a directory,
+	results are also computed through an on-disk result cache there (capped by CV_ANALYSER_CACHE_SIZE, in MiB), which
+	outlives the session
+
+	:param func: Analyser function
+	:type func: function
+
+	:param kwargs: Keyword arguments for func, besides the images
+	:type kwargs: dict
+
+	:return: The (possibly cached) result of func
+	:rtype: tuple
+	"""
+
+	global result_cache
+	key = result_key(func, **kwargs)
+	result = images.result(key = key)
+	if result is None:
+		if result_cache is None and CACHE_DIR:
+			result_cache = cache.ResultCache(directory = CACHE_DIR, max_bytes = CACHE_MIB << 20)
+		if result_cache is None:
+			result = tuple(func(color = images.color, gray = images.gray, **kwargs))
+		else:
+			result = result_cache.call(func, color = images.color, gray = images.gray, **kwargs)
+		result = images.store(key = key, result = result)
+	return result
+
+
+def channels() -> None:
+	"""
+	Modifies the global channel plan used by the processing options
+
+	:return: None
+	:rtype: None
+	"""
+
+	global plan
+	strings = [
+		"Specify the output channels:",
+		"1. Color & Gray-scale",
+		"2. Color only",
+		"3. Gray-scale only",
+		"4. Color, with the Gray-scale output derived from it"
+	]
+	while True:
+		try:
+			pprint(strings = strings)
+			choice = int(input("Enter a number between 1-4 indicting the output channels: ")) - 1
+			if choice not in range(4):
+				raise errors.ChannelPlanOutOfRangeError
+			plan = choice
+			return
+		except ValueError:
+			print("ERROR: Incorrect data type entered!")
+			print("Valid input is only a numeric character between 1 and 4 (inclusive).\n")
+		except errors.ChannelPlanOutOfRangeError as e:
+			print("ERROR: " + e.message)
+			print("Valid input is only a numeric character between 1 and 4 (inclusive).\n")
+
+
+def background_writer() -> writer.ImageWriter:
+	"""
+	Returns the background writer saved images are queued on, creating it on first use
+
+	:return: Background image writer
+	:rtype: writer.ImageWriter
+	"""
+
+	global image_writer
+	if image_writer is None:
+		image_writer = writer.ImageWriter(on_done = writer.report)
+	return image_writer
+
+
 def read() -> None:
 	"""
-	Modifies the global variables for the color & gray-scale images and the name of the image file
+	Reads an image into the session and makes it the current image, prompting again if the file can't be decoded.
+	Previously read images stay in the session; reading the same file again replaces it (see session.Session.add())
 
 	:return: None
 	:rtype: None
 	"""
 
-	global color
-	global gray_scale
-	global o_name
-	color, gray_scale, o_name = analyser.read_img()
+	while True:
+		color, gray, name, path = analyser.read_img()
+		try:
+			if color is None or gray is None:
+				raise errors.ImageDecodeError
+			break
+		except errors.ImageDecodeError as e:
+			print("ERROR: " + e.message)
+			print("The file is empty, corrupt or not an image.\n")
+	name = images.add(name = name, color = color, gray = gray, source = path)
+	histories.pop(name, None)
 
 
+def switch() -> None:
+	"""
+	Makes one of the images in the session the current image
+
+	:return: None
+	:rtype: None
+	"""
+
+	names = images.names()
+	if not names:
+		try:
+			raise errors.AttemptingProcessingButNoImageReadError
+		except errors.AttemptingProcessingButNoImageReadError as e:
+			print("ERROR: " + e.message)
+			print("Read an image before switching between images\n")
+			return
+	strings = ["Loaded images:"] + [
+		str(i + 1) + ". " + Path(name).name + (" (current)" if name == images.current else "")
+		for i, name in enumerate(names)
+	]
+	while True:
+		try:
+			pprint(strings = strings)
+			choice = int(input("Enter a number between 1-" + str(len(names)) + " indicting the image: ")) - 1
+			if choice not in range(len(names)):
+				raise errors.LoadedImageOutOfRangeError
+			images.select(name = names[choice])
+			return
+		except ValueError:
+			print("ERROR: Incorrect data type entered!")
+			print("Valid input is only a numeric character between 1 and " + str(len(names)) + " (inclusive).\n")
+		except errors.LoadedImageOutOfRangeError as e:
+			print("ERROR: " + e.message)
+			print("Valid input is only a numeric character between 1 and " + str(len(names)) + " (inclusive).\n")
+
+
+def modify(col, gray, label) -> None:
+	"""
+	Makes a processed image the working image, recording the modification in the image's undo/redo history.
+	Outputs skipped by the channel plan leave that image unchanged
+
+	:param col: numpy.ndarray array (OpenCV Image Representation) (8-bit color image, or None)
+	:type col: numpy.ndarray
+
+	:param gray: numpy.ndarray array (OpenCV Image Representation) (8-bit gray-scale image, or None)
+	:type gray: numpy.ndarray
+
+	:param label: Description of the modification (eg: 'De-noising')
+	:type label: str
+
+	:return: None
+	:rtype: None
+	"""
+
+	color, gray_scale = images.color, images.gray
+	col = color if col is None else analyser.color_space_converter(image = col, color = True)
+	gray = gray_scale if gray is None else analyser.color_space_converter(image = gray)
+	steps = histories.setdefault(images.current, history.History())
+	if not steps.record(color = color, gray = gray_scale, new_color = col, new_gray = gray, label = label):
+		print("\nWARNING: The " + label + " modification exceeds the undo history's " + str(steps.max_bytes >> 20) + " MiB.")
+		print("It can't be undone, and neither can the earlier modifications.\n")
+	images.replace(color = col, gray = gray)
+
+
+def undo() -> None:
+	"""
+	Restores the working image to its version before the last modification
+
+	:return: None
+	:rtype: None
+	"""
+
+	steps = histories.get(images.current)
+	restored = None if steps is None else steps.undo(color = images.color, gray = images.gray)
+	if restored is None:
+		print("\nNothing to undo.\n")
+		return
+	images.replace(color = restored[0], gray = restored[1])
+	print("\nUndone: " + restored[2] + "\n")
+
+
+def redo() -> None:
+	"""
+	Re-applies the last undone modification of the working image
+
+	:return: None
+	:rtype: None
+	"""
+
+	steps = histories.get(images.current)
+	restored = None if steps is None else steps.redo(color = images.color, gray = images.gray)
+	if restored is None:
+		print("\nNothing to redo.\n")
+		return
+	images.replace(color = restored[0], gray = restored[1])
+	print("\nRedone: " + restored[2] + "\n")
+
+
+@metrics.instrument(stage = "display")
 def display(col, gray, mode=0) -> None:
 	"""
-	Displays the given images as a matplotlib plot.
-	
-	The plot consists of 2 rows with 2 images each:
+	Displays the given images next to the original images.
+
+	The preview consists of 2 rows with 2 images each:
 
 	* Color images -- Original ; Processed
 	* Gray-scale images -- Original ; Processed
 
-	Is only called by image_process_end()
+	Previews use the native renderer (see display_native()) unless PREVIEW is "matplotlib" and matplotlib is installed.
+	Is only called by image_process_end() and main()
 
 	:param col: numpy.ndarray array (OpenCV Image Representation) (8-bit color image)
 	:type col: numpy.ndarray or list
@@ -189,8 +456,8 @@ def display(col, gray, mode=0) -> None:
 
 	:param mode: Used to specify the image labels (default = 0)
 
-	* 0 -- Default (NOTE: The plot becomes a 1 row, 2 column plot with the original color and gray-scale image side-by
-	side)
+	* 0 -- Default (NOTE: The preview becomes a 1 row, 2 column grid with the original color and gray-scale image
+	side-by side)
 	* 1 -- De-noised
 	* 2 -- Laplacian Gradient
 	* 3 -- Scharr (X-Axis) Gradient
@@ -203,7 +470,102 @@ def display(col, gray, mode=0) -> None:
 	:rtype: None
 	"""
 
+	if PREVIEW == "matplotlib":
+		try:
+			display_matplotlib(col = col, gray = gray, mode = mode)
+			return
+		except ImportError:
+			pass
+	display_native(col = col, gray = gray, mode = mode)
+
+
+def original_panels() -> (numpy.ndarray, numpy.ndarray):
+	"""
+	Returns the preview panels of the current image, rendering them on first use (they are kept with the image's
+	results in the session)
+
+	:return: Color & gray-scale preview panels (see preview.panel())
+	:rtype: (numpy.ndarray, numpy.ndarray)
+	"""
+
+	panels = images.result(key = "preview_panels")
+	if panels is None:
+		panels = images.store(key = "preview_panels", result = (
+			preview.panel(image = images.color, caption = "Original Color Image"),
+			preview.panel(image = images.gray, caption = "Original Gray-scale Image")
+		))
+	return panels
+
+
+def display_native(col, gray, mode=0) -> None:
+	"""
+	Displays the given images with the native renderer: every image is shrunk to a panel first and the panels are
+	shown as a single image in an OpenCV window, or written to output/<name>_preview.png when there is no display.
+	Histograms are plotted at the panel size (see histograms.render())
+
+	:param col: numpy.ndarray array (OpenCV Image Representation) (8-bit color image), or the B, G & R histograms
+	:type col: numpy.ndarray or list
+
+	:param gray: numpy.ndarray array (OpenCV Image Representation) (8-bit gray-scale image), or the gray-scale
+	histogram
+	:type gray: numpy.ndarray
+
+	:param mode: Used to specify the image labels, see display() (default = 0)
+	:type mode: int
+
+	:return: None
+	:rtype: None
+	"""
+
+	originals = original_panels()
+	if mode == 0:
+		title = "Original Images"
+		panels = list(originals)
+	else:
+		title, col_label, gray_label = TITLES[mode]
+		if mode == 6:
+			size = {"width": preview.PANEL_WIDTH, "height": preview.PANEL_HEIGHT}
+			col = None if col is None else histograms.render(color_hist = col, **size)
+			gray = None if gray is None else histograms.render(gray_hist = gray, **size)
+		panels = [
+			originals[0],
+			preview.panel(image = col, caption = col_label if col is not None else "Not computed"),
+			originals[1],
+			preview.panel(image = gray, caption = gray_label if gray is not None else "Not computed")
+		]
+	path = preview.show(
+			image = preview.compose(panels = panels, columns = 2, title = title),
+			title = "CV_Analyser - " + title,
+			path = Path.cwd().joinpath("output", images.current + "_preview.png")
+	)
+	if path is not None:
+		print("\nNo display available; the preview was written to " + path + "\n")
+
+
+def display_matplotlib(col, gray, mode=0) -> None:
+	"""
+	Displays the given images as a matplotlib plot (slower than the native renderer, as every image is plotted at full
+	resolution). See display() for the layout & parameters
+
+	:param col: numpy.ndarray array (OpenCV Image Representation) (8-bit color image)
+	:type col: numpy.ndarray or list
+
+	:param gray: numpy.ndarray array (OpenCV Image Representation) (8-bit gray-scale image)
+	:type gray: numpy.ndarray
+
+	:param mode: Used to specify the image labels, see display() (default = 0)
+	:type mode: int
+
+	:raises ImportError: If matplotlib isn't installed
+
+	:return: None
+	:rtype: None
+	"""
+
+	from matplotlib import pyplot  # Imported on first use: it is the slowest part of the start-up
+
 	title = ""
+	color, gray_scale = images.color, images.gray
 	fig = pyplot.figure(1)
 	if mode == 0:
 		title = "Original Images"
@@ -219,40 +581,20 @@ def display(col, gray, mode=0) -> None:
 	else:
 		img = [[color, col], [gray_scale, gray]]
 		axes = fig.subplots(nrows = 2, ncols = 2)
-		sub_title = [["Original Color Image", ""], ["Original Gray-scale Image", ""]]
+		title = TITLES[mode][0]
+		sub_title = [["Original Color Image", TITLES[mode][1]], ["Original Gray-scale Image", TITLES[mode][2]]]
 		if mode != 6:
-			if mode == 1:
-				title = "De-noised Images"
-				sub_title[0][1] = "De-noised Color Image"
-				sub_title[1][1] = "De-noised Gray-scale Image"
-			elif mode == 2:
-				title = "Laplacian Gradient"
-				sub_title[0][1] = "Laplacian Gradient on Color Image"
-				sub_title[1][1] = "Laplacian Gradient on Gray-scale Image"
-			elif mode == 3:
-				title = "Scharr Gradient (X-Axis)"
-				sub_title[0][1] = "Scharr Gradient (X-Axis) on Color Image"
-				sub_title[1][1] = "Scharr Gradient (X-Axis) on Gray-scale Image"
-			elif mode == 4:
-				title = "Scharr Gradient (Y-Axis)"
-				sub_title[0][1] = "Scharr Gradient (Y-Axis) on Color Image"
-				sub_title[1][1] = "Scharr Gradient (Y-Axis) on Gray-scale Image"
-			elif mode == 5:
-				title = "Canny Edge Detection"
-				sub_title[0][1] = "Edges in Color Image"
-				sub_title[1][1] = "Edges in Gray-scale Image"
 			for i in range(2):
 				for j in range(2):
-					axes[i][j].set_title(label = sub_title[i][j])
+					axes[i][j].set_title(label = sub_title[i][j] if img[i][j] is not None else "Not computed")
 					axes[i][j].axis("off")
+					if img[i][j] is None:  # Skipped by the channel plan
+						continue
 					if i == 0:
 						axes[i][j].imshow(X = cv2.cvtColor(src = img[i][j], code = cv2.COLOR_BGR2RGB), aspect = "equal")
 					else:
 						axes[i][j].imshow(X = img[i][j], aspect = "equal", cmap = "gray")
 		elif mode == 6:
-			title = "Histograms"
-			sub_title[0][1] = "Color Frequency Histogram"
-			sub_title[1][1] = "Relative Light Intensity Distribution Histogram"
 			colors = ("Blue", "Green", "Red")
 
 			for i in range(2):
@@ -267,25 +609,28 @@ def display(col, gray, mode=0) -> None:
 
 			axes[1][0].imshow(X = img[1][0], aspect = "equal", cmap = "gray")
 
-			for i in range(len(colors)):
-				axes[0][1].plot(img[0][1][i], color = colors[i][0].lower())
-				axes[0][1].set_xlim([0, 256])
-			axes[0][1].set_xlabel(xlabel = "Pixel Value")
-			axes[0][1].set_ylabel(ylabel = "Occurrence")
+			if img[0][1] is not None:
+				for i in range(len(colors)):
+					axes[0][1].plot(img[0][1][i], color = colors[i][0].lower())
+					axes[0][1].set_xlim([0, 256])
+				axes[0][1].set_xlabel(xlabel = "Pixel Value")
+				axes[0][1].set_ylabel(ylabel = "Occurrence")
 
-			axes[1][1].plot(img[1][1])
-			axes[1][1].set_xlim([0, 256])
-			axes[1][1].set_xlabel(xlabel = "Pixel Value")
-			axes[1][1].set_ylabel(ylabel = "Occurrence")
+			if img[1][1] is not None:
+				axes[1][1].plot(img[1][1])
+				axes[1][1].set_xlim([0, 256])
+				axes[1][1].set_xlabel(xlabel = "Pixel Value")
+				axes[1][1].set_ylabel(ylabel = "Occurrence")
 
 	fig.suptitle(t = title, fontsize = 16)
 	fig.tight_layout()
 	pyplot.show()
 
 
-def save(col, gray) -> None:
+def save(col, gray, plan=analyser.PLAN_BOTH, profile="jpeg") -> None:
 	"""
-	Saves the processed image (both 8-bit color and 8-bit gray-scale). Is only called by image_process_end()
+	Saves the processed image (8-bit color and/or 8-bit gray-scale, as per the channel plan). Is only called by
+	image_process_end()
 
 	:param col: numpy.ndarray array (OpenCV Image Representation) (8-bit color image)
 	:type col: numpy.ndarray
@@ -293,47 +638,89 @@ def save(col, gray) -> None:
 	:param gray: numpy.ndarray array (OpenCV Image Representation) (8-bit gray-scale image)
 	:type gray: numpy.ndarray
 
+	:param plan: Channel plan, see analyser.planned(). With PLAN_DERIVED a missing gray-scale image is converted from
+	the color image (default = analyser.PLAN_BOTH)
+	:type plan: int
+
+	:param profile: Output profile specification (see analyser.parse_profile()) (default = "jpeg")
+	:type profile: str
+
 	:return: None
 	:rtype: None
 	"""
 
-	print("\nSaving color image.")
-	col_attempt = analyser.save_img(image = col, o_name = o_name + "_color")
-	while not col_attempt:
-		try:
-			print("Retry (Y/N)?")
-			rep = input().upper()
-			if rep not in ("Y", "N"):
-				raise errors.IncorrectImageSaveRetryResponseError
-			elif rep == "Y":
-				col_attempt = analyser.save_img(image = col, o_name = o_name + "_color")
-			else:
-				break
-		except errors.IncorrectImageSaveRetryResponseError as e:
-			print("ERROR: " + e.message)
-			print("Valid options are: 'Y', 'y', 'N' and 'n' only.\n")
-	print("\nSaving gray image.")
-	gray_attempt = analyser.save_img(image = gray, o_name = o_name + "_gray")
-	while not gray_attempt:
+	if plan == analyser.PLAN_DERIVED and gray is None and col is not None:
+		gray = analyser.color_space_converter(image = col)
+	if plan != analyser.PLAN_GRAY and col is not None:
+		save_one(image = col, suffix = "_color", label = "color", profile = profile)
+	if plan != analyser.PLAN_COLOR and gray is not None:
+		save_one(image = gray, suffix = "_gray", label = "gray", profile = profile)
+	print("\nImages queued for saving; you will be notified once they are written.\n")
+
+
+def save_one(image, suffix, label, profile="jpeg") -> None:
+	"""
+	Queues one processed image on the background writer. Is only called by save()
+
+	Write failures are reported by the writer once the image has been encoded (see writer.report()); the image can
+	then be saved again from the output prompt
+
+	:param image: numpy.ndarray array (OpenCV Image Representation) (8-bit color or gray-scale image)
+	:type image: numpy.ndarray
+
+	:param suffix: File name suffix (eg: '_color')
+	:type suffix: str
+
+	:param label: Image description used in the messages (eg: 'color')
+	:type label: str
+
+	:param profile: Output profile specification (see analyser.parse_profile()) (default = "jpeg")
+	:type profile: str
+
+	:return: None
+	:rtype: None
+	"""
+
+	print("\nSaving " + label + " image.")
+	o_name = images.current
+	if not analyser.save_img(image = image, o_name = o_name + suffix, writer = background_writer(), profile = profile):
+		print("ERROR: The " + label + " image wasn't saved.")
+
+
+def save_histograms(col, gray) -> None:
+	"""
+	Saves the histograms as a plot (.png) and as their raw bins (.csv, one row per bin) in output/<name>. Is only
+	called by image_process_end()
+
+	:param col: B, G & R histograms (or None)
+	:type col: list[numpy.ndarray]
+
+	:param gray: Gray-scale histogram (or None)
+	:type gray: numpy.ndarray
+
+	:return: None
+	:rtype: None
+	"""
+
+	directory = Path.cwd().joinpath("output", images.current)
+	directory.mkdir(parents = True, exist_ok = True)
+	for extn in (".png", ".csv"):
+		path = directory.joinpath(images.current + "_histogram" + extn)
 		try:
-			print("Retry (Y/N)?")
-			rep = input().upper()
-			if rep not in ("Y", "N"):
-				raise errors.IncorrectImageSaveRetryResponseError
-			elif rep == "Y":
-				gray_attempt = analyser.save_img(image = gray, o_name = o_name + "_gray")
-			else:
-				break
-		except errors.IncorrectImageSaveRetryResponseError as e:
-			print("ERROR: " + e.message)
-			print("Valid options are: 'Y', 'y', 'N' and 'n' only.\n")
-	print("\nDone saving images.\n")
+			histograms.export(color_hist = col, gray_hist = gray, path = path)
+			print("\nSaved " + str(path))
+		except (OSError, cv2.error):
+			print("\nERROR: Unable to save " + str(path))
+	print()
 
 
-def image_process_end(col, gray, mode=0) -> None:
+def image_process_end(col, gray, mode=0, plan=analyser.PLAN_BOTH, full=None) -> None:
 	"""
 	This function is automatically run after image processing. Shows a preview of the processed image and saves it
-	(after user confirmation for either action)
+	(after user confirmation for either action).
+
+	If col & gray are a reduced resolution preview, full computes the full resolution output, which is only done
+	when the user confirms saving it
 
 	:param col: numpy.ndarray array (OpenCV Image Representation) (8-bit color image)
 	:type col: numpy.ndarray or list
@@ -353,10 +740,22 @@ def image_process_end(col, gray, mode=0) -> None:
 	* 6 -- Histogram
 	:type mode: int
 
+	:param plan: Channel plan the outputs were computed with; only its outputs are previewed and saved (see
+	analyser.planned()) (default = analyser.PLAN_BOTH)
+	:type plan: int
+
+	:param full: Zero-argument function returning the full resolution outputs (default = None, i.e., col & gray are
+	already at full resolution)
+	:type full: function
+
 	:return: None
 	:rtype: None
 	"""
 
+	if plan == analyser.PLAN_COLOR:
+		gray = None
+	elif plan == analyser.PLAN_GRAY:
+		col = None
 	if mode != 6:
 		conf_f = False
 		while not conf_f:
@@ -379,13 +778,82 @@ def image_process_end(col, gray, mode=0) -> None:
 				if conf not in ["Y", "N"]:
 					raise errors.IncorrectImageSaveConfResponseError
 				elif conf == "Y":
-					save(col = col, gray = gray)
+					if full is not None:
+						print("\nComputing the full resolution output.")
+						col, gray = full()
+						full = None
+					save(col = col, gray = gray, plan = plan, profile = SAVE_PROFILES.get(mode, "jpeg"))
 				conf_f = True
 			except errors.IncorrectImageSaveConfResponseError as e:
 				print("ERROR: " + e.message)
 				print("Valid options are: 'Y', 'y', 'N' and 'n' only.\n")
+		conf_f = mode not in MODE_LABELS
+		while not conf_f:
+			try:
+				print("Continue working on the output (Y/N)?")
+				conf = input().upper()
+				if conf not in ["Y", "N"]:
+					raise errors.IncorrectWorkingImageResponseError
+				elif conf == "Y":
+					if full is not None:
+						print("\nComputing the full resolution output.")
+						col, gray = full()
+					modify(col = col, gray = gray, label = MODE_LABELS[mode])
+				conf_f = True
+			except errors.IncorrectWorkingImageResponseError as e:
+				print("ERROR: " + e.message)
+				print("Valid options are: 'Y', 'y', 'N' and 'n' only.\n")
 	else:  # Always diplay the histogram plots
 		display(col = col, gray = gray, mode = mode)
+		conf_f = False
+		while not conf_f:
+			try:
+				print("Save histograms (Y/N)?")
+				conf = input().upper()
+				if conf not in ["Y", "N"]:
+					raise errors.IncorrectImageSaveConfResponseError
+				elif conf == "Y":
+					save_histograms(col = col, gray = gray)
+				conf_f = True
+			except errors.IncorrectImageSaveConfResponseError as e:
+				print("ERROR: " + e.message)
+				print("Valid options are: 'Y', 'y', 'N' and 'n' only.\n")
+
+
+def process(func, mode, **kwargs) -> None:
+	"""
+	Runs an analyser function on the current image and passes its outputs on to image_process_end().
+
+	Large images are previewed progressively: the function first runs on a downscaled copy within the preview latency
+	budget, and the full resolution output is only computed if the user saves it
+
+	:param func: Analyser function
+	:type func: function
+
+	:param mode: Image label mode (see image_process_end())
+	:type mode: int
+
+	:param kwargs: Keyword arguments for func
+	:type kwargs: dict
+
+	:return: None
+	:rtype: None
+	"""
+
+	if images.result(key = result_key(func, **kwargs)) is None and pyramid.worth_it(image = images.color):
+		(col_p, gray_p), scale = pyramid.progressive(func, color = images.color, gray = images.gray, **kwargs)
+		if scale > 1:
+			print("\nPreview computed at 1/" + str(scale) + " resolution.")
+			image_process_end(
+					col = col_p,
+					gray = gray_p,
+					mode = mode,
+					plan = kwargs.get("plan", analyser.PLAN_BOTH),
+					full = lambda: cached(func, **kwargs)
+			)
+			return
+	col_o, gray_o = cached(func, **kwargs)
+	image_process_end(col = col_o, gray = gray_o, mode = mode, plan = kwargs.get("plan", analyser.PLAN_BOTH))
 
 
 def noise() -> None:
@@ -411,8 +879,7 @@ def noise() -> None:
 			if quality not in range(3):
 				raise errors.DenoiseQualityOutOfRangeError
 			else:
-				color_p, gray_p = analyser.de_noise(color = color, gray = gray_scale, quality = quality)
-				image_process_end(col = color_p, gray = gray_p, mode = 1)
+				process(tiling.de_noise_tiled, mode = 1, quality = quality, plan = plan)
 				nf = True
 		except ValueError:
 			print("ERROR: Incorrect data type entered!")
@@ -468,8 +935,8 @@ def gradient() -> None:
 			pprint(strings = strings)
 			mode = int(input("Enter a number between 1-3 indicting the gradient: ")) - 1
 			if mode in range(3):
-				color_g, gray_g = analyser.get_gradient(color = color, gray = gray_scale, mode = mode)
-				image_process_end(col = color_g, gray = gray_g, mode = mode + 2)
+				color_g, gray_g = cached(analyser.get_gradient, mode = mode, plan = plan)
+				image_process_end(col = color_g, gray = gray_g, mode = mode + 2, plan = plan)
 				gf = True
 			else:
 				raise errors.GradientTypeOutOfRangeError
@@ -519,8 +986,11 @@ def edges() -> None:
 	tf = False
 	while not tf:
 		try:
-			t1 = int(input("Enter the lower gradient threshold (-1 for default = 100): "))
-			if t1 < -1:
+			t1 = int(input(
+					"Enter the lower gradient threshold (-1 for default = 100, -2 for automatic (median), -3 for "
+					"automatic (Otsu)): "
+			))
+			if t1 < -3:
 				raise errors.EdgeLowerThresholdOutOfRangeError
 			else:
 				tf = True
@@ -528,7 +998,7 @@ def edges() -> None:
 			print("ERROR: Incorrect data type entered!\n")
 		except errors.EdgeLowerThresholdOutOfRangeError as e:
 			print("ERROR: " + e.message)
-			print("Valid input is only a numeric character >= -1.\n")
+			print("Valid input is only a numeric character >= -3.\n")
 			conf = False
 			while not conf:
 				try:
@@ -542,7 +1012,7 @@ def edges() -> None:
 				except errors.IncorrectEdgeLowerThresholdRetryResponseError as e:
 					print("ERROR: " + e.message)
 					print("Valid options are: 'Y', 'y', 'N' and 'n' only.\n")
-	tf = False
+	tf = t1 < -1  # Automatic thresholds don't need an upper threshold
 	while not tf:
 		try:
 			t2 = int(input("Enter the upper gradient threshold (-1 for default = 200): "))
@@ -568,17 +1038,15 @@ def edges() -> None:
 				except errors.IncorrectEdgeUpperThresholdRetryResponseError as e:
 					print("ERROR: " + e.message)
 					print("Valid options are: 'Y', 'y', 'N' and 'n' only.\n")
-	if t1 == -1:
-		if t2 == -1:
-			color_e, gray_e = analyser.detect_edge(color = color, gray = gray_scale)
-		else:
-			color_e, gray_e = analyser.detect_edge(color = color, gray = gray_scale, threshold_2 = t2)
+	params = {"plan": plan}
+	if t1 < -1:
+		params.update(auto = -2 - t1, hist = (images.result(key = "gray_hist") or (None,))[0])
 	else:
-		if t2 == -1:
-			color_e, gray_e = analyser.detect_edge(color = color, gray = gray_scale, threshold_1 = t1)
-		else:
-			color_e, gray_e = analyser.detect_edge(color = color, gray = gray_scale, threshold_1 = t1, threshold_2 = t2)
-	image_process_end(col = color_e, gray = gray_e, mode = 5)
+		if t1 != -1:
+			params["threshold_1"] = t1
+		if t2 != -1:
+			params["threshold_2"] = t2
+	process(analyser.detect_edge, mode = 5, **params)
 
 
 def histogram() -> None:
@@ -589,14 +1057,19 @@ def histogram() -> None:
 	:rtype: None
 	"""
 
-	col_h, gray_h = analyser.histogram_gen(color = color, gray = gray_scale)
-	image_process_end(col = col_h, gray = gray_h, mode = 6)
+	col_h, gray_h = cached(analyser.histogram_gen, plan = plan)
+	if gray_h is not None:
+		images.store(key = "gray_hist", result = (gray_h,))  # Reused by automatic edge detection thresholds
+	image_process_end(col = col_h, gray = gray_h, mode = 6, plan = plan)
 
 
-def main() -> None:
+def main(pause=True) -> None:
 	"""
 	For running the interface
 
+	:param pause: Whether to pause briefly after the farewell message (default = True)
+	:type pause: bool
+
 	:return: None
 	:rtype: None
 	"""
@@ -606,10 +1079,9 @@ def main() -> None:
 		"software or hardware. The author does not guarantee accurate results. Use at your own risk.\n",
 		"Press Ctrl + C to force exit the program anytime (the program may lag for a few minutes while computing; "
 		"Computation speed depends upon free CPU time and Memory (RAM) available).\n",
-		"Any modifications done to the currently selected image cannot be undone, however, the original image file "
-		"will remain untouched.\n",
-		"Kindly keep track of all modifications you perform. CV_Analyser currently doesn't support modification "
-		"tracking and external logging (or log dumping)\n",
+		"Modifications done to the currently selected image can be undone and redone from the menu. The original image "
+		"file will remain untouched.\n",
+		"CV_Analyser currently doesn't support external logging (or log dumping)\n",
 	]
 	pprint(strings = intro)
 
@@ -617,30 +1089,44 @@ def main() -> None:
 		menu_opt = menu()
 		if menu_opt == 0:  # Image reading
 			read()
-		elif menu_opt == 6:  # Help
+		elif menu_opt == 1:  # Image switching
+			switch()
+		elif menu_opt == 9:  # Output channels
+			channels()
+		elif menu_opt == 10:  # Help
 			prog_help()
-		elif menu_opt == 7:  # Exit
+		elif menu_opt == 11:  # Exit
 			rep = prog_exit()
 			if rep:
 				break
 		else:
-			if (color is None) or (gray_scale is None):  # No images in global variables
+			if images.current is None or images.color is None:  # No image read
 				try:
 					raise errors.AttemptingProcessingButNoImageReadError
 				except errors.AttemptingProcessingButNoImageReadError as e:
 					print("ERROR: " + e.message)
 					print("Read an image before running any image processing functions\n")
-			else:  # Images present in global variables
-				if menu_opt == 1:  # Display image
-					display(col = color, gray = gray_scale)
-				elif menu_opt == 2:  # Remove noise
+			else:  # Current image present in the session
+				if menu_opt == 2:  # Display image
+					display(col = images.color, gray = images.gray)
+				elif menu_opt == 3:  # Remove noise
 					noise()
-				elif menu_opt == 3:  # Get Gradient
+				elif menu_opt == 4:  # Get Gradient
 					gradient()
-				elif menu_opt == 4:  # Get Edges
+				elif menu_opt == 5:  # Get Edges
 					edges()
-				elif menu_opt == 5:  # Make histogram
+				elif menu_opt == 6:  # Make histogram
 					histogram()
-
+				elif menu_opt == 7:  # Undo
+					undo()
+				elif menu_opt == 8:  # Redo
+					redo()
+
+	if image_writer is not None:
+		if image_writer.outstanding():
+			print("\nWaiting for " + str(image_writer.outstanding()) + " image(s) to finish saving.")
+		image_writer.close()
+	images.close()
 	print("\nThank you for using CV_Analyser!")
-	sleep(2)
+	if pause:
+		sleep(2)
@@ -8,6 +8,8 @@
 """
 
 from sys import version_info as vi  # Python Interpreter Version
+from sys import argv                # Command line arguments
+from sys import stdin               # Interactive session detection
 from time import sleep              # Slowing down execution
 import traceback                    # Error trace-backs
 
@@ -32,9 +34,13 @@ def version_check(version) -> int:
 
 
 if __name__ == "__main__":
+	# Non-interactive runs (--non-interactive, or input that isn't a terminal, eg: a script piping the menu options)
+	# exit straight away with an exit code: 0 on success, 1 on errors, 130 when interrupted
+	interactive = stdin.isatty() and "--non-interactive" not in argv
+	argv = [i for i in argv if i != "--non-interactive"]
+	code = 0
 	try:
 		import errors
-		import interface
 
 		print("\n")
 		check_result = version_check(vi)
@@ -42,28 +48,49 @@ if __name__ == "__main__":
 			if check_result == 0:
 				print("\nWARNING: CV_Analyser has only been tested on Python 3.6.5!")
 			print("\n")
+			if len(argv) > 1 and argv[1] == "batch":  # Headless batch mode, exits without the auto-exit delay
+				import batch
+				raise SystemExit(batch.main(argv = argv[2:]))
+			if len(argv) > 1 and argv[1] == "video":  # Headless video mode, exits without the auto-exit delay
+				import video
+				raise SystemExit(video.main(argv = argv[2:]))
+			if len(argv) > 1 and argv[1] == "recipe":  # Headless pipeline recipe mode, exits without the auto-exit delay
+				import pipeline
+				raise SystemExit(pipeline.main(argv = argv[2:]))
+			if len(argv) > 1 and argv[1] == "serve":  # Local HTTP service, exits without the auto-exit delay
+				import service
+				raise SystemExit(service.main(argv = argv[2:]))
+			import interface
 			print("Current Working Directory: ")
-			interface.main()
+			interface.main(pause = interactive)
 		else:
 			raise errors.IncompatibleVersionError
 	except ImportError:
 		print("\nUnable to import the required components.")
 		print("Verify all dependencies are accessible from the current interpreter.")
 		print("Verify all CV_Analyser files are present in the current working directory.\n")
+		code = 1
 	except errors.IncompatibleVersionError as e:
 		print("\nERROR: " + e.message)
 		print("CV_Analyser requires Python 3.0 or greater.\n")
+		code = 1
 	except KeyboardInterrupt:
 		print("\nForce exit acknowledged.\n")
+		code = 130
+	except EOFError:  # Piped input ran out before the Exit option
+		print("\nERROR: Input ended before the program was exited.\n")
+		code = 1
 	except Exception as e:  # For catching errors that occur during actual program execution
 		print("\nUNKNOWN ERROR OCCURRED!!")
 		print("ERROR TRACEBACK: ")
 		traceback.print_exc()
 		print("\n")
-else:
+		code = 1
+	if interactive:  # Leaves the messages readable when run from a file manager
+		print("\nCV_Analyser will auto-exit in 30 seconds.")
+		sleep(30)
+		print("\nBye!")
+		sleep(1)
+	raise SystemExit(code)
+elif __name__ != "__mp_main__":  # "__mp_main__" when re-imported by a spawned batch worker process
 	print("CV_Analyser must be run independently!\n")
-	
-print("\nCV_Analyser will auto-exit in 30 seconds.")
-sleep(30)
-print("\nBye!")
-sleep(1)
@@ -0,0 +1,252 @@
+# coding=utf-8
+"""
+:Name: metrics.py
+:Description: Per-stage instrumentation of the analyser (wall time, CPU time, megapixels & allocated bytes per call),
+exportable as JSON lines and in the Prometheus text format
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy
+
+Instrumentation is off by default. Turn it on with configure(), or for every process (including batch workers) by
+setting the CV_ANALYSER_METRICS environment variable to a JSON lines file (and optionally CV_ANALYSER_METRICS_SAMPLE
+to a sampling rate between 0 and 1). 'python metrics.py <file.jsonl>' converts such a file to the Prometheus text
+format
+"""
+
+import atexit                                # Closing the JSON lines file
+import functools                             # Decorator metadata
+import json                                  # JSON lines export
+import os                                    # Environment configuration
+import random                                # Sampling
+import sys                                   # Command line arguments
+import threading                             # Thread safety
+import tracemalloc                           # Allocation tracing
+from collections import deque                # Bounded record buffer
+from time import perf_counter, process_time  # Wall & CPU time
+from time import time                        # Record timestamps
+import numpy                                 # NumPy
+
+enabled = False
+sample_rate = 1.0
+path = None
+records = deque(maxlen = 10000)
+_sink = None  # Open JSON lines file (see configure())
+_lock = threading.Lock()
+
+
+def configure(on=True, rate=1.0, file=None, buffer=10000) -> None:
+	"""
+	Turns instrumentation on or off
+
+	:param on: Whether calls are recorded (default = True)
+	:type on: bool
+
+	:param rate: Fraction of calls recorded, between 0 and 1 (default = 1.0)
+	:type rate: float
+
+	:param file: JSON lines file every record is appended to, opened here and kept open until the next configure() or
+	interpreter exit (default = None, i.e., only kept in memory)
+	:type file: str
+
+	:param buffer: Number of most recent records kept in memory (default = 10000)
+	:type buffer: int
+
+	:return: None
+	:rtype: None
+	"""
+
+	global enabled, sample_rate, path, records, _sink
+	with _lock:
+		if _sink is not None:
+			_sink.close()
+		_sink = open(file, "a", encoding = "utf-8") if file else None
+		enabled = on
+		sample_rate = rate
+		path = file
+		records = deque(records, maxlen = buffer)
+
+
+def _close() -> None:
+	"""
+	Closes the JSON lines file. Registered with atexit
+
+	:return: None
+	:rtype: None
+	"""
+
+	global _sink
+	with _lock:
+		if _sink is not None:
+			_sink.close()
+			_sink = None
+
+
+def _megapixels(values) -> float:
+	"""
+	Returns the size of the first image among the values
+
+	:param values: Call arguments or results
+	:type values: iter
+
+	:return: Megapixels (0.0 if there is no image)
+	:rtype: float
+	"""
+
+	for i in values:
+		if isinstance(i, numpy.ndarray) and len(i.shape) >= 2:
+			return i.shape[0] * i.shape[1] / 1e6
+		if isinstance(i, (tuple, list)):
+			found = _megapixels(values = i)
+			if found:
+				return found
+	return 0.0
+
+
+def _nbytes(value) -> int:
+	"""
+	Returns the total size of the NumPy arrays in a (nested) result
+
+	:param value: Call result
+	:type value: object
+
+	:return: Bytes
+	:rtype: int
+	"""
+
+	if isinstance(value, numpy.ndarray):
+		return value.nbytes
+	if isinstance(value, (tuple, list)):
+		return sum(_nbytes(value = i) for i in value)
+	return 0
+
+
+def record(entry) -> None:
+	"""
+	Stores one record in memory and appends it to the JSON lines file, if any
+
+	:param entry: Record
+	:type entry: dict
+
+	:return: None
+	:rtype: None
+	"""
+
+	line = json.dumps(entry) + "\n"
+	with _lock:
+		records.append(entry)
+		if _sink is not None:
+			_sink.write(line)
+			_sink.flush()  # Whole lines only, so processes appending to the same file don't interleave
+
+
+def instrument(stage) -> callable:
+	"""
+	Decorator recording the wall time, process CPU time, input megapixels and allocated bytes of every (sampled) call.
+
+	Allocated bytes are the tracemalloc peak during the call when tracemalloc is tracing, otherwise the size of the
+	arrays returned. The CPU time covers every thread of the process, including OpenCV's worker threads
+
+	:param stage: Stage name
+	:type stage: str
+
+	:return: Decorator
+	:rtype: function
+	"""
+
+	def decorator(func) -> callable:
+		@functools.wraps(func)
+		def wrapper(*args, **kwargs):
+			if not enabled or (sample_rate < 1.0 and random.random() >= sample_rate):
+				return func(*args, **kwargs)
+			tracing = tracemalloc.is_tracing() and hasattr(tracemalloc, "reset_peak")  # reset_peak(): Python 3.9+
+			if tracing:
+				base = tracemalloc.get_traced_memory()[0]
+				tracemalloc.reset_peak()
+			wall, cpu = perf_counter(), process_time()
+			result = func(*args, **kwargs)
+			wall, cpu = perf_counter() - wall, process_time() - cpu
+			allocated = tracemalloc.get_traced_memory()[1] - base if tracing else _nbytes(value = result)
+			megapixels = _megapixels(values = list(args) + list(kwargs.values())) or _megapixels(values = [result])
+			record(entry = {
+				"time": time(),
+				"pid": os.getpid(),
+				"stage": stage,
+				"wall_seconds": wall,
+				"cpu_seconds": cpu,
+				"megapixels": megapixels,
+				"allocated_bytes": allocated
+			})
+			return result
+		return wrapper
+	return decorator
+
+
+def export_jsonl(file, entries=None) -> None:
+	"""
+	Writes records as JSON lines
+
+	:param file: Output path
+	:type file: str
+
+	:param entries: Records (default = None, i.e., the in-memory records)
+	:type entries: iter[dict]
+
+	:return: None
+	:rtype: None
+	"""
+
+	with _lock:
+		entries = list(records if entries is None else entries)
+	with open(file, "w", encoding = "utf-8") as out:
+		for i in entries:
+			out.write(json.dumps(i) + "\n")
+
+
+def prometheus(entries=None) -> str:
+	"""
+	Aggregates records per stage in the Prometheus text exposition format
+
+	:param entries: Records (default = None, i.e., the in-memory records)
+	:type entries: iter[dict]
+
+	:return: Prometheus text
+	:rtype: str
+	"""
+
+	with _lock:
+		entries = list(records if entries is None else entries)
+	totals = {}
+	for i in entries:
+		total = totals.setdefault(i["stage"], [0, 0.0, 0.0, 0.0, 0])
+		total[0] += 1
+		total[1] += i["wall_seconds"]
+		total[2] += i["cpu_seconds"]
+		total[3] += i["megapixels"]
+		total[4] += i["allocated_bytes"]
+	metrics = [
+		("cv_analyser_stage_calls_total", "counter", "Recorded (sampled) calls"),
+		("cv_analyser_stage_wall_seconds_total", "counter", "Wall time of the recorded calls"),
+		("cv_analyser_stage_cpu_seconds_total", "counter", "Process CPU time of the recorded calls"),
+		("cv_analyser_stage_megapixels_total", "counter", "Input megapixels of the recorded calls"),
+		("cv_analyser_stage_allocated_bytes_total", "counter", "Allocated bytes of the recorded calls")
+	]
+	lines = []
+	for index, (name, kind, text) in enumerate(metrics):
+		lines.append("# HELP " + name + " " + text)
+		lines.append("# TYPE " + name + " " + kind)
+		for stage in sorted(totals):
+			lines.append(name + '{stage="' + stage + '"} ' + repr(totals[stage][index]))
+	return "\n".join(lines) + "\n"
+
+
+atexit.register(_close)
+
+if os.environ.get("CV_ANALYSER_METRICS"):
+	configure(file = os.environ["CV_ANALYSER_METRICS"], rate = float(os.environ.get("CV_ANALYSER_METRICS_SAMPLE", "1")))
+
+if __name__ == "__main__":
+	if len(sys.argv) != 2:
+		print("Usage: python metrics.py <file.jsonl>")
+		sys.exit(2)
+	with open(sys.argv[1], encoding = "utf-8") as source:
+		sys.stdout.write(prometheus(entries = [json.loads(i) for i in source if i.strip()]))
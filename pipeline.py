@@ -0,0 +1,270 @@
+# coding=utf-8
+"""
+:Name: pipeline.py
+:Description: Declarative pipeline recipes (JSON/YAML), evaluated lazily as a graph of analyser operations
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy and OpenCV (PyYAML for YAML recipes)
+
+A recipe names its nodes, the operation each one runs, the node it reads from ("source" is the input image) and the
+outputs to produce, eg:
+
+	{
+		"nodes": {
+			"clean": {"op": "denoise", "params": {"quality": 1}},
+			"grad": {"op": "gradient", "input": "clean", "params": {"mode": 1}},
+			"edges": {"op": "edges", "input": "clean"},
+			"hist": {"op": "histogram", "input": "edges"}
+		},
+		"outputs": ["grad", "edges", "hist"]
+	}
+
+Only the nodes the outputs depend on are computed, and every node is computed at most once per image (the de-noised
+image above feeds both 'grad' and 'edges')
+"""
+
+import argparse           # Command line parsing
+import inspect            # Parameter validation
+import json               # JSON recipes
+from pathlib import Path  # For resolving paths
+import cv2                # OpenCV
+import errors             # Custom Errors
+import analyser           # CV_Analyser
+import batch              # Operations, output writing & process pool
+
+SOURCE = "source"
+
+
+def load_recipe(path) -> dict:
+	"""
+	Reads a JSON (.json) or YAML (.yaml, .yml) recipe file
+
+	:param path: Path to the recipe
+	:type path: str
+
+	:raises errors.RecipeError: If the recipe can't be read or parsed
+
+	:return: Recipe
+	:rtype: dict
+	"""
+
+	try:
+		with open(str(path), encoding = "utf-8") as file:
+			text = file.read()
+	except OSError:
+		raise errors.RecipeError(detail = "unable to read " + str(path))
+	if Path(path).suffix.lower() in (".yaml", ".yml"):
+		try:
+			import yaml  # Optional dependency
+		except ImportError:
+			raise errors.RecipeError(detail = "YAML recipes require PyYAML")
+		try:
+			return yaml.safe_load(text)
+		except yaml.YAMLError:
+			raise errors.RecipeError(detail = "unable to parse " + str(path))
+	try:
+		return json.loads(text)
+	except ValueError:
+		raise errors.RecipeError(detail = "unable to parse " + str(path))
+
+
+class Pipeline(object):
+	"""
+	A validated recipe graph. Pipelines are picklable, so one pipeline can be shipped to every batch worker
+	"""
+
+	def __init__(self, recipe):
+		"""
+		:param recipe: Recipe (see the module docstring)
+		:type recipe: dict
+
+		:raises errors.RecipeError: If the recipe describes an invalid graph
+		"""
+
+		if not isinstance(recipe, dict) or not isinstance(recipe.get("nodes"), dict):
+			raise errors.RecipeError(detail = "a recipe needs a 'nodes' mapping")
+		self.nodes = {}
+		for name, node in recipe["nodes"].items():
+			if name == SOURCE or not isinstance(node, dict) or node.get("op") not in batch.OPERATIONS:
+				raise errors.RecipeError(detail = "missing or unknown operation in node '" + str(name) + "'")
+			params = dict(node.get("params") or {})
+			try:
+				inspect.signature(batch.OPERATIONS[node["op"]]).bind(None, None, **params)
+			except TypeError:
+				raise errors.RecipeError(detail = "unknown parameters in node '" + name + "'")
+			try:
+				batch.check_params(name = node["op"], params = params)
+			except errors.BatchOperationSpecError:
+				raise errors.RecipeError(detail = "invalid parameter values in node '" + name + "'")
+			self.nodes[name] = (node["op"], node.get("input", SOURCE), params)
+		for name, (_, source, _) in self.nodes.items():
+			if source != SOURCE and source not in self.nodes:
+				raise errors.RecipeError(detail = "unknown input of node '" + name + "'")
+			if source != SOURCE and self.nodes[source][0] == "histogram":
+				raise errors.RecipeError(detail = "node '" + name + "' reads a histogram")
+		self.outputs = list(recipe.get("outputs") or self.nodes)
+		for name in self.outputs:
+			if name not in self.nodes:
+				raise errors.RecipeError(detail = "unknown output '" + str(name) + "'")
+			self._check_cycle(name = name)
+
+	def _check_cycle(self, name) -> None:
+		"""
+		Follows a node's inputs back to the source
+
+		:param name: Node name
+		:type name: str
+
+		:raises errors.RecipeError: If the chain of inputs loops
+
+		:return: None
+		:rtype: None
+		"""
+
+		seen = set()
+		while name != SOURCE:
+			if name in seen:
+				raise errors.RecipeError(detail = "cycle through node '" + name + "'")
+			seen.add(name)
+			name = self.nodes[name][1]
+
+	def evaluate(self, color, gray, outputs=None) -> dict:
+		"""
+		Computes the requested outputs for one image. Nodes no output depends on are skipped and shared intermediates
+		are computed once
+
+		:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
+		:type color: numpy.ndarray
+
+		:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image)
+		:type gray: numpy.ndarray
+
+		:param outputs: Node names to compute (default = None, i.e., the recipe's outputs)
+		:type outputs: list[str]
+
+		:return: Mapping of node names to their analyser outputs
+		:rtype: dict
+		"""
+
+		results = {SOURCE: (color, gray)}
+
+		def resolve(name) -> tuple:
+			if name not in results:
+				op, source, params = self.nodes[name]
+				col_i, gray_i = resolve(name = source)
+				results[name] = batch.run_op(color = col_i, gray = gray_i, name = op, params = params)
+			return results[name]
+
+		return {i: resolve(name = i) for i in (outputs or self.outputs)}
+
+
+def process_file(path, out_dir, pipeline, reduce=1) -> (str, str):
+	"""
+	Reads one image, evaluates the pipeline on it and writes every output to out_dir as '<name>_<node>_*' (see
+	batch.write_result())
+
+	:param path: Path to the input image
+	:type path: str
+
+	:param out_dir: Output directory
+	:type out_dir: str
+
+	:param pipeline: Pipeline to evaluate
+	:type pipeline: Pipeline
+
+	:param reduce: Decode at 1/reduce of the full resolution (1, 2, 4 or 8) (default = 1)
+	:type reduce: int
+
+	:return: Input path & an error message (empty if the image was processed successfully)
+	:rtype: (str, str)
+	"""
+
+	message = ""
+	try:
+		color, gray, name = analyser.load_img(path = path, reduce = reduce)
+		if color is None or gray is None:
+			return path, "Unable to decode image!"
+		for node, result in pipeline.evaluate(color = color, gray = gray).items():
+			message = batch.write_result(
+					out_dir = out_dir,
+					stem = name + "_" + node,
+					name = pipeline.nodes[node][0],
+					result = result,
+					background = batch.image_writer,
+					profile = batch.output_profile,
+					hist_formats = batch.histogram_formats
+			)
+			if message:
+				break
+	except (errors.FileDoesNotExistError, errors.FileIncorrectFormatError) as e:
+		message = e.message
+	except cv2.error as e:
+		message = "OpenCV error: " + str(e).strip()
+	except Exception as e:  # Any other failure only fails this image, the rest of the batch carries on
+		message = getattr(e, "message", None) or type(e).__name__ + ": " + str(e).strip()
+	written = batch.flush_writes()
+	return path, message or written
+
+
+def main(argv) -> int:
+	"""
+	Command line entry point: 'main.py recipe <recipe> <in_dir> <out_dir> [--workers N] [--reduce N] [--cache DIR]
+	[--cache-size MiB]'
+
+	:param argv: Command line arguments following 'recipe'
+	:type argv: list[str]
+
+	:return: Exit code (0 if every image was processed successfully, 1 if any image failed, 2 for usage errors)
+	:rtype: int
+	"""
+
+	parser = argparse.ArgumentParser(prog = "main.py recipe", description = "Run a pipeline recipe over a directory")
+	parser.add_argument("recipe", help = "Recipe file (.json, .yaml or .yml)")
+	parser.add_argument("in_dir", help = "Directory containing the input images")
+	parser.add_argument("out_dir", help = "Directory the outputs are written to")
+	parser.add_argument("--workers", type = int, default = None, help = "Worker processes (default = CPU count)")
+	parser.add_argument("--reduce", type = int, default = 1, choices = sorted(analyser.REDUCED_FLAGS))
+	parser.add_argument("--cache", default = None, help = "Result cache directory (default = no caching)")
+	parser.add_argument("--cache-size", type = int, default = 1024, help = "Result cache size cap (MiB) (default = 1024)")
+	parser.add_argument("--profile", default = "jpeg", help = "Image output profile (see batch mode) (default = jpeg)")
+	parser.add_argument("--hist-format", default = "npy", help = "Histogram outputs (see batch mode) (default = npy)")
+	args = parser.parse_args(argv)
+
+	try:
+		pipeline = Pipeline(recipe = load_recipe(path = args.recipe))
+	except errors.RecipeError as e:
+		print("ERROR: " + e.message)
+		print("Recipe problem: " + e.detail + ".\n")
+		return 2
+	try:
+		analyser.parse_profile(spec = args.profile)
+	except errors.OutputProfileError as e:
+		print("ERROR: " + e.message)
+		print("Unable to parse '" + args.profile + "'.\n")
+		return 2
+	hist_formats = batch.parse_hist_formats(spec = args.hist_format)
+	if hist_formats is None:
+		print("ERROR: Unknown histogram format in '" + args.hist_format + "'.")
+		print("Valid formats are: " + ", ".join(batch.HISTOGRAM_FORMATS) + ".\n")
+		return 2
+	try:
+		done, failed, elapsed = batch.run(
+				in_dir = args.in_dir,
+				out_dir = args.out_dir,
+				ops = pipeline,
+				workers = args.workers,
+				reduce = args.reduce,
+				cache_dir = args.cache,
+				cache_bytes = args.cache_size << 20,
+				task = process_file,
+				profile = args.profile,
+				hist_formats = hist_formats
+		)
+	except errors.BatchDirectoryError as e:
+		print("ERROR: " + e.message)
+		print("Verify that the input directory exists and that the output directory is writable.\n")
+		return 2
+	rate = (done + failed) / elapsed if elapsed > 0 else 0.0
+	print("\nProcessed " + str(done) + " image(s), " + str(failed) + " failure(s) in " + "%.2f" % elapsed + " s")
+	print("Throughput: " + "%.2f" % rate + " images/second")
+	return 1 if failed else 0
@@ -0,0 +1,154 @@
+# coding=utf-8
+"""
+:Name: preview.py
+:Description: Lightweight preview renderer: downsamples images to panels, composes them into a single grid image and
+shows it with OpenCV (or writes it to a .png file when there is no display)
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy and OpenCV
+"""
+
+import os                 # Display detection
+import sys                # Platform detection
+from pathlib import Path  # For resolving paths
+import numpy              # NumPy
+import cv2                # OpenCV
+
+PANEL_WIDTH = 640   # Panel size, images are shrunk to fit (pixels)
+PANEL_HEIGHT = 480
+CAPTION = 28        # Height of the panel captions & of the title bar (pixels)
+BACKGROUND = 32     # Gray level around the images
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+
+
+def _caption(width, text, scale=0.55) -> numpy.ndarray:
+	"""
+	Draws a caption bar
+
+	:param width: Bar width (pixels)
+	:type width: int
+
+	:param text: Caption
+	:type text: str
+
+	:param scale: Font scale (default = 0.55)
+	:type scale: float
+
+	:return: 8-bit color image
+	:rtype: numpy.ndarray
+	"""
+
+	bar = numpy.full((CAPTION, width, 3), BACKGROUND, dtype = numpy.uint8)
+	(w, h), _ = cv2.getTextSize(text = text, fontFace = FONT, fontScale = scale, thickness = 1)
+	origin = (max((width - w) // 2, 4), (CAPTION + h) // 2)
+	cv2.putText(bar, text, origin, FONT, scale, (230, 230, 230), 1, cv2.LINE_AA)
+	return bar
+
+
+def panel(image, caption="", width=PANEL_WIDTH, height=PANEL_HEIGHT) -> numpy.ndarray:
+	"""
+	Shrinks an image to fit a panel (never enlarging it) and centres it under a caption
+
+	:param image: NumPy ndarray array (OpenCV Image Representation) (8-bit color or gray-scale image, or None for an
+	empty panel)
+	:type image: numpy.ndarray
+
+	:param caption: Panel caption (default = "")
+	:type caption: str
+
+	:param width: Panel width (pixels) (default = PANEL_WIDTH)
+	:type width: int
+
+	:param height: Panel height, caption excluded (pixels) (default = PANEL_HEIGHT)
+	:type height: int
+
+	:return: 8-bit color image of (height + CAPTION, width)
+	:rtype: numpy.ndarray
+	"""
+
+	canvas = numpy.full((height, width, 3), BACKGROUND, dtype = numpy.uint8)
+	if image is not None:
+		scale = min(width / image.shape[1], height / image.shape[0], 1.0)
+		size = (max(int(image.shape[1] * scale), 1), max(int(image.shape[0] * scale), 1))
+		small = image if scale == 1.0 else cv2.resize(src = image, dsize = size, interpolation = cv2.INTER_AREA)
+		if len(small.shape) == 2:
+			small = cv2.cvtColor(src = small, code = cv2.COLOR_GRAY2BGR)
+		y, x = (height - size[1]) // 2, (width - size[0]) // 2
+		canvas[y:y + size[1], x:x + size[0]] = small
+	return numpy.vstack((_caption(width = width, text = caption), canvas))
+
+
+def compose(panels, columns=2, title="") -> numpy.ndarray:
+	"""
+	Arranges equally sized panels in a grid under a title bar
+
+	:param panels: Panels (see panel()), row by row
+	:type panels: list[numpy.ndarray]
+
+	:param columns: Panels per row (default = 2)
+	:type columns: int
+
+	:param title: Title (default = "")
+	:type title: str
+
+	:return: 8-bit color image
+	:rtype: numpy.ndarray
+	"""
+
+	blank = numpy.full_like(panels[0], BACKGROUND)
+	panels = list(panels) + [blank] * (-len(panels) % columns)
+	rows = [numpy.hstack(panels[i:i + columns]) for i in range(0, len(panels), columns)]
+	grid = numpy.vstack(rows)
+	return numpy.vstack((_caption(width = grid.shape[1], text = title, scale = 0.8), grid))
+
+
+def headless() -> bool:
+	"""
+	Tells whether there is no display to show windows on (Linux & other X11/Wayland systems without DISPLAY or
+	WAYLAND_DISPLAY)
+
+	:return: True if windows can't be shown
+	:rtype: bool
+	"""
+
+	if sys.platform.startswith(("win", "darwin")):
+		return False
+	return not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY"))
+
+
+def show(image, title="CV_Analyser", path=None) -> str:
+	"""
+	Shows an image in an OpenCV window until a key is pressed or the window is closed. Without a display (or with an
+	OpenCV build without GUI support), the image is written to a .png file instead
+
+	:param image: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
+	:type image: numpy.ndarray
+
+	:param title: Window title (default = "CV_Analyser")
+	:type title: str
+
+	:param path: File written when there is no display (default = None, i.e., output/preview.png in the current
+	working directory)
+	:type path: str or Path
+
+	:return: The path written, or None if the image was shown in a window
+	:rtype: str
+	"""
+
+	if not headless():
+		try:
+			cv2.namedWindow(title, cv2.WINDOW_AUTOSIZE)
+			cv2.imshow(title, image)
+			while cv2.getWindowProperty(title, cv2.WND_PROP_VISIBLE) >= 1:
+				if cv2.waitKey(100) != -1:
+					break
+			cv2.destroyWindow(title)
+			cv2.waitKey(1)  # Lets the window close
+			return None
+		except cv2.error:  # Headless OpenCV build
+			pass
+	path = Path(path if path is not None else Path.cwd().joinpath("output", "preview.png")).resolve()
+	path.parent.mkdir(parents = True, exist_ok = True)
+	if not cv2.imwrite(str(path), image):
+		raise cv2.error("unable to write " + str(path))
+	return str(path)
@@ -0,0 +1,146 @@
+# coding=utf-8
+"""
+:Name: pyramid.py
+:Description: Progressive previews: runs an analyser operation on the largest image pyramid level that fits a
+latency budget
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy and OpenCV
+"""
+
+from time import perf_counter  # Latency budget
+import numpy                   # NumPy
+import cv2                     # OpenCV
+
+LATENCY_BUDGET = 1.0      # Preview latency budget (seconds)
+MIN_PIXELS = 256 * 256    # Smallest pyramid level (pixels)
+PREVIEW_PIXELS = 1 << 21  # Images up to this size are processed at full resolution straight away (pixels)
+
+costs = {}  # Seconds per pixel of the last preview of each operation (see cost_key())
+
+
+def levels(color, gray, min_pixels=MIN_PIXELS) -> list:
+	"""
+	Builds an image pyramid by repeated halving (cv2.pyrDown()), down to the first level of at most min_pixels
+
+	:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image, or None)
+	:type color: numpy.ndarray
+
+	:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image, or None)
+	:type gray: numpy.ndarray
+
+	:param min_pixels: Size of the smallest level (pixels) (default = MIN_PIXELS)
+	:type min_pixels: int
+
+	:return: Color & gray-scale images per level, full resolution first
+	:rtype: list[(numpy.ndarray, numpy.ndarray)]
+	"""
+
+	pyramid = [(color, gray)]
+	image = color if color is not None else gray
+	while image.shape[0] * image.shape[1] > min_pixels and min(image.shape[:2]) >= 2:
+		color, gray = [None if i is None else cv2.pyrDown(src = i) for i in (color, gray)]
+		pyramid.append((color, gray))
+		image = color if color is not None else gray
+	return pyramid
+
+
+def cost_key(func, **kwargs) -> str:
+	"""
+	Returns the key an operation's preview cost is remembered under. Array arguments are left out
+
+	:param func: Analyser operation (eg: analyser.de_noise)
+	:type func: function
+
+	:param kwargs: Keyword arguments for func
+	:type kwargs: dict
+
+	:return: Cost key
+	:rtype: str
+	"""
+
+	params = sorted((k, v) for k, v in kwargs.items() if not isinstance(v, numpy.ndarray))
+	return func.__module__ + "." + func.__qualname__ + repr(params)
+
+
+def progressive(
+		func,
+		color,
+		gray,
+		budget=LATENCY_BUDGET,
+		min_pixels=MIN_PIXELS,
+		preview_pixels=PREVIEW_PIXELS,
+		**kwargs
+) -> tuple:
+	"""
+	Computes a preview of an analyser operation within a latency budget.
+
+	The starting level is chosen before anything is computed: the smallest pyramid level, or, when an earlier preview
+	of the same operation (& parameters) was timed, the largest level of at most preview_pixels predicted to fit in the
+	budget at that per-pixel cost. So only an operation's very first preview can overrun the budget, and only on the
+	smallest level. Each run's time then predicts the next level's (4 times the pixels), and the next level up is
+	computed while the prediction still fits in the budget. Full resolution is never computed here, unless the whole
+	image is no larger than the smallest level
+
+	:param func: Analyser operation (eg: analyser.de_noise)
+	:type func: function
+
+	:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
+	:type color: numpy.ndarray
+
+	:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image)
+	:type gray: numpy.ndarray
+
+	:param budget: Latency budget (seconds) (default = LATENCY_BUDGET)
+	:type budget: float
+
+	:param min_pixels: Size of the smallest level (pixels) (default = MIN_PIXELS)
+	:type min_pixels: int
+
+	:param preview_pixels: Size of the largest starting level (pixels) (default = PREVIEW_PIXELS)
+	:type preview_pixels: int
+
+	:param kwargs: Keyword arguments for func
+	:type kwargs: dict
+
+	:return: The operation's outputs on the chosen level & the level's downscaling factor (1 for full resolution)
+	:rtype: (tuple, int)
+	"""
+
+	start = perf_counter()
+	pyramid = levels(color = color, gray = gray, min_pixels = min_pixels)
+	pixels = [int(numpy.prod((c if c is not None else g).shape[:2])) for c, g in pyramid]
+	key = cost_key(func, **kwargs)
+	index = len(pyramid) - 1
+	if key in costs:
+		remaining = budget - (perf_counter() - start)
+		while index > 1 and pixels[index - 1] <= preview_pixels and pixels[index - 1] * costs[key] <= remaining:
+			index -= 1
+	took = perf_counter()
+	result = func(color = pyramid[index][0], gray = pyramid[index][1], **kwargs)
+	took = perf_counter() - took
+	costs[key] = took / pixels[index]
+	while index > 1 and perf_counter() - start + 4 * took <= budget:
+		index -= 1
+		took = perf_counter()
+		result = func(color = pyramid[index][0], gray = pyramid[index][1], **kwargs)
+		took = perf_counter() - took
+		costs[key] = took / pixels[index]
+	return tuple(result), 2 ** index
+
+
+def worth_it(image, threshold=PREVIEW_PIXELS) -> bool:
+	"""
+	Tells whether an image is large enough for a progressive preview to pay off
+
+	:param image: NumPy ndarray array (OpenCV Image Representation)
+	:type image: numpy.ndarray
+
+	:param threshold: Size above which previews are progressive (pixels) (default = PREVIEW_PIXELS)
+	:type threshold: int
+
+	:return: True if the image is larger than the threshold
+	:rtype: bool
+	"""
+
+	return isinstance(image, numpy.ndarray) and image.shape[0] * image.shape[1] > threshold
@@ -0,0 +1,137 @@
+# coding=utf-8
+"""
+:Name: roi.py
+:Description: Region of interest (ROI) processing: runs an analyser operation on a region of the image only
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy and OpenCV
+
+A region is a rectangle (x, y, width, height), or an 8-bit mask whose bounding box is processed. The operation sees
+the region plus the border it needs for the pixels inside the region to come out as if the whole image had been
+processed, and its outputs are pasted back into copies of the input images
+"""
+
+import numpy     # NumPy
+import cv2       # OpenCV
+import errors    # Custom Errors
+import analyser  # CV_Analyser
+import tiling    # Tiled de-noising (and its margin)
+
+# Input pixels each operation reads around an output pixel. The de-noising & gradient borders make the region's
+# pixels exact. Canny's derivatives & non-maximum suppression need 2 pixels; the extra border lets hysteresis follow
+# edges that leave the region for a short distance, but edges only connected to a strong pixel further out are lost
+BORDERS = {
+	analyser.de_noise: tiling.MARGIN,
+	tiling.de_noise_tiled: tiling.MARGIN,
+	analyser.get_gradient: 1,
+	analyser.detect_edge: 16,
+	analyser.histogram_gen: 0
+}
+
+
+def bounding_box(rect=None, mask=None, height=0, width=0) -> (int, int, int, int):
+	"""
+	Resolves a region to a rectangle inside the image
+
+	:param rect: Region as (x, y, width, height) (default = None)
+	:type rect: (int, int, int, int)
+
+	:param mask: Region as an 8-bit mask the size of the image, non-zero inside the region (default = None)
+	:type mask: numpy.ndarray
+
+	:param height: Image height (pixels)
+	:type height: int
+
+	:param width: Image width (pixels)
+	:type width: int
+
+	:raises errors.RegionOfInterestError: If no region is given, or the region is empty or outside the image
+
+	:return: Rectangle (x, y, width, height), clipped to the image
+	:rtype: (int, int, int, int)
+	"""
+
+	if mask is not None:
+		if mask.shape[:2] != (height, width):
+			raise errors.RegionOfInterestError
+		rect = cv2.boundingRect(array = (mask != 0).view(numpy.uint8))
+	if rect is None:
+		raise errors.RegionOfInterestError
+	x, y, w, h = [int(i) for i in rect]
+	x0, y0 = max(x, 0), max(y, 0)
+	x1, y1 = min(x + w, width), min(y + h, height)
+	if x1 <= x0 or y1 <= y0:
+		raise errors.RegionOfInterestError
+	return x0, y0, x1 - x0, y1 - y0
+
+
+def apply(func, color, gray, rect=None, mask=None, border=None, **kwargs) -> tuple:
+	"""
+	Runs an analyser operation on a region of interest only.
+
+	Image outputs are the input images with the processed region pasted in place (only the pixels inside the mask,
+	if a mask is given). Histograms (analyser.histogram_gen()) only count the pixels in the region, the mask serving
+	as the histogram mask. Channel plans (the 'plan' keyword argument) are supported; skipped outputs are None
+
+	:param func: Analyser operation (eg: analyser.de_noise)
+	:type func: function
+
+	:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
+	:type color: numpy.ndarray
+
+	:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image)
+	:type gray: numpy.ndarray
+
+	:param rect: Region as (x, y, width, height) (default = None)
+	:type rect: (int, int, int, int)
+
+	:param mask: Region as an 8-bit mask the size of the image, non-zero inside the region (default = None)
+	:type mask: numpy.ndarray
+
+	:param border: Border processed around the region (pixels) (default = None, i.e., the operation's BORDERS entry)
+	:type border: int
+
+	:param kwargs: Keyword arguments for func
+	:type kwargs: dict
+
+	:raises errors.RegionOfInterestError: If the region is missing, empty or outside the image
+
+	:return: The operation's outputs
+	:rtype: tuple
+	"""
+
+	image = color if color is not None else gray
+	height, width = image.shape[:2]
+	x, y, w, h = bounding_box(rect = rect, mask = mask, height = height, width = width)
+	if border is None:
+		border = BORDERS.get(func, 0)
+	x0, y0 = max(x - border, 0), max(y - border, 0)
+	x1, y1 = min(x + w + border, width), min(y + h + border, height)
+
+	box = (slice(y, y + h), slice(x, x + w))
+	padded = (slice(y0, y1), slice(x0, x1))
+
+	def crop(img, window) -> numpy.ndarray:
+		return None if img is None else numpy.ascontiguousarray(img[window])
+
+	if func is analyser.histogram_gen:  # Counts only, nothing to paste back
+		kwargs["mask"] = None if mask is None else crop(img = mask, window = box)
+		return func(color = crop(img = color, window = box), gray = crop(img = gray, window = box), **kwargs)
+
+	outputs = func(color = crop(img = color, window = padded), gray = crop(img = gray, window = padded), **kwargs)
+	inside = None if mask is None else mask[box] != 0
+	pasted = []
+	for result, canvas in zip(outputs, (color, gray)):
+		if result is None:
+			pasted.append(None)
+			continue
+		if canvas is None or len(canvas.shape) != len(result.shape):  # Derived plane: paste into a converted copy
+			canvas = analyser.color_space_converter(image = image, color = len(result.shape) == 3)
+		canvas = canvas.copy()
+		core = result[y - y0:y - y0 + h, x - x0:x - x0 + w]
+		if inside is None:
+			canvas[box] = core
+		else:
+			canvas[box][inside] = core[inside]
+		pasted.append(canvas)
+	return tuple(pasted)
@@ -0,0 +1,478 @@
+# coding=utf-8
+"""
+:Name: service.py
+:Description: Long-running local HTTP service exposing the analyser operations, backed by a pre-warmed process pool
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy and OpenCV
+
+Endpoints (the image file is the request body, any supported format):
+
+* POST /denoise, /gradient, /edges -- returns the processed image, encoded with the 'profile' query parameter
+* POST /histogram -- returns the histograms as JSON
+* GET /health -- returns the pool & queue state as JSON
+
+Query parameters: 'args' takes the batch operation arguments (eg: /edges?args=otsu, see batch.parse_op()), 'channel'
+selects the color or gray-scale output ('color' or 'gray'; default = color; histograms return both unless given) and
+'profile' the output profile (see analyser.parse_profile(); default = png). Only the selected channel is computed.
+
+Responses carry the X-Queue-Seconds & X-Compute-Seconds headers. An empty or invalid request gets 400, an image that
+can't be decoded or processed 422, a request that can't be queued 503 and one that isn't answered within the timeout
+504 (it is cancelled if it hasn't started yet, and keeps its place in the queue until it finishes otherwise).
+Unexpected worker failures get 500.
+
+Request bodies & response bodies of at least shm.MIN_SHARED bytes cross the process boundary through shared memory
+segments (see shm.py) instead of being pickled through the pool's pipe
+"""
+
+import argparse                                     # Command line parsing
+import json                                         # JSON responses
+import os                                           # CPU count
+import signal                                       # Interrupt handling
+import threading                                    # Queue bound
+from concurrent.futures import ProcessPoolExecutor  # Process pool
+from concurrent.futures import TimeoutError         # Per-request timeouts
+from concurrent.futures import wait                 # Pool warm-up
+from http.server import BaseHTTPRequestHandler      # Request handling
+from http.server import HTTPServer                  # HTTP server
+from socketserver import ThreadingMixIn             # One thread per connection
+from time import perf_counter                       # Latency timing
+from urllib.parse import parse_qs, urlsplit         # Query parsing
+import numpy                                        # NumPy
+import cv2                                          # OpenCV
+import errors                                       # Custom Errors
+import analyser                                     # CV_Analyser
+import batch                                        # Operation parsing & dispatch
+import cache                                        # Result cache
+import shm                                          # Shared-memory transport
+
+CONTENT_TYPES = {
+	".jpeg": "image/jpeg",
+	".png": "image/png",
+	".webp": "image/webp",
+	".pbm": "image/x-portable-bitmap",
+	".npy": "application/octet-stream"
+}
+
+CHANNELS = {
+	"color": analyser.PLAN_COLOR,
+	"gray": analyser.PLAN_GRAY
+}
+
+MAX_BODY = 64 << 20  # Largest accepted request body (bytes)
+
+
+def _worker_init(cache_dir=None, cache_bytes=0) -> None:
+	"""
+	Process pool initializer. Runs single-threaded OpenCV (the pool owns the cores) and warms the worker up by
+	running every operation once on a small image, so that the first request doesn't pay for lazy initialisation.
+	Workers ignore Ctrl + C; the server shuts them down
+
+	:param cache_dir: Result cache directory shared by the workers (default = None, i.e., no caching)
+	:type cache_dir: str
+
+	:param cache_bytes: Size cap of the result cache (bytes)
+	:type cache_bytes: int
+
+	:return: None
+	:rtype: None
+	"""
+
+	signal.signal(signal.SIGINT, signal.SIG_IGN)
+	cv2.setNumThreads(1)
+	color = numpy.random.RandomState(0).randint(0, 256, (64, 64, 3)).astype(numpy.uint8)
+	gray = analyser.color_space_converter(image = color)
+	for name in batch.OPERATIONS:
+		batch.run_op(color = color, gray = gray, name = name, params = {})
+	analyser.encode_img(image = color, profile = "png")
+	if cache_dir:
+		batch.result_cache = cache.ResultCache(directory = cache_dir, max_bytes = cache_bytes)
+
+
+def _ready() -> int:
+	"""
+	Pool warm-up task, returns once the worker has been initialised
+
+	:return: Worker process id
+	:rtype: int
+	"""
+
+	return os.getpid()
+
+
+def compute(data, name, params, channel=None, profile="png") -> (bytes, str, float):
+	"""
+	Decodes an image, runs one operation on it and encodes the output. Runs in the worker processes
+
+	:param data: Encoded image file contents, or the handle of a shared memory segment holding them (see shm.attach())
+	:type data: bytes or (str, tuple, str)
+
+	:param name: Operation name (see batch.parse_op())
+	:type name: str
+
+	:param params: Operation keyword arguments (including the channel plan)
+	:type params: dict
+
+	:param channel: Output returned, 'color' or 'gray' (default = None, i.e., both histograms)
+	:type channel: str
+
+	:param profile: Output profile specification for images (see analyser.parse_profile()) (default = "png")
+	:type profile: str
+
+	:return: Response body (or the handle of the shared memory segment holding it, see shm.publish()), content type &
+	compute time (seconds); the body is None and the content type an error message if the image can't be decoded or
+	processed
+	:rtype: (bytes or (str, tuple, str), str, float)
+	"""
+
+	start = perf_counter()
+	try:
+		if isinstance(data, tuple):
+			data = shm.attach(handle = data)
+		color, gray = analyser.decode_img(buffer = data)
+		if color is None:
+			return None, "Unable to decode the image", perf_counter() - start
+		col_o, gray_o = batch.run_op(color = color, gray = gray, name = name, params = params)
+		if name == "histogram":
+			body = {}
+			if col_o is not None:
+				body["color"] = {j: col_o[i].ravel().astype(int).tolist() for i, j in enumerate(("blue", "green", "red"))}
+			if gray_o is not None:
+				body["gray"] = gray_o.ravel().astype(int).tolist()
+			return json.dumps(body).encode("utf-8"), "application/json", perf_counter() - start
+		buffer, _ = analyser.encode_img(image = col_o if channel == "color" else gray_o, profile = profile)
+	except cv2.error as e:
+		return None, "OpenCV error: " + str(e).strip(), perf_counter() - start
+	extn = analyser.PROFILES[analyser.parse_profile(spec = profile)[0]][0]
+	if shm.available() and buffer.nbytes >= shm.MIN_SHARED:
+		return shm.publish(buffer = buffer), CONTENT_TYPES[extn], perf_counter() - start
+	return buffer.tobytes(), CONTENT_TYPES[extn], perf_counter() - start
+
+
+def _discard(future) -> None:
+	"""
+	Unlinks the shared memory segment holding the output of a job nobody waits for any more
+
+	:param future: Finished (or cancelled) job
+	:type future: concurrent.futures.Future
+
+	:return: None
+	:rtype: None
+	"""
+
+	if not future.cancelled() and future.exception() is None and isinstance(future.result()[0], tuple):
+		shm.discard(handle = future.result()[0])
+
+
+class Service(object):
+	"""
+	Process pool behind the HTTP server. At most workers requests compute at once and at most queue more wait for a
+	worker; requests beyond that are turned away straight away instead of piling up
+	"""
+
+	def __init__(self, workers=None, queue=32, timeout=30.0, cache_dir=None, cache_bytes=1 << 30):
+		"""
+		:param workers: Number of worker processes (default = None, i.e., the number of CPUs)
+		:type workers: int
+
+		:param queue: Number of requests allowed to wait for a worker (default = 32)
+		:type queue: int
+
+		:param timeout: Per-request timeout, queueing included (seconds) (default = 30.0)
+		:type timeout: float
+
+		:param cache_dir: Result cache directory (default = None, i.e., no caching)
+		:type cache_dir: str
+
+		:param cache_bytes: Size cap of the result cache (bytes) (default = 1 GiB)
+		:type cache_bytes: int
+		"""
+
+		self.workers = workers or os.cpu_count() or 1
+		self.queue = queue
+		self.timeout = timeout
+		self.slots = threading.BoundedSemaphore(value = self.workers + queue)
+		self.active = 0
+		self.served = 0
+		self._lock = threading.Lock()
+		self.pool = ProcessPoolExecutor(
+				max_workers = self.workers,
+				initializer = _worker_init,
+				initargs = (cache_dir, cache_bytes)
+		)
+		wait([self.pool.submit(_ready) for _ in range(self.workers)])  # Starts & warms up every worker
+
+	def submit(self, data, name, params, channel=None, profile="png") -> (int, bytes, str, dict):
+		"""
+		Runs one request on the pool
+
+		:param data: Encoded image file contents (see Handler.read_body())
+		:type data: bytes or numpy.ndarray
+
+		:param name: Operation name (see batch.parse_op())
+		:type name: str
+
+		:param params: Operation keyword arguments (including the channel plan)
+		:type params: dict
+
+		:param channel: Output returned, 'color' or 'gray' (default = None, i.e., both histograms)
+		:type channel: str
+
+		:param profile: Output profile specification for images (see analyser.parse_profile()) (default = "png")
+		:type profile: str
+
+		:return: HTTP status, response body, content type & extra headers
+		:rtype: (int, bytes, str, dict)
+		"""
+
+		if not self.slots.acquire(blocking = False):
+			return 503, b"Queue full\n", "text/plain", {"Retry-After": "1"}
+		start = perf_counter()
+		with self._lock:
+			self.active += 1
+		handle = shm.segments.handle(array = data) if isinstance(data, numpy.ndarray) else None
+		try:
+			future = self.pool.submit(compute, data if handle is None else handle, name, params, channel, profile)
+		except Exception as e:  # Pool broken or shut down
+			self._finish(future = None)
+			return 500, ("Worker pool unavailable: " + type(e).__name__ + "\n").encode("utf-8"), "text/plain", {}
+		# The slot (& the input segment, which is reused once released) is held until the job is really over
+		future.add_done_callback(lambda done, data=data: self._finish(future = done))
+		try:
+			body, kind, seconds = future.result(timeout = self.timeout)
+		except TimeoutError:
+			future.cancel()  # Only succeeds if it hasn't started; a running operation finishes in the background
+			future.add_done_callback(_discard)
+			return 504, b"Timed out\n", "text/plain", {}
+		except Exception as e:  # Eg: BrokenProcessPool, or an unexpected error in the operation
+			return 500, ("Internal error: " + type(e).__name__ + "\n").encode("utf-8"), "text/plain", {}
+		if isinstance(body, tuple):
+			body = shm.claim(handle = body)
+		headers = {
+			"X-Queue-Seconds": "%.6f" % max(perf_counter() - start - seconds, 0.0),
+			"X-Compute-Seconds": "%.6f" % seconds
+		}
+		if body is None:
+			return 422, (kind + "\n").encode("utf-8"), "text/plain", headers
+		return 200, body, kind, headers
+
+	def _finish(self, future) -> None:
+		"""
+		Frees the admission slot of a finished (or cancelled) job
+
+		:param future: Finished job (None if it couldn't be submitted)
+		:type future: concurrent.futures.Future
+
+		:return: None
+		:rtype: None
+		"""
+
+		with self._lock:
+			self.active -= 1
+			self.served += 1
+		self.slots.release()
+
+	def health(self) -> dict:
+		"""
+		Returns the state of the pool & queue
+
+		:return: Workers, queue size, requests in progress (queued or computing) & requests served
+		:rtype: dict
+		"""
+
+		with self._lock:
+			return {"workers": self.workers, "queue": self.queue, "active": self.active, "served": self.served}
+
+	def close(self) -> None:
+		"""
+		Stops the worker processes once the queued requests are done
+
+		:return: None
+		:rtype: None
+		"""
+
+		self.pool.shutdown(wait = True)
+
+
+class Server(ThreadingMixIn, HTTPServer):
+	"""
+	HTTP server handling each connection on its own thread
+	"""
+
+	daemon_threads = True
+
+
+class Handler(BaseHTTPRequestHandler):
+	"""
+	HTTP request handler. The Service instance is the server's 'service' attribute
+	"""
+
+	protocol_version = "HTTP/1.1"  # Keep-alive, so scripts don't pay for a connection per request
+
+	def respond(self, status, body, kind, headers=None) -> None:
+		"""
+		Sends a complete response
+
+		:param status: HTTP status
+		:type status: int
+
+		:param body: Response body
+		:type body: bytes
+
+		:param kind: Content type
+		:type kind: str
+
+		:param headers: Extra headers (default = None)
+		:type headers: dict
+
+		:return: None
+		:rtype: None
+		"""
+
+		self.send_response(status)
+		self.send_header("Content-Type", kind)
+		self.send_header("Content-Length", str(len(body)))
+		for key, value in (headers or {}).items():
+			self.send_header(key, value)
+		self.end_headers()
+		self.wfile.write(body)
+
+	def read_body(self, length) -> bytes:
+		"""
+		Reads the request body. Bodies of at least shm.MIN_SHARED bytes are read straight into a shared memory segment,
+		so the worker maps them instead of receiving a pickled copy
+
+		:param length: Content-Length
+		:type length: int
+
+		:return: Request body (a segment-backed array for large bodies; bytes if shorter than announced)
+		:rtype: bytes or numpy.ndarray
+		"""
+
+		if shm.segments is None or length < shm.MIN_SHARED:
+			return self.rfile.read(length)
+		data = shm.segments.empty(shape = (length,))
+		view, filled = memoryview(data), 0
+		while filled < length:
+			count = self.rfile.readinto(view[filled:])
+			if not count:  # The client closed the connection early
+				return data[:filled].tobytes()
+			filled += count
+		return data
+
+	def do_GET(self) -> None:
+		if urlsplit(self.path).path == "/health":
+			self.respond(200, json.dumps(self.server.service.health()).encode("utf-8"), "application/json")
+		else:
+			self.respond(404, b"Not found\n", "text/plain")
+
+	def do_POST(self) -> None:
+		url = urlsplit(self.path)
+		name = url.path.strip("/")
+		try:
+			length = int(self.headers.get("Content-Length") or 0)
+			if length < 0:
+				raise ValueError
+		except ValueError:
+			self.close_connection = True  # The body's end is unknown
+			self.respond(400, b"Invalid Content-Length\n", "text/plain")
+			return
+		if length > MAX_BODY:
+			self.close_connection = True  # The body isn't read
+			self.respond(413, b"Image too large\n", "text/plain")
+			return
+		data = self.read_body(length = length)
+		if name not in batch.OPERATIONS:
+			self.respond(404, b"Unknown operation\n", "text/plain")
+			return
+		if not len(data):
+			self.respond(400, b"Empty request body\n", "text/plain")
+			return
+		query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+		channel = query.get("channel", None if name == "histogram" else "color")
+		profile = query.get("profile", "png")
+		try:
+			name, params = batch.parse_op(spec = name + (":" + query["args"] if query.get("args") else ""))
+			analyser.parse_profile(spec = profile)
+			if channel is not None and channel not in CHANNELS:
+				raise errors.BatchOperationSpecError
+		except (errors.BatchOperationSpecError, errors.OutputProfileError) as e:
+			self.respond(400, (e.message + "\n").encode("utf-8"), "text/plain")
+			return
+		if channel is not None:
+			params["plan"] = CHANNELS[channel]
+		self.respond(*self.server.service.submit(
+				data = data,
+				name = name,
+				params = params,
+				channel = channel,
+				profile = profile
+		))
+
+	def log_message(self, format, *args) -> None:
+		pass  # Quiet; the latency headers carry the timings
+
+
+def serve(host="127.0.0.1", port=8080, **kwargs) -> None:
+	"""
+	Starts the worker pool and serves requests until interrupted
+
+	:param host: Address to listen on (default = "127.0.0.1", i.e., loopback only)
+	:type host: str
+
+	:param port: Port to listen on (default = 8080)
+	:type port: int
+
+	:param kwargs: Keyword arguments for Service
+	:type kwargs: dict
+
+	:return: None
+	:rtype: None
+	"""
+
+	service = Service(**kwargs)
+	server = Server((host, port), Handler)
+	server.service = service
+	print("Serving on http://" + host + ":" + str(server.server_address[1]) + "/ with " + str(service.workers) +
+			" warm worker(s). Press Ctrl + C to stop.")
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		service.close()
+
+
+def main(argv) -> int:
+	"""
+	Command line entry point: 'main.py serve [--host H] [--port P] [--workers N] [--queue N] [--timeout S]'
+
+	:param argv: Command line arguments following 'serve'
+	:type argv: list[str]
+
+	:return: Exit code (0 once stopped)
+	:rtype: int
+	"""
+
+	parser = argparse.ArgumentParser(prog = "main.py serve", description = "Local HTTP service")
+	parser.add_argument("--host", default = "127.0.0.1", help = "Address to listen on (default = 127.0.0.1)")
+	parser.add_argument("--port", type = int, default = 8080, help = "Port to listen on (default = 8080)")
+	parser.add_argument("--workers", type = int, default = None, help = "Worker processes (default = CPU count)")
+	parser.add_argument("--queue", type = int, default = 32, help = "Requests waiting for a worker (default = 32)")
+	parser.add_argument("--timeout", type = float, default = 30.0, help = "Per-request timeout (s) (default = 30)")
+	parser.add_argument("--cache", default = None, help = "Result cache directory (default = no caching)")
+	parser.add_argument("--cache-size", type = int, default = 1024, help = "Result cache size cap (MiB) (default = 1024)")
+	args = parser.parse_args(argv)
+
+	serve(
+			host = args.host,
+			port = args.port,
+			workers = args.workers,
+			queue = args.queue,
+			timeout = args.timeout,
+			cache_dir = args.cache,
+			cache_bytes = args.cache_size << 20
+	)
+	return 0
+
@@ -0,0 +1,349 @@
+# coding=utf-8
+"""
+:Name: session.py
+:Description: Multi-image session store: named images & their derived results, with a memory budget and least
+recently used eviction to disk
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy
+"""
+
+import atexit                        # Cleanup on exit
+import hashlib                       # Spill file names
+import os                            # Atomic replacement
+import shutil                        # Spill directory cleanup
+import tempfile                      # Default spill directory
+from collections import OrderedDict  # Least recently used order
+from pathlib import Path             # For resolving paths
+import numpy                         # NumPy
+import cache                         # Result (un)packing
+
+
+def _nbytes(value) -> int:
+	"""
+	Returns the total size of the NumPy arrays in a (nested) value
+
+	:param value: Image, result or entry
+	:type value: object
+
+	:return: Bytes
+	:rtype: int
+	"""
+
+	if isinstance(value, numpy.ndarray):
+		return value.nbytes
+	if isinstance(value, dict):
+		return sum(_nbytes(value = i) for i in value.values())
+	if isinstance(value, (tuple, list)):
+		return sum(_nbytes(value = i) for i in value)
+	return 0
+
+
+class Session(object):
+	"""
+	Holds several named images, each with the results derived from it (keyed by the caller, eg: the operation and its
+	parameters). One image is the current one. Images read from different files never share a name (see add())
+
+	When the images & results held in memory exceed max_bytes, the least recently used images (never the current one)
+	are written to the spill directory, uncompressed, and dropped from memory. Selecting a spilled image loads it back
+	with all its results. The spill directory is only created by the first spill, and spill files are removed by
+	close(), or at interpreter exit
+	"""
+
+	def __init__(self, max_bytes=1 << 30, spill_dir=None):
+		"""
+		:param max_bytes: Memory budget for the images & results held in memory (bytes) (default = 1 GiB)
+		:type max_bytes: int
+
+		:param spill_dir: Directory evicted images are written to (default = None, i.e., a temporary directory removed
+		by close())
+		:type spill_dir: str or Path
+		"""
+
+		self.max_bytes = max_bytes
+		self.temporary = spill_dir is None
+		self.spill_dir = None if spill_dir is None else Path(spill_dir).resolve()  # Created by _spill()
+		self.entries = OrderedDict()  # Name -> {"color", "gray", "results"}, least recently used first
+		self.spilled = {}             # Name -> spill file
+		self.added = []               # Names, in the order they were added
+		self.sources = {}             # Name -> resolved path of the file the image was read from
+		self.current = None
+		self.size = 0
+		atexit.register(self.close)
+
+	def __contains__(self, name) -> bool:
+		return name in self.entries or name in self.spilled
+
+	def names(self) -> list:
+		"""
+		Returns the names of every image in the session, in memory or spilled, in the order they were added
+
+		:return: Image names
+		:rtype: list[str]
+		"""
+
+		return list(self.added)
+
+	def add(self, name, color, gray, source=None) -> str:
+		"""
+		Adds an image and makes it the current one. Adding the same source file (or, without a source, the same name)
+		again replaces that image and drops its results. An image from another file whose name is taken is renamed to
+		"<name>_2", "<name>_3", etc.
+
+		:param name: Image name
+		:type name: str
+
+		:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
+		:type color: numpy.ndarray
+
+		:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image)
+		:type gray: numpy.ndarray
+
+		:param source: File the image was read from (default = None)
+		:type source: str or Path
+
+		:return: The image name, as stored
+		:rtype: str
+		"""
+
+		if source is not None:
+			source = Path(source).resolve()
+			same = [i for i, j in self.sources.items() if j == source]
+			if same:
+				name = same[0]
+			else:
+				base, count = name, 2
+				while name in self:
+					name, count = base + "_" + str(count), count + 1
+		self.remove(name = name)
+		if source is not None:
+			self.sources[name] = source
+		self.entries[name] = {"color": color, "gray": gray, "results": {}}
+		self.added.append(name)
+		self.size += _nbytes(value = self.entries[name])
+		self.current = name
+		self._evict()
+		return name
+
+	def replace(self, color, gray, name=None) -> None:
+		"""
+		Replaces the pixels of an image in place (keeping its name & position), dropping the results derived from it
+
+		:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
+		:type color: numpy.ndarray
+
+		:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image)
+		:type gray: numpy.ndarray
+
+		:param name: Image name (default = None, i.e., the current image)
+		:type name: str
+
+		:raises KeyError: If the session holds no such image
+
+		:return: None
+		:rtype: None
+		"""
+
+		name = self.current if name is None else name
+		entry = self._entry(name = name)
+		self.size -= _nbytes(value = entry)
+		entry.update(color = color, gray = gray, results = {})
+		self.size += _nbytes(value = entry)
+		self._evict()
+
+	def remove(self, name) -> None:
+		"""
+		Removes an image and its results from the session (memory & disk)
+
+		:param name: Image name
+		:type name: str
+
+		:return: None
+		:rtype: None
+		"""
+
+		if name in self.entries:
+			self.size -= _nbytes(value = self.entries.pop(name))
+		if name in self.spilled:
+			self.spilled.pop(name).unlink()
+		if name in self.added:
+			self.added.remove(name)
+		self.sources.pop(name, None)
+		if self.current == name:
+			self.current = None
+
+	def select(self, name) -> (numpy.ndarray, numpy.ndarray):
+		"""
+		Makes an image the current one, loading it back from disk if it was evicted
+
+		:param name: Image name
+		:type name: str
+
+		:raises KeyError: If the session holds no such image
+
+		:return: NumPy ndarray arrays (OpenCV Image Representations) (8-bit color & gray-scale images)
+		:rtype: (numpy.ndarray, numpy.ndarray)
+		"""
+
+		entry = self._entry(name = name)
+		self.current = name
+		self._evict()
+		return entry["color"], entry["gray"]
+
+	@property
+	def color(self) -> numpy.ndarray:
+		"""
+		The current color image (None if there is no current image)
+		"""
+
+		return None if self.current is None else self._entry(name = self.current)["color"]
+
+	@property
+	def gray(self) -> numpy.ndarray:
+		"""
+		The current gray-scale image (None if there is no current image)
+		"""
+
+		return None if self.current is None else self._entry(name = self.current)["gray"]
+
+	def result(self, key, name=None) -> tuple:
+		"""
+		Looks up a result derived from an image
+
+		:param key: Result key
+		:type key: str
+
+		:param name: Image name (default = None, i.e., the current image)
+		:type name: str
+
+		:return: The stored result, or None
+		:rtype: tuple
+		"""
+
+		name = self.current if name is None else name
+		if name is None or name not in self:
+			return None
+		return self._entry(name = name)["results"].get(key)
+
+	def store(self, key, result, name=None) -> tuple:
+		"""
+		Stores a result derived from an image
+
+		:param key: Result key
+		:type key: str
+
+		:param result: Analyser result (a tuple of NumPy ndarray arrays, lists of arrays or None)
+		:type result: tuple
+
+		:param name: Image name (default = None, i.e., the current image)
+		:type name: str
+
+		:return: The result
+		:rtype: tuple
+		"""
+
+		name = self.current if name is None else name
+		results = self._entry(name = name)["results"]
+		self.size += _nbytes(value = result) - _nbytes(value = results.get(key))
+		results[key] = tuple(result)
+		self._evict()
+		return results[key]
+
+	def _entry(self, name) -> dict:
+		"""
+		Returns an image's entry, loading it back from disk if needed, and marks it as recently used
+
+		:param name: Image name
+		:type name: str
+
+		:raises KeyError: If the session holds no such image
+
+		:return: Entry
+		:rtype: dict
+		"""
+
+		if name not in self.entries:
+			path = self.spilled.pop(name)
+			with numpy.load(str(path)) as archive:
+				keys = [str(i) for i in archive["keys"]]
+				entry = {
+					"color": archive["color"],
+					"gray": archive["gray"],
+					"results": {
+						key: cache.unpack(archive = archive, layout = archive["layout_" + str(i)], prefix = str(i) + "_")
+						for i, key in enumerate(keys)
+					}
+				}
+			path.unlink()
+			self.entries[name] = entry
+			self.size += _nbytes(value = entry)
+		self.entries.move_to_end(name)
+		return self.entries[name]
+
+	def _spill(self, name) -> None:
+		"""
+		Writes an image & its results to the spill directory and drops them from memory
+
+		:param name: Image name
+		:type name: str
+
+		:return: None
+		:rtype: None
+		"""
+
+		if self.spill_dir is None:
+			self.spill_dir = Path(tempfile.mkdtemp(prefix = "cv_analyser_")).resolve()
+		self.spill_dir.mkdir(parents = True, exist_ok = True)
+		entry = self.entries.pop(name)
+		arrays = {"color": entry["color"], "gray": entry["gray"], "keys": numpy.array(list(entry["results"]))}
+		for i, (key, result) in enumerate(entry["results"].items()):
+			packed, layout = cache.pack(result = result, prefix = str(i) + "_")
+			arrays.update(packed)
+			arrays["layout_" + str(i)] = numpy.array(layout)
+		stem = hashlib.blake2b(name.encode("utf-8"), digest_size = 16).hexdigest()
+		path = self.spill_dir.joinpath(stem + ".npz")
+		temp = self.spill_dir.joinpath(stem + ".tmp")
+		with open(str(temp), "wb") as file:
+			numpy.savez(file, **arrays)
+		os.replace(str(temp), str(path))
+		self.spilled[name] = path
+		self.size -= _nbytes(value = entry)
+
+	def _evict(self) -> None:
+		"""
+		Spills the least recently used images until the session is within its memory budget. The current image is
+		always kept in memory
+
+		:return: None
+		:rtype: None
+		"""
+
+		for name in list(self.entries):
+			if self.size <= self.max_bytes:
+				break
+			if name != self.current:
+				self._spill(name = name)
+
+	def close(self) -> None:
+		"""
+		Drops every image, removing the spill files (and the spill directory if it is temporary). Registered with atexit;
+		safe to call more than once
+
+		:return: None
+		:rtype: None
+		"""
+
+		for path in self.spilled.values():
+			try:
+				path.unlink()
+			except FileNotFoundError:
+				pass
+		self.entries.clear()
+		self.spilled.clear()
+		self.added.clear()
+		self.sources.clear()
+		self.current = None
+		self.size = 0
+		if self.temporary and self.spill_dir is not None:
+			shutil.rmtree(str(self.spill_dir), ignore_errors = True)
+			self.spill_dir = None
@@ -0,0 +1,298 @@
+# coding=utf-8
+"""
+:Name: shm.py
+:Description: Shared-memory transport for process pools: a pooled allocator of shared memory segments the parent
+fills in place, and one-off segments carrying a worker's output back
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy (and Python 3.8+ for multiprocessing.shared_memory)
+
+A task receives a handle (segment name, shape & type: a few dozen bytes when pickled) instead of the buffer, and maps
+the segment in the worker with attach(). A worker returns a large output with publish(), and the parent copies it out
+and unlinks it with claim() (or discard()). Pooled segments are reused across calls, and every segment still open is
+unlinked at interpreter exit, so nothing is left behind in /dev/shm
+"""
+
+import atexit                        # Cleanup on exit
+import os                            # Platform check
+import threading                     # Thread safety
+import weakref                       # Releasing segments with their arrays
+from collections import OrderedDict  # Worker-side attachment cache
+import numpy                         # NumPy
+
+try:
+	from multiprocessing import shared_memory  # Python 3.8+
+except ImportError:
+	shared_memory = None
+
+MIN_SEGMENT = 1 << 20  # Smallest segment (bytes); sizes are rounded up to a power of 2 so segments can be reused
+MAX_IDLE = 512 << 20   # Released segments kept for reuse, beyond which they are unlinked (bytes)
+ATTACHED = 16          # Segments a worker keeps mapped between tasks
+MIN_SHARED = 1 << 20   # Smaller buffers are cheaper to pickle than to pass through a segment (bytes)
+
+_attached = OrderedDict()  # Worker side: segment name -> SharedMemory, least recently used first
+
+
+def available() -> bool:
+	"""
+	Tells whether shared memory segments are supported by this interpreter
+
+	:return: True on Python 3.8+
+	:rtype: bool
+	"""
+
+	return shared_memory is not None
+
+
+def _size_class(nbytes) -> int:
+	"""
+	Rounds a size up to its segment size
+
+	:param nbytes: Requested size (bytes)
+	:type nbytes: int
+
+	:return: Segment size (bytes)
+	:rtype: int
+	"""
+
+	return max(MIN_SEGMENT, 1 << max(int(nbytes) - 1, 0).bit_length())
+
+
+class SegmentPool(object):
+	"""
+	Pooled allocator of shared memory segments. empty() returns an array backed by a segment; once the array (and
+	every view of it) is garbage collected, the segment goes back to the pool for the next array of its size class.
+	Up to max_idle bytes of released segments are kept; close() unlinks everything
+	"""
+
+	def __init__(self, max_idle=MAX_IDLE):
+		"""
+		:param max_idle: Released segments kept for reuse (bytes) (default = MAX_IDLE)
+		:type max_idle: int
+		"""
+
+		self.max_idle = max_idle
+		self.idle = {}     # Size class -> [SharedMemory]
+		self.live = {}     # Segment name -> SharedMemory
+		self.arrays = {}   # id() of an allocated array -> segment name
+		self.idle_bytes = 0
+		self._lock = threading.Lock()
+		atexit.register(self.close)
+
+	def empty(self, shape, dtype=numpy.uint8) -> numpy.ndarray:
+		"""
+		Allocates an uninitialised array in a shared memory segment
+
+		:param shape: Array shape
+		:type shape: tuple
+
+		:param dtype: Array type (default = numpy.uint8)
+		:type dtype: numpy.dtype
+
+		:return: Array backed by a segment (see handle())
+		:rtype: numpy.ndarray
+		"""
+
+		dtype = numpy.dtype(dtype)
+		size = _size_class(nbytes = int(numpy.prod(shape)) * dtype.itemsize)
+		with self._lock:
+			segments = self.idle.get(size)
+			if segments:
+				segment = segments.pop()
+				self.idle_bytes -= size
+			else:
+				segment = shared_memory.SharedMemory(create = True, size = size)
+			self.live[segment.name] = segment
+		array = numpy.ndarray(shape = shape, dtype = dtype, buffer = segment.buf)
+		with self._lock:
+			self.arrays[id(array)] = segment.name
+		weakref.finalize(array, self._release, id(array), segment.name, size)
+		return array
+
+	def share(self, image) -> numpy.ndarray:
+		"""
+		Copies an array into a shared memory segment (returning it as is if it already is in one of this pool's
+		segments)
+
+		:param image: NumPy ndarray array
+		:type image: numpy.ndarray
+
+		:return: Array backed by a segment
+		:rtype: numpy.ndarray
+		"""
+
+		if self.handle(array = image) is not None:
+			return image
+		array = self.empty(shape = image.shape, dtype = image.dtype)
+		array[...] = image
+		return array
+
+	def handle(self, array) -> tuple:
+		"""
+		Returns the picklable handle of an array allocated by this pool, to be passed to attach() in a worker
+
+		:param array: Array returned by empty() or share() (not a view of one)
+		:type array: numpy.ndarray
+
+		:return: Segment name, shape & type string, or None if the array isn't backed by one of this pool's segments
+		:rtype: (str, tuple, str)
+		"""
+
+		with self._lock:
+			name = self.arrays.get(id(array))
+		return None if name is None else (name, array.shape, array.dtype.str)
+
+	def _release(self, key, name, size) -> None:
+		"""
+		Returns a segment to the pool once its array is gone. Called by weakref.finalize()
+
+		:param key: id() of the array
+		:type key: int
+
+		:param name: Segment name
+		:type name: str
+
+		:param size: Segment size class (bytes)
+		:type size: int
+
+		:return: None
+		:rtype: None
+		"""
+
+		with self._lock:
+			self.arrays.pop(key, None)
+			segment = self.live.pop(name, None)
+			if segment is None:  # Closed
+				return
+			if self.idle_bytes + size <= self.max_idle:
+				self.idle.setdefault(size, []).append(segment)
+				self.idle_bytes += size
+				return
+		_destroy(segment = segment)
+
+	def close(self) -> None:
+		"""
+		Unlinks every segment, idle or in use. Arrays still in use stay readable (the mapping outlives the name) but
+		can no longer be attached. Safe to call more than once
+
+		:return: None
+		:rtype: None
+		"""
+
+		with self._lock:
+			segments = list(self.live.values()) + [i for j in self.idle.values() for i in j]
+			self.live.clear()
+			self.arrays.clear()
+			self.idle.clear()
+			self.idle_bytes = 0
+		for segment in segments:
+			_destroy(segment = segment)
+
+
+def _destroy(segment) -> None:
+	"""
+	Unlinks a segment and unmaps it if nothing references its memory any more
+
+	:param segment: Shared memory segment
+	:type segment: shared_memory.SharedMemory
+
+	:return: None
+	:rtype: None
+	"""
+
+	try:
+		segment.unlink()
+	except FileNotFoundError:
+		pass
+	try:
+		segment.close()
+	except BufferError:  # Still viewed by an array; unmapped when the array goes
+		pass
+
+
+def attach(handle) -> numpy.ndarray:
+	"""
+	Maps an array shared by a SegmentPool. Runs in the worker processes; segments stay mapped between tasks (up to
+	ATTACHED of them), so a segment reused by the pool costs nothing to attach again
+
+	:param handle: Handle returned by SegmentPool.handle()
+	:type handle: (str, tuple, str)
+
+	:return: Array backed by the segment (writes are seen by every process)
+	:rtype: numpy.ndarray
+	"""
+
+	name, shape, dtype = handle
+	segment = _attached.pop(name, None)
+	if segment is None:
+		segment = shared_memory.SharedMemory(name = name)
+		while len(_attached) >= ATTACHED:
+			try:
+				_attached.popitem(last = False)[1].close()
+			except BufferError:  # Still viewed; unmapped when the view goes
+				pass
+	_attached[name] = segment
+	return numpy.ndarray(shape = shape, dtype = dtype, buffer = segment.buf)
+
+
+def publish(buffer) -> (str, tuple, str):
+	"""
+	Copies a worker's output into a new segment, to be claim()ed by the parent. The worker unmaps it straight away; the
+	segment lives on until the parent unlinks it
+
+	:param buffer: Output buffer
+	:type buffer: numpy.ndarray or bytes
+
+	:return: Segment handle (see SegmentPool.handle())
+	:rtype: (str, tuple, str)
+	"""
+
+	buffer = numpy.frombuffer(buffer, dtype = numpy.uint8)  # Contiguous buffers only (eg: cv2.imencode() outputs)
+	segment = shared_memory.SharedMemory(create = True, size = max(buffer.size, 1))
+	numpy.ndarray(shape = buffer.shape, dtype = numpy.uint8, buffer = segment.buf)[...] = buffer
+	segment.close()
+	return segment.name, buffer.shape, buffer.dtype.str
+
+
+def claim(handle) -> bytes:
+	"""
+	Copies out & unlinks a segment returned by publish()
+
+	:param handle: Handle returned by publish()
+	:type handle: (str, tuple, str)
+
+	:return: Segment contents
+	:rtype: bytes
+	"""
+
+	name, shape, _ = handle
+	segment = shared_memory.SharedMemory(name = name)
+	try:
+		return bytes(segment.buf[:int(numpy.prod(shape))])
+	finally:
+		_destroy(segment = segment)
+
+
+def discard(handle) -> None:
+	"""
+	Unlinks a segment returned by publish() without reading it (eg: the request it answers timed out)
+
+	:param handle: Handle returned by publish()
+	:type handle: (str, tuple, str)
+
+	:return: None
+	:rtype: None
+	"""
+
+	try:
+		_destroy(segment = shared_memory.SharedMemory(name = handle[0]))
+	except FileNotFoundError:
+		pass
+
+
+segments = SegmentPool() if available() else None  # Process-wide segment pool
+if available() and os.name == "posix":
+	from multiprocessing import resource_tracker  # Python 3.8+
+	# Started before any pool forks, so workers report the segments they map or create to this process' tracker
+	# instead of starting their own, which would unlink them when the worker exits
+	resource_tracker.ensure_running()
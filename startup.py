@@ -0,0 +1,126 @@
+# coding=utf-8
+"""
+:Name: startup.py
+:Description: Import-time report: the cold import cost of each CV_Analyser module and its heavy dependencies
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: None (the measured modules' own)
+
+Usage: python startup.py [--repeat 3] [--output startup.json] [--baseline old.json] [--tolerance 0.2]
+
+Each module is imported in a fresh interpreter, so every time includes the module's dependencies that weren't
+imported before it (eg: 'interface' includes NumPy & OpenCV, but no longer matplotlib, which display() loads)
+"""
+
+import argparse                # Command line parsing
+import json                    # Report files
+import os                      # Working directory
+import statistics              # Medians
+import subprocess              # Fresh interpreters
+import sys                     # Interpreter path & command line arguments
+
+MODULES = (
+	"numpy",
+	"cv2",
+	"matplotlib.pyplot",
+	"analyser",
+	"batch",
+	"pipeline",
+	"video",
+	"service",
+	"interface"
+)
+
+PROBE = "from time import perf_counter as t; s = t(); import {0}; print(t() - s)"
+
+
+def measure(module, repeat=3) -> float:
+	"""
+	Times the cold import of a module in fresh interpreters
+
+	:param module: Module name
+	:type module: str
+
+	:param repeat: Number of fresh interpreters (default = 3)
+	:type repeat: int
+
+	:return: Median import time (seconds), or None if the module can't be imported
+	:rtype: float
+	"""
+
+	here = os.path.dirname(os.path.abspath(__file__))
+	times = []
+	for _ in range(repeat):
+		done = subprocess.run(
+				[sys.executable, "-c", PROBE.format(module)],
+				cwd = here,
+				stdout = subprocess.PIPE,
+				stderr = subprocess.DEVNULL,
+				universal_newlines = True
+		)
+		if done.returncode != 0:
+			return None
+		times.append(float(done.stdout.split()[-1]))
+	return statistics.median(times)
+
+
+def report(modules=MODULES, repeat=3) -> dict:
+	"""
+	Measures the import time of every module
+
+	:param modules: Module names (default = MODULES)
+	:type modules: iter[str]
+
+	:param repeat: Number of fresh interpreters per module (default = 3)
+	:type repeat: int
+
+	:return: Module name -> median import time (seconds, None if it can't be imported)
+	:rtype: dict
+	"""
+
+	return {i: measure(module = i, repeat = repeat) for i in modules}
+
+
+def main(argv) -> int:
+	"""
+	Command line entry point
+
+	:param argv: Command line arguments
+	:type argv: list[str]
+
+	:return: Exit code (0, or 1 if a module became slower than the tolerance allows against the baseline)
+	:rtype: int
+	"""
+
+	parser = argparse.ArgumentParser(prog = "startup.py", description = "CV_Analyser import-time report")
+	parser.add_argument("--repeat", type = int, default = 3, help = "Fresh interpreters per module (default = 3)")
+	parser.add_argument("--output", default = None, help = "Report file (default = none)")
+	parser.add_argument("--baseline", default = None, help = "Baseline report to compare against")
+	parser.add_argument("--tolerance", type = float, default = 0.20, help = "Allowed slow-down (default = 0.20)")
+	args = parser.parse_args(argv)
+
+	times = report(repeat = args.repeat)
+	baseline = {}
+	if args.baseline:
+		with open(args.baseline, encoding = "utf-8") as file:
+			baseline = json.load(file)
+	slower = []
+	for module, seconds in times.items():
+		line = "%-20s %s" % (module, "unavailable" if seconds is None else "%8.1f ms" % (seconds * 1000))
+		old = baseline.get(module)
+		if seconds is not None and old:
+			line += "  (%+.1f%%)" % ((seconds / old - 1) * 100)
+			if seconds > old * (1 + args.tolerance):
+				slower.append(module)
+		print(line)
+	if args.output:
+		with open(args.output, "w", encoding = "utf-8") as file:
+			json.dump(times, file, indent = 1)
+		print("\nReport written to " + args.output)
+	for module in slower:
+		print("REGRESSION: " + module)
+	return 1 if slower else 0
+
+
+if __name__ == "__main__":
+	sys.exit(main(argv = sys.argv[1:]))
@@ -0,0 +1,190 @@
+# coding=utf-8
+"""
+:Name: tiling.py
+:Description: Tiled, multi-threaded execution of the analyser's de-noising on large images
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy and OpenCV
+"""
+
+import os                                          # CPU count
+from concurrent.futures import ThreadPoolExecutor  # Thread pool (OpenCV releases the GIL while filtering)
+from concurrent.futures import FIRST_COMPLETED     # Bounded number of tiles in flight
+from concurrent.futures import wait                # Bounded number of tiles in flight
+import numpy                                       # NumPy
+import cv2                                         # OpenCV
+import analyser                                    # CV_Analyser
+import metrics                                     # Instrumentation
+
+# Every output pixel of the non-local means filter depends on the patches centred within its search window, i.e.,
+# on input pixels up to (search radius + patch radius) away. Tiles are padded by this margin on each side and only
+# their un-padded cores are kept, so the stitched result matches the un-tiled result (see de_noise_tiled()).
+MARGIN = analyser.SEARCH_WINDOW // 2 + analyser.TEMPLATE_WINDOW // 2
+
+
+def tiles(height, width, tile_size) -> list:
+	"""
+	Splits an image into a grid of tiles
+
+	:param height: Image height (pixels)
+	:type height: int
+
+	:param width: Image width (pixels)
+	:type width: int
+
+	:param tile_size: Edge length of the tile cores (pixels)
+	:type tile_size: int
+
+	:return: Core & padded (core + MARGIN, clipped to the image) rectangles, each as (y0, y1, x0, x1)
+	:rtype: list[((int, int, int, int), (int, int, int, int))]
+	"""
+
+	grid = []
+	for y0 in range(0, height, tile_size):
+		for x0 in range(0, width, tile_size):
+			y1, x1 = min(y0 + tile_size, height), min(x0 + tile_size, width)
+			padded = (max(y0 - MARGIN, 0), min(y1 + MARGIN, height), max(x0 - MARGIN, 0), min(x1 + MARGIN, width))
+			grid.append(((y0, y1, x0, x1), padded))
+	return grid
+
+
+def _de_noise_tile(image, h, h_color) -> numpy.ndarray:
+	"""
+	De-noises a single (padded) tile
+
+	:param image: NumPy ndarray array (OpenCV Image Representation) (8-bit color or gray-scale tile)
+	:type image: numpy.ndarray
+
+	:param h: Filter strength for the luminance component
+	:type h: int
+
+	:param h_color: Filter strength for the color components (ignored for gray-scale tiles)
+	:type h_color: int
+
+	:return: NumPy ndarray array (OpenCV Image Representation)
+	:rtype: numpy.ndarray
+	"""
+
+	if len(image.shape) == 3:
+		return cv2.fastNlMeansDenoisingColored(
+				src = image,
+				h = h,
+				hColor = h_color,
+				templateWindowSize = analyser.TEMPLATE_WINDOW,
+				searchWindowSize = analyser.SEARCH_WINDOW
+		)
+	return cv2.fastNlMeansDenoising(
+			src = image,
+			h = h,
+			templateWindowSize = analyser.TEMPLATE_WINDOW,
+			searchWindowSize = analyser.SEARCH_WINDOW
+	)
+
+
+def _de_noise_image(pool, image, h, h_color, tile_size, in_flight) -> numpy.ndarray:
+	"""
+	De-noises one image tile by tile, keeping at most in_flight tiles queued or running at any time
+
+	:param pool: Worker pool
+	:type pool: ThreadPoolExecutor
+
+	:param image: NumPy ndarray array (OpenCV Image Representation) (8-bit color or gray-scale image)
+	:type image: numpy.ndarray
+
+	:param h: Filter strength for the luminance component
+	:type h: int
+
+	:param h_color: Filter strength for the color components
+	:type h_color: int
+
+	:param tile_size: Edge length of the tile cores (pixels)
+	:type tile_size: int
+
+	:param in_flight: Maximum number of tiles queued or running
+	:type in_flight: int
+
+	:return: NumPy ndarray array (OpenCV Image Representation)
+	:rtype: numpy.ndarray
+	"""
+
+	out = numpy.empty_like(image)
+	pending = {}
+
+	def collect(done) -> None:
+		for future in done:
+			(y0, y1, x0, x1), (py0, _, px0, _) = pending.pop(future)
+			out[y0:y1, x0:x1] = future.result()[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+
+	for core, padded in tiles(height = image.shape[0], width = image.shape[1], tile_size = tile_size):
+		if len(pending) >= in_flight:
+			done, _ = wait(pending, return_when = FIRST_COMPLETED)
+			collect(done = done)
+		py0, py1, px0, px1 = padded
+		future = pool.submit(_de_noise_tile, numpy.ascontiguousarray(image[py0:py1, px0:px1]), h, h_color)
+		pending[future] = (core, padded)
+	collect(done = wait(pending)[0])
+	return out
+
+
+@metrics.instrument(stage = "de_noise")
+def de_noise_tiled(
+		color,
+		gray,
+		quality=0,
+		tile_size=512,
+		workers=None,
+		plan=analyser.PLAN_BOTH
+) -> (numpy.ndarray, numpy.ndarray):
+	"""
+	Removes noise from the input image by splitting it into overlapping tiles which are de-noised in parallel.
+
+	Each tile is padded by MARGIN (search window radius + patch radius) pixels of real image data and only its core
+	is written back, so no blending is needed across tile seams. The output matches analyser.de_noise() to within
+	1 gray level per pixel (in practice it is identical).
+
+	Peak memory is bounded to the output images plus 2 * workers padded tiles (and their results), independent of the
+	image size. Images smaller than a single tile are passed straight to analyser.de_noise(). Either way, the call is
+	recorded once as the "de_noise" stage (see metrics.instrument())
+
+	:param color: NumPy ndarray array (OpenCV Image Representation) (8-bit color image)
+	:type color: numpy.ndarray
+
+	:param gray: NumPy ndarray array (OpenCV Image Representation) (8-bit gray-scale image)
+	:type gray: numpy.ndarray
+
+	:param quality: De-noising quality (see analyser.de_noise()) (default = 0)
+	:type quality: int
+
+	:param tile_size: Edge length of the tile cores, at least the search window size (pixels) (default = 512)
+	:type tile_size: int
+
+	:param workers: Number of worker threads (default = None, i.e., the number of CPUs)
+	:type workers: int
+
+	:param plan: Channel plan, see analyser.planned() (default = analyser.PLAN_BOTH)
+	:type plan: int
+
+	:return: NumPy ndarray arrays (OpenCV Image Representations)
+	:rtype: (numpy.ndarray, numpy.ndarray)
+	"""
+
+	tile_size = max(tile_size, analyser.SEARCH_WINDOW)
+	image = gray if plan == analyser.PLAN_GRAY else color
+	if image.shape[0] <= tile_size and image.shape[1] <= tile_size:
+		return analyser.de_noise.__wrapped__(color = color, gray = gray, quality = quality, plan = plan)  # Recorded here
+	workers = workers or os.cpu_count() or 1
+	h, h_color = analyser.denoise_strength(quality = quality)
+	with ThreadPoolExecutor(max_workers = workers) as pool:
+		return analyser.planned(
+				color = color,
+				gray = gray,
+				plan = plan,
+				func = lambda img: _de_noise_image(
+						pool = pool,
+						image = img,
+						h = h,
+						h_color = h_color,
+						tile_size = tile_size,
+						in_flight = 2 * workers
+				)
+		)
@@ -0,0 +1,295 @@
+# coding=utf-8
+"""
+:Name: video.py
+:Description: Streaming (frame by frame) processing of video files and numbered frame sequences
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy and OpenCV
+"""
+
+import argparse                # Command line parsing
+import json                    # Histogram summary output
+from time import perf_counter  # Throughput timing
+import numpy                   # NumPy
+import cv2                     # OpenCV
+import errors                  # Custom Errors
+import analyser                # CV_Analyser
+import batch                   # Operation parsing & dispatch
+import histograms              # Streaming histograms
+
+FOURCC = {
+	".avi": "MJPG",
+	".mp4": "mp4v",
+	".mkv": "XVID"
+}
+
+
+def open_source(source) -> cv2.VideoCapture:
+	"""
+	Opens a video file or a numbered frame sequence (printf-style pattern, eg: 'frames/img_%04d.png')
+
+	:param source: Video file path or frame sequence pattern
+	:type source: str
+
+	:raises errors.VideoSourceError: If the source can't be opened
+
+	:return: OpenCV video capture
+	:rtype: cv2.VideoCapture
+	"""
+
+	capture = cv2.VideoCapture(source)
+	if not capture.isOpened():
+		raise errors.VideoSourceError
+	return capture
+
+
+def read_frames(capture) -> iter:
+	"""
+	Yields the frames of an opened source one at a time. The capture is released once it is exhausted
+
+	:param capture: OpenCV video capture (see open_source())
+	:type capture: cv2.VideoCapture
+
+	:return: Generator of NumPy ndarray arrays (OpenCV Image Representations) (8-bit color & gray-scale frames)
+	:rtype: iter[(numpy.ndarray, numpy.ndarray)]
+	"""
+
+	try:
+		while True:
+			ok, color = capture.read()
+			if not ok:
+				break
+			if len(color.shape) == 2:
+				color = cv2.cvtColor(src = color, code = cv2.COLOR_GRAY2BGR)
+			yield color, cv2.cvtColor(src = color, code = cv2.COLOR_BGR2GRAY)
+	finally:
+		capture.release()
+
+
+def temporal_de_noise(frames, quality=0, window=5) -> iter:
+	"""
+	De-noises every frame using its neighbouring frames (cv2.fastNlMeansDenoisingMulti() over a sliding window).
+
+	At most 'window' frames are buffered. The window shrinks symmetrically at the start and end of the clip
+
+	:param frames: Iterable of 8-bit color & gray-scale frames
+	:type frames: iter[(numpy.ndarray, numpy.ndarray)]
+
+	:param quality: De-noising quality (see analyser.de_noise()) (default = 0)
+	:type quality: int
+
+	:param window: Temporal window size, an odd number of frames (default = 5)
+	:type window: int
+
+	:return: Generator of NumPy ndarray arrays (OpenCV Image Representations) (8-bit color & gray-scale frames)
+	:rtype: iter[(numpy.ndarray, numpy.ndarray)]
+	"""
+
+	h, h_color = analyser.denoise_strength(quality = quality)
+	half = window // 2
+
+	def de_noise(buffer, index) -> (numpy.ndarray, numpy.ndarray):
+		radius = min(index, len(buffer) - 1 - index, half)
+		span = buffer[index - radius:index + radius + 1]
+		color_o = cv2.fastNlMeansDenoisingColoredMulti(
+				srcImgs = [i[0] for i in span],
+				imgToDenoiseIndex = radius,
+				temporalWindowSize = 2 * radius + 1,
+				h = h,
+				hColor = h_color,
+				templateWindowSize = analyser.TEMPLATE_WINDOW,
+				searchWindowSize = analyser.SEARCH_WINDOW
+		)
+		gray_o = cv2.fastNlMeansDenoisingMulti(
+				srcImgs = [i[1] for i in span],
+				imgToDenoiseIndex = radius,
+				temporalWindowSize = 2 * radius + 1,
+				h = [h],
+				templateWindowSize = analyser.TEMPLATE_WINDOW,
+				searchWindowSize = analyser.SEARCH_WINDOW
+		)
+		return color_o, gray_o
+
+	buffer, index = [], 0
+	for frame in frames:
+		buffer.append(frame)
+		if len(buffer) - 1 - index >= half:  # Enough following frames for a full window
+			yield de_noise(buffer = buffer, index = index)
+			index += 1
+			if index > half:
+				buffer.pop(0)
+				index -= 1
+	while index < len(buffer):
+		yield de_noise(buffer = buffer, index = index)
+		index += 1
+
+
+def process_frames(frames, ops, accumulator=None) -> iter:
+	"""
+	Applies the operations to every frame, in order, each operation consuming the previous one's output
+
+	:param frames: Iterable of 8-bit color & gray-scale frames
+	:type frames: iter[(numpy.ndarray, numpy.ndarray)]
+
+	:param ops: Parsed operations (see batch.parse_op()). 'histogram' feeds the accumulator and passes frames through
+	:type ops: list[(str, dict)]
+
+	:param accumulator: Accumulator for the 'histogram' operation (default = None)
+	:type accumulator: histograms.HistogramAccumulator
+
+	:return: Generator of NumPy ndarray arrays (OpenCV Image Representations) (8-bit color & gray-scale frames)
+	:rtype: iter[(numpy.ndarray, numpy.ndarray)]
+	"""
+
+	for color, gray in frames:
+		for name, params in ops:
+			if name == "histogram":
+				if accumulator is not None:
+					accumulator.add(color = color, gray = gray)
+			else:
+				color, gray = batch.run_op(color = color, gray = gray, name = name, params = params)
+		yield color, gray
+
+
+def _open_target(target, fps, size, is_color) -> cv2.VideoWriter:
+	"""
+	Opens a video writer for the target file (None for frame sequence patterns)
+
+	:param target: Video file path or frame sequence pattern
+	:type target: str
+
+	:param fps: Frame rate
+	:type fps: float
+
+	:param size: Frame size (width, height)
+	:type size: (int, int)
+
+	:param is_color: Whether the frames are 3-channel color frames
+	:type is_color: bool
+
+	:raises errors.VideoTargetError: If the video file can't be opened for writing
+
+	:return: OpenCV video writer, or None for frame sequences
+	:rtype: cv2.VideoWriter
+	"""
+
+	if "%" in target:
+		return None
+	extn = target[target.rfind("."):].lower() if "." in target else ""
+	writer = cv2.VideoWriter(target, cv2.VideoWriter_fourcc(*FOURCC.get(extn, "MJPG")), fps, size, is_color)
+	if not writer.isOpened():
+		raise errors.VideoTargetError
+	return writer
+
+
+def write_frames(frames, color_target, gray_target=None, fps=25.0) -> int:
+	"""
+	Writes frames to video files or numbered frame sequences (printf-style patterns) as they arrive
+
+	:param frames: Iterable of 8-bit color & gray-scale frames
+	:type frames: iter[(numpy.ndarray, numpy.ndarray)]
+
+	:param color_target: Video file path or frame sequence pattern for the color frames
+	:type color_target: str
+
+	:param gray_target: Video file path or frame sequence pattern for the gray-scale frames (default = None, i.e.,
+	not written)
+	:type gray_target: str
+
+	:param fps: Frame rate of video file targets (default = 25.0)
+	:type fps: float
+
+	:raises errors.VideoTargetError: If a target can't be written to
+
+	:return: Number of frames written
+	:rtype: int
+	"""
+
+	writers = None
+	count = 0
+	try:
+		for color, gray in frames:
+			outputs = [(color_target, color)] + ([(gray_target, gray)] if gray_target else [])
+			if writers is None:
+				writers = [
+					_open_target(target = t, fps = fps, size = (i.shape[1], i.shape[0]), is_color = len(i.shape) == 3)
+					for t, i in outputs
+				]
+			for writer, (target, image) in zip(writers, outputs):
+				if writer is not None:
+					writer.write(image)
+				elif not cv2.imwrite(target % count, image):
+					raise errors.VideoTargetError
+			count += 1
+	finally:
+		for writer in writers or []:
+			if writer is not None:
+				writer.release()
+	return count
+
+
+def main(argv) -> int:
+	"""
+	Command line entry point: 'main.py video <source> <color_target> [--gray <gray_target>] [--op <spec> ...]
+	[--temporal-denoise <quality>] [--window N] [--fps F]'
+
+	:param argv: Command line arguments following 'video'
+	:type argv: list[str]
+
+	:return: Exit code (0 on success, 1 if the source or a target can't be used, 2 for usage errors)
+	:rtype: int
+	"""
+
+	parser = argparse.ArgumentParser(prog = "main.py video", description = "Streaming video processing")
+	parser.add_argument("source", help = "Video file or frame sequence pattern (eg: 'frames/img_%%04d.png')")
+	parser.add_argument("color_target", help = "Output video file or frame sequence pattern for the color frames")
+	parser.add_argument("--gray", default = None, help = "Output video file or frame sequence pattern (gray-scale)")
+	parser.add_argument(
+			"--op",
+			action = "append",
+			default = [],
+			help = "denoise[:quality], gradient[:mode], edges[:threshold_1,threshold_2] or histogram (repeatable, "
+			"applied in order)"
+	)
+	parser.add_argument(
+			"--temporal-denoise",
+			type = int,
+			default = None,
+			choices = range(3),
+			help = "De-noise each frame with its neighbours at this quality before the operations"
+	)
+	parser.add_argument("--window", type = int, default = 5, help = "Temporal de-noising window (odd) (default = 5)")
+	parser.add_argument("--fps", type = float, default = None, help = "Output frame rate (default = source rate)")
+	args = parser.parse_args(argv)
+
+	ops = []
+	for spec in args.op:
+		try:
+			ops.append(batch.parse_op(spec = spec))
+		except errors.BatchOperationSpecError as e:
+			print("ERROR: " + e.message)
+			print("Unable to parse '" + spec + "'.\n")
+			return 2
+	if args.window < 1 or args.window % 2 == 0:
+		print("ERROR: The temporal window must be an odd number of frames.\n")
+		return 2
+	accumulator = histograms.HistogramAccumulator()
+	try:
+		capture = open_source(source = args.source)
+		fps = args.fps or capture.get(cv2.CAP_PROP_FPS) or 25.0
+		frames = read_frames(capture = capture)
+		if args.temporal_denoise is not None:
+			frames = temporal_de_noise(frames = frames, quality = args.temporal_denoise, window = args.window)
+		frames = process_frames(frames = frames, ops = ops, accumulator = accumulator)
+		start = perf_counter()
+		count = write_frames(frames = frames, color_target = args.color_target, gray_target = args.gray, fps = fps)
+		elapsed = perf_counter() - start
+	except (errors.VideoSourceError, errors.VideoTargetError) as e:
+		print("ERROR: " + e.message + "\n")
+		return 1
+	rate = count / elapsed if elapsed > 0 else 0.0
+	print("\nProcessed " + str(count) + " frame(s) in " + "%.2f" % elapsed + " s (" + "%.2f" % rate + " frames/second)")
+	if accumulator.images:
+		print("Histogram summary (B, G, R, gray-scale):")
+		print(json.dumps(accumulator.summary(), indent = 1))
+	return 0
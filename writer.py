@@ -0,0 +1,198 @@
+# coding=utf-8
+"""
+:Name: writer.py
+:Description: Background image writer: encodes & writes images on a thread pool behind a bounded queue
+:Author: blackk100
+:Version: Pre-Alpha
+:Dependencies: NumPy and OpenCV
+"""
+
+import atexit                                      # Flushing on exit
+import threading                                   # Queue bound & thread safety
+from concurrent.futures import ThreadPoolExecutor  # Thread pool (OpenCV releases the GIL while encoding)
+from concurrent.futures import wait                # Flushing
+import analyser                                    # CV_Analyser
+
+
+def report(path, ok, message) -> None:
+	"""
+	Default completion callback: prints the outcome of a write
+
+	:param path: Output path
+	:type path: str
+
+	:param ok: Whether the image was written
+	:type ok: bool
+
+	:param message: Output size & encoding time on success, error message otherwise
+	:type message: str
+
+	:return: None
+	:rtype: None
+	"""
+
+	if ok:
+		print("\nSaved " + path + (" (" + message + ")" if message else ""))
+	else:
+		print("\nERROR: Unable to save " + path + (": " + message if message else ""))
+
+
+class ImageWriter(object):
+	"""
+	Writes images in the background. submit() returns as soon as the image is queued; once max_pending writes are
+	outstanding it blocks until one of them finishes, which bounds the memory held by queued images.
+
+	Completions and failures are reported through the on_done callback, from the writing thread. Outstanding writes
+	are flushed by flush(), close(), leaving a 'with' block, or at interpreter exit
+	"""
+
+	def __init__(self, workers=2, max_pending=8, on_done=report):
+		"""
+		:param workers: Number of encoding threads (default = 2, i.e., a color & a gray-scale image at once)
+		:type workers: int
+
+		:param max_pending: Maximum number of queued or running writes (default = 8)
+		:type max_pending: int
+
+		:param on_done: Called as on_done(path, ok, message) after every write, see report() (default = report(); None to
+		stay silent)
+		:type on_done: function
+		"""
+
+		self.on_done = on_done
+		self.pool = ThreadPoolExecutor(max_workers = workers)
+		self.slots = threading.BoundedSemaphore(value = max_pending)
+		self.pending = set()
+		self.failures = []
+		self.closed = False
+		self._lock = threading.Lock()
+		atexit.register(self.close)
+
+	def _write(self, image, path, writer) -> None:
+		"""
+		Writes one image and reports the outcome. Runs on the thread pool
+
+		:param image: NumPy ndarray array (OpenCV Image Representation)
+		:type image: numpy.ndarray
+
+		:param path: Output path
+		:type path: str
+
+		:param writer: Function called as writer(image, path), returning whether the image was written, or the
+		analyser.export_img() summary
+		:type writer: function
+
+		:return: None
+		:rtype: None
+		"""
+
+		try:
+			result = writer(image, path)
+			ok, message = bool(result), ""
+			if isinstance(result, dict):
+				message = "%.1f KiB, encoded in %.1f ms" % (result["bytes"] / 1024, result["encode_seconds"] * 1000)
+		except Exception as e:  # Any failure is recorded, never left unseen on the future
+			ok, message = False, str(e).strip() or type(e).__name__
+		if not ok:
+			with self._lock:
+				self.failures.append((path, message))
+		if self.on_done is not None:
+			self.on_done(path, ok, message)
+
+	def submit(self, image, path, profile="jpeg", writer=None) -> None:
+		"""
+		Queues an image for writing. The image must not be modified until it has been written
+
+		:param image: NumPy ndarray array (OpenCV Image Representation)
+		:type image: numpy.ndarray
+
+		:param path: Output path (including the filename with extension)
+		:type path: str or Path
+
+		:param profile: Output profile specification (see analyser.parse_profile()) (default = "jpeg")
+		:type profile: str
+
+		:param writer: Function called as writer(image, path), returning whether the image was written (default =
+		None, i.e., analyser.export_img() with the profile)
+		:type writer: function
+
+		:return: None
+		:rtype: None
+		"""
+
+		writer = writer or (lambda img, out: analyser.export_img(image = img, path = out, profile = profile))
+		self.slots.acquire()
+		try:
+			future = self.pool.submit(self._write, image, str(path), writer)
+		except RuntimeError:  # Closed
+			self.slots.release()
+			raise
+		with self._lock:
+			self.pending.add(future)
+		future.add_done_callback(self._release)
+
+	def _release(self, future) -> None:
+		"""
+		Frees the queue slot of a finished write
+
+		:param future: Finished write
+		:type future: concurrent.futures.Future
+
+		:return: None
+		:rtype: None
+		"""
+
+		with self._lock:
+			self.pending.discard(future)
+		self.slots.release()
+
+	def outstanding(self) -> int:
+		"""
+		Returns the number of queued or running writes
+
+		:return: Outstanding writes
+		:rtype: int
+		"""
+
+		with self._lock:
+			return len(self.pending)
+
+	def flush(self, timeout=None) -> list:
+		"""
+		Waits for the outstanding writes
+
+		:param timeout: Maximum wait (seconds) (default = None, i.e., no limit)
+		:type timeout: float
+
+		:return: Failed writes since the last flush, as (path, message)
+		:rtype: list[(str, str)]
+		"""
+
+		with self._lock:
+			pending = list(self.pending)
+		wait(pending, timeout = timeout)
+		with self._lock:
+			failures, self.failures = self.failures, []
+		return failures
+
+	def close(self) -> list:
+		"""
+		Flushes the outstanding writes and stops the threads. Safe to call more than once
+
+		:return: Failed writes since the last flush, as (path, message)
+		:rtype: list[(str, str)]
+		"""
+
+		if self.closed:
+			return []
+		self.closed = True
+		failures = self.flush()
+		self.pool.shutdown(wait = True)
+		atexit.unregister(self.close)
+		return failures
+
+	def __enter__(self) -> "ImageWriter":
+		return self
+
+	def __exit__(self, *exc) -> None:
+		self.close()